@@ -0,0 +1,102 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Limits on what one connection may cost the server, so a buggy or hostile client
+#                           can not slow down every other match
+# Misc:                     Every server mode checks each connection against the same Limits: a token bucket
+#                           on the frames it sends (a real client sends about 60 to 130 a second), the bytes
+#                           of an unfinished frame (no real frame is longer than a binary header plus
+#                           MAX_PAYLOAD), and how many lines it sends that are not anything the server knows
+#                           and bytes the frame reader had to throw away.
+#                           A connection over any of them is disconnected, and the server's metrics count
+#                           each reason (kicked_frame_rate, kicked_oversize_frame, kicked_bad_frames), plus
+#                           connections_rejected for clients turned away because the server was full.
+# =================================================================================================
+
+import time
+from typing import Optional
+
+from assets.code.wireProtocol import HEADER, MAX_PAYLOAD
+
+MAX_CLIENTS = 256 # Connections a server takes at once, players and spectators together
+FRAME_RATE = 240.0 # Frames a second one connection may keep sending
+FRAME_BURST = 240 # Frames one connection may send at once after being quiet, a second's worth
+MAX_PENDING = HEADER.size + MAX_PAYLOAD # Bytes of one unfinished frame, the longest a valid frame can be
+MAX_BAD_FRAMES = 20 # Lines that are not a game state or a known command before the connection is dropped
+MAX_DROPPED = 4 * MAX_PENDING # Bytes the frame reader may throw away as garbage before the connection is dropped
+
+KICKED_RATE = "kicked_frame_rate"
+KICKED_OVERSIZE = "kicked_oversize_frame"
+KICKED_BAD = "kicked_bad_frames"
+REJECTED = "connections_rejected"
+
+# Author:  Daniel Krutsick
+# Purpose:  The limits every connection of one server is held to, set at the server prompts
+# Pre:  Plain numbers only, so the sharded server can send it to its worker processes
+# Post:  full() tells the accept loop to turn a new connection away
+class Limits:
+    def __init__(self, maxClients:int = MAX_CLIENTS, frameRate:float = FRAME_RATE, frameBurst:int = FRAME_BURST,
+                 maxPending:int = MAX_PENDING, maxBadFrames:int = MAX_BAD_FRAMES, maxDropped:int = MAX_DROPPED) -> None:
+        self.maxClients = maxClients
+        self.frameRate = frameRate
+        self.frameBurst = frameBurst
+        self.maxPending = maxPending
+        self.maxBadFrames = maxBadFrames
+        self.maxDropped = maxDropped
+
+    def full(self, connected:int) -> bool:
+        return connected >= self.maxClients
+
+# Author:  Daniel Krutsick
+# Purpose:  Token bucket, rate tokens a second up to burst of them saved up
+# Pre:  refill() is called with the time before take() is, now is time.monotonic()
+# Post:  take() is False once the bucket is empty, and takes nothing then
+class TokenBucket:
+    def __init__(self, rate:float, burst:float, now:Optional[float] = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic() if now is None else now
+
+    def refill(self, now:float) -> None:
+        if now > self.last:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+    def take(self, n:int = 1) -> bool:
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
+
+# Author:  Daniel Krutsick
+# Purpose:  Holds one connection to the server's Limits, from the loop that reads it
+# Pre:  received() after every read, frame() for every frame taken out of it, check() once the frames read so
+#       far have been handled
+# Post:  frame() is False and reason is set once the connection has gone over its frame rate. check() returns
+#        the reason to disconnect it for, or None. Only received() looks at the clock, once a read
+#        instead of once a frame
+class ConnectionGuard:
+    def __init__(self, limits:Limits, now:Optional[float] = None) -> None:
+        self.limits = limits
+        self.bucket = TokenBucket(limits.frameRate, limits.frameBurst, now)
+        self.reason: Optional[str] = None
+
+    def received(self, now:Optional[float] = None) -> None:
+        self.bucket.refill(time.monotonic() if now is None else now)
+
+    def frame(self) -> bool:
+        if self.bucket.take():
+            return True
+        self.reason = KICKED_RATE
+        return False
+
+    # pending is the bytes of the frame still being read, stats the connection's ConnStats
+    def check(self, pending:int, stats) -> Optional[str]:
+        if self.reason is None:
+            if pending > self.limits.maxPending:
+                self.reason = KICKED_OVERSIZE
+            elif stats.parseFailures > self.limits.maxBadFrames or stats.droppedBytes > self.limits.maxDropped:
+                self.reason = KICKED_BAD
+        return self.reason
@@ -0,0 +1,133 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Steps many matches at once with NumPy, one array operation per rule per
+#                           tick instead of one Ball and two Paddle objects per match
+# Misc:                     Needs numpy (in requirements.txt), nothing else in the game does.
+#                           Every rule is copied from PongSim.step(), including pygame's colliderect
+#                           overlap test and the floor division in Ball.hitPaddle(), so a match stepped
+#                           here ends up with exactly the same numbers as the same match in a PongSim.
+#                           Inputs are numbers instead of strings, see MOVES.
+# =================================================================================================
+
+from typing import Sequence
+
+import numpy as np
+
+from assets.code.gameSim import WIN_SCORE, PongSim
+from assets.code.wireProtocol import GameState
+
+# The paddle.moving strings and the numbers used for them here, down is +1 since y grows downward
+MOVES = {"up": -1, "": 0, "down": 1}
+
+# Author:  Daniel Krutsick
+# Purpose:  N independent matches held as arrays, stepped together with the same rules as PongSim
+# Pre:  Screen dimensions match the ones the clients are drawing with (640x480 by default)
+# Post:  After each step(), bounced and scored hold one flag per match, like PongSim's attributes
+class BatchSim:
+    def __init__(self, count:int, screenWidth:int = 640, screenHeight:int = 480) -> None:
+        # The starting layout is read from a PongSim so both start from the same pygame.Rect rounding
+        start = PongSim(screenWidth, screenHeight)
+        self.count = count
+        self.screenWidth = screenWidth
+        self.screenHeight = screenHeight
+        self.ballStartX = start.ball.startXpos
+        self.ballStartY = start.ball.startYpos
+        self.ballW = start.ball.rect.w
+        self.ballH = start.ball.rect.h
+        self.leftX = start.leftPaddle.rect.x
+        self.rightX = start.rightPaddle.rect.x
+        self.paddleW = start.leftPaddle.rect.w
+        self.paddleH = start.leftPaddle.rect.h
+        self.paddleSpeed = start.leftPaddle.speed
+        self.topWall = start.topWall
+        self.bottomWall = start.bottomWall
+
+        def filled(value) -> np.ndarray:
+            return np.full(count, value, dtype=np.int64)
+        self.bx = filled(start.ball.rect.x)
+        self.by = filled(start.ball.rect.y)
+        self.xVel = filled(start.ball.xVel)
+        self.yVel = filled(start.ball.yVel)
+        self.leftY = filled(start.leftPaddle.rect.y)
+        self.rightY = filled(start.rightPaddle.rect.y)
+        self.leftMove = np.zeros(count, dtype=np.int64)
+        self.rightMove = np.zeros(count, dtype=np.int64)
+        self.lScore = np.zeros(count, dtype=np.int64)
+        self.rScore = np.zeros(count, dtype=np.int64)
+        self.tick = 0
+        self.bounced = np.zeros(count, dtype=bool)
+        self.scored = np.zeros(count, dtype=bool)
+
+    # Same as PongSim.set_input() for one match
+    def set_input(self, index:int, side:str, moving:str) -> None:
+        if moving in MOVES:
+            (self.leftMove if side == "left" else self.rightMove)[index] = MOVES[moving]
+
+    # Sets every match's input at once, each array holds -1, 0 or 1 per match (see MOVES)
+    def set_inputs(self, left:Sequence[int], right:Sequence[int]) -> None:
+        self.leftMove[:] = left
+        self.rightMove[:] = right
+
+    def is_over(self) -> np.ndarray:
+        return (self.lScore > WIN_SCORE) | (self.rScore > WIN_SCORE)
+
+    # PongSim.move_paddles() for every paddle, a paddle that cannot move down does not try up instead
+    def move_paddles(self) -> None:
+        limit = self.screenHeight - 10
+        for y, move in ((self.leftY, self.leftMove), (self.rightY, self.rightMove)):
+            y += self.paddleSpeed * ((move == 1) & (y + self.paddleH < limit))
+            y -= self.paddleSpeed * ((move == -1) & (y > 10))
+
+    # pygame.Rect.colliderect() between the ball of every match and one rectangle per match
+    def overlaps(self, x, y, w:int, h:int) -> np.ndarray:
+        return (self.bx < x + w) & (self.bx + self.ballW > x) & (self.by < y + h) & (self.by + self.ballH > y)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  PongSim.step() for all matches: paddles, ball, scoring, then paddle and wall bounces
+    # Pre:  Inputs have been set for this tick, matches that are already over only move their paddles
+    # Post:  tick is one higher and every match holds what PongSim.step() would have left it with
+    def step(self) -> None:
+        self.tick += 1
+        self.move_paddles()
+        live = ~self.is_over()
+        bx, by, xVel, yVel = self.bx, self.by, self.xVel, self.yVel
+        bx += xVel * live
+        by += yVel * live
+
+        # If the ball makes it past the edge of the screen, update score and serve again
+        leftGoal = live & (bx > self.screenWidth)
+        rightGoal = live & ~leftGoal & (bx < 0)
+        self.lScore += leftGoal
+        self.rScore += rightGoal
+        scored = leftGoal | rightGoal
+        bx[scored] = self.ballStartX
+        by[scored] = self.ballStartY
+        xVel[leftGoal] = 5
+        xVel[rightGoal] = -5
+        yVel[scored] = 0
+
+        # Ball.hitPaddle(): turn around, and take the spin from how far off the paddle's center the ball is
+        hitLeft = live & self.overlaps(self.leftX, self.leftY, self.paddleW, self.paddleH)
+        hitRight = live & ~hitLeft & self.overlaps(self.rightX, self.rightY, self.paddleW, self.paddleH)
+        hit = hitLeft | hitRight
+        paddleCenter = np.where(hitLeft, self.leftY, self.rightY) + self.paddleH // 2
+        np.negative(xVel, out=xVel, where=hit)
+        yVel[hit] = ((by + self.ballH // 2 - paddleCenter) // 2)[hit]
+
+        top, bottom = self.topWall, self.bottomWall
+        wall = live & (self.overlaps(top.x, top.y, top.w, top.h) | self.overlaps(bottom.x, bottom.y, bottom.w, bottom.h))
+        np.negative(yVel, out=yVel, where=wall)
+
+        self.scored = scored
+        self.bounced = hit | wall
+
+    # PongSim.states() for one match
+    def states(self, index:int) -> tuple:
+        bx, by = int(self.bx[index]), int(self.by[index])
+        lScore, rScore = int(self.lScore[index]), int(self.rScore[index])
+        return (
+            GameState("left", int(self.leftY[index]), bx, by, lScore, rScore, self.tick),
+            GameState("right", int(self.rightY[index]), bx, by, lScore, rScore, self.tick),
+        )
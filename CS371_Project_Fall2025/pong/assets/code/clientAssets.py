@@ -0,0 +1,113 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  The client's fonts, sounds and game window, loaded once while the player is
+#                           still on the start screen or waiting in the lobby instead of when START
+#                           arrives, and kept for every match after that
+# Misc:                     pygame itself is only imported here, from a background thread started by
+#                           preload(), so pongClient.py starts without paying for it. The window has to be
+#                           made on the main thread, so open_window() does that part once the rest is in.
+#                           Running with SDL_VIDEODRIVER=dummy and SDL_AUDIODRIVER=dummy (pongClient.py
+#                           --headless) works the same, with nothing shown or played.
+# =================================================================================================
+
+import sys
+import threading
+import time
+from typing import Optional
+
+FONT_DIR = "./assets/fonts/"
+SOUND_DIR = "./assets/sounds/"
+
+# Author:  Jacob Blankenship
+# Purpose:  Everything playGame() needs from pygame before it can draw its first frame
+# Pre:  Paths are relative to the pong folder, which pongClient.py is run from
+# Post:  After open_window(), screen, the fonts and the sounds are ready, and stay that way until close().
+#        timings has how long each part took, in seconds
+class ClientAssets:
+    def __init__(self, screenWidth:int = 640, screenHeight:int = 480) -> None:
+        self.size = (screenWidth, screenHeight)
+        self.loaded = threading.Event()
+        self.loader: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        self.pygame = None # The pygame module, once the loader has imported it
+        self.scoreFont = None
+        self.winFont = None
+        self.pointSound = None
+        self.bounceSound = None
+        self.screen = None
+        self.timings = {}
+
+    # Starts loading in the background, calling it again does nothing
+    def preload(self) -> None:
+        if self.loader is None:
+            self.loader = threading.Thread(target=self.load, daemon=True)
+            self.loader.start()
+
+    def load(self) -> None:
+        try:
+            start = time.perf_counter()
+            import pygame
+            self.timings["import"] = time.perf_counter() - start
+            start = time.perf_counter()
+            # The mixer and font modules are the slow ones to start, the display is left to open_window()
+            pygame.mixer.pre_init(44100, -16, 2, 2048)
+            pygame.mixer.init()
+            pygame.font.init()
+            self.timings["init"] = time.perf_counter() - start
+            start = time.perf_counter()
+            self.scoreFont = pygame.font.Font(FONT_DIR + "pong-score.ttf", 32)
+            self.winFont = pygame.font.Font(FONT_DIR + "visitor.ttf", 48)
+            self.pointSound = pygame.mixer.Sound(SOUND_DIR + "point.wav")
+            self.bounceSound = pygame.mixer.Sound(SOUND_DIR + "bounce.wav")
+            self.timings["files"] = time.perf_counter() - start
+            self.pygame = pygame
+        except Exception as e:
+            self.error = e
+        finally:
+            self.loaded.set()
+
+    # Author:  Jacob Blankenship
+    # Purpose:  The game window, made the first time it is asked for and the same surface after that
+    # Pre:  Called on the main thread
+    # Post:  Waits for the loader if it is still going (or loads right here if preload() was never called),
+    #        raises whatever the loader ran into, and returns the window's surface
+    def open_window(self):
+        if self.screen is not None:
+            return self.screen
+        if self.loader is None:
+            self.load()
+        self.loaded.wait()
+        if self.error is not None:
+            raise self.error
+        pygame = self.pygame
+        start = time.perf_counter()
+        pygame.init()
+        self.screen = pygame.display.set_mode(self.size)
+        pygame.display.set_caption("Pong")
+        self.timings["window"] = time.perf_counter() - start
+        return self.screen
+
+    # Shows a line of text in the middle of an otherwise black window, for the time between matches
+    def show_message(self, text:str) -> None:
+        if self.screen is None:
+            return
+        self.screen.fill((0, 0, 0))
+        surface = self.winFont.render(text, False, (255, 255, 255), (0, 0, 0))
+        self.screen.blit(surface, surface.get_rect(center=(self.size[0] // 2, self.size[1] // 2)))
+        self.pygame.display.update()
+
+    # Keeps an open window responding while the main thread is waiting on something else, closing it quits
+    def pump(self) -> None:
+        if self.screen is None:
+            return
+        for event in self.pygame.event.get():
+            if event.type == self.pygame.QUIT:
+                self.close()
+                sys.exit()
+
+    def close(self) -> None:
+        if self.pygame is not None:
+            self.pygame.quit()
+        self.screen = None
@@ -0,0 +1,117 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  One match clock shared by the server and both clients, so game states from
+#                           the two players carry ticks on the same timeline instead of two frame counters
+#                           that drift apart with every difference in frame rate
+# Misc:                     Each match (or room) has a MatchClock that starts when START is sent. A client
+#                           sends CLK:<its own time in microseconds> and the server answers right away with
+#                           CLK:<the same time>:<match time in microseconds>. Like NTP, the client takes the
+#                           round trip from its own two times and puts the server's time at the middle of
+#                           it, trusting the answer with the lowest round trip out of the last few, since
+#                           that one spent the least time queued anywhere. Match tick n is n/60 seconds
+#                           after START on the server.
+# =================================================================================================
+
+import time
+from collections import deque
+from typing import Optional
+
+TICK_RATE = 60 # Match ticks per second, the same rate the clients draw and the authoritative rooms step at
+CLOCK_PREFIX = b"CLK:"
+PING_INTERVAL = 1.0 # Seconds between pings once the clock has settled
+FAST_PINGS = 5 # Pings sent at the start of a match, closer together, so the clock settles in half a second
+FAST_INTERVAL = 0.1
+CLOCK_SAMPLES = 8 # Answers the lowest round trip is picked from, older ones are forgotten
+
+# Author:  Daniel Krutsick
+# Purpose:  The server's clock for one match, counted from when its START lines were sent
+# Pre:  Created when the match starts
+# Post:  answer() turns a client's CLK line into the reply for it, or None if the line is not a valid ping
+class MatchClock:
+    def __init__(self, tickRate:int = TICK_RATE, started:Optional[float] = None) -> None:
+        self.tickRate = tickRate
+        self.started = time.monotonic() if started is None else started
+        self.answered = 0
+
+    def elapsed(self, now:Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.started
+
+    def tick(self, now:Optional[float] = None) -> int:
+        return int(self.elapsed(now) * self.tickRate)
+
+    def answer(self, frame, now:Optional[float] = None) -> Optional[bytes]:
+        stamp = bytes(frame[len(CLOCK_PREFIX):])
+        if not stamp.isdigit():
+            return None
+        self.answered += 1
+        return CLOCK_PREFIX + stamp + b":" + str(int(self.elapsed(now) * 1e6)).encode('utf-8') + b"\n"
+
+# Author:  Jacob Blankenship
+# Purpose:  The client's estimate of its match's clock, from pinging the server
+# Pre:  reset() is called when START arrives, request() every frame, and answer() with every CLK line
+#       the server sends back (from a receive thread)
+# Post:  tick() is the match tick right now on the server, to within half the lowest round trip seen.
+#        Until the first answer arrives, match time 0 is taken to be when START arrived
+class ClockSync:
+    def __init__(self, tickRate:int = TICK_RATE, samples:int = CLOCK_SAMPLES) -> None:
+        self.tickRate = tickRate
+        self.samples = deque(maxlen=samples) # (round trip, offset) of the newest answers
+        self.offset = 0.0 # Match time minus our own time.monotonic()
+        self.rtt: Optional[float] = None # Round trip of the answer offset came from
+        self.synced = False
+        self.resetAt = 0.0
+        self.nextPing = 0.0
+        self.pings = 0
+        self.answers = 0
+
+    def reset(self, now:Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        self.samples.clear()
+        self.offset = -now
+        self.rtt = None
+        self.synced = False
+        self.resetAt = now
+        self.nextPing = now
+        self.pings = 0
+        self.answers = 0
+
+    # The ping to send now, or None if the next one is not due yet
+    def request(self, now:Optional[float] = None) -> Optional[bytes]:
+        if now is None:
+            now = time.monotonic()
+        if now < self.nextPing:
+            return None
+        self.pings += 1
+        self.nextPing = now + (FAST_INTERVAL if self.pings < FAST_PINGS else PING_INTERVAL)
+        return CLOCK_PREFIX + str(int(now * 1e6)).encode('utf-8') + b"\n"
+
+    # Takes in the server's answer to one of our pings, returns False for one that is malformed or
+    # was sent before the last reset(), which was answered with the last match's clock
+    def answer(self, line:str, now:Optional[float] = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        parts = line.split(":")
+        if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+            return False
+        sent = int(parts[1]) / 1e6
+        rtt = now - sent
+        if sent < self.resetAt or rtt < 0:
+            return False
+        self.samples.append((rtt, int(parts[2]) / 1e6 + rtt / 2 - now))
+        self.rtt, self.offset = min(self.samples)
+        self.synced = True
+        self.answers += 1
+        return True
+
+    def match_time(self, now:Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) + self.offset
+
+    def tick(self, now:Optional[float] = None) -> int:
+        return int(self.match_time(now) * self.tickRate)
+
+    def stats(self) -> dict:
+        return {"pings": self.pings, "answers": self.answers, "synced": self.synced,
+                "rttMs": round(self.rtt * 1000, 2) if self.rtt is not None else None}
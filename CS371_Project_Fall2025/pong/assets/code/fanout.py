@@ -0,0 +1,329 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Outbound fan-out for the servers, one bounded queue per peer so a slow
+#                           client can never hold up relaying to everyone else
+# Misc:                     Game state frames are sent with a key (the paddle side that sent them).
+#                           A newer frame with the same key replaces the one still waiting in the queue,
+#                           since only the latest state matters. Frames without a key (START, PROTO acks)
+#                           are never dropped or replaced.
+#                           A queue given an onDrop callback calls it every time a frame is dropped, the
+#                           servers use it to make a SYNC1 client's next state go out as a snapshot.
+#                           A queue given a latency histogram (metrics.py) also times each frame from
+#                           put() until the writer has handed it to the socket.
+# =================================================================================================
+
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from assets.code.serverLog import get_logger
+
+log = get_logger()
+
+MAX_QUEUE_DEPTH = 64 # Frames waiting for one peer before the oldest state frame gets dropped
+EVICT_AFTER = 2.0 # Seconds a peer can stay unable to take its queue before it is disconnected
+SEND_CHUNK = 4096 # Most bytes handed to one send(), a writable socket always has at least this much room
+# The client sockets stay blocking for their reader threads, so each send asks not to wait instead. A socket
+# whose buffer filled up since the selector looked then raises BlockingIOError rather than stalling the writer
+# for every other peer. Windows has no MSG_DONTWAIT, there SEND_CHUNK is all that keeps a send from waiting
+SEND_FLAGS = getattr(socket, "MSG_DONTWAIT", 0)
+
+# Author:  Daniel Krutsick
+# Purpose:  The frames waiting to go out to one peer, plus the counters used to tune the limits
+# Pre:  put() may be called from any thread, take_all() from the one thread that writes to the peer
+# Post:  Never holds more than maxDepth droppable frames, the oldest stale frames go first
+class PeerQueue:
+    def __init__(self, maxDepth:int = MAX_QUEUE_DEPTH, evictAfter:float = EVICT_AFTER) -> None:
+        self.maxDepth = maxDepth
+        self.evictAfter = evictAfter
+        self.lock = threading.Lock()
+        self.entries = deque() # [key, data, queued at] lists, so a coalesced frame can be swapped in place
+        self.pending = {} # key -> entry still waiting in entries
+        self.behindSince: Optional[float] = None # When the peer last had an empty queue, None if it has one now
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.maxDepthSeen = 0
+        self.bytesSent = 0
+        self.latency = None # Histogram of queue to socket times, only timed when one is set
+        self.onDrop = None # Called with no arguments after a frame is dropped, when one is set
+        self.inFlight = [] # Queue times of the frames handed to the writer and not yet written
+        self.spare = [] # Entries already sent, reused by put() so a steady stream of frames makes no new lists
+        self.parts = [] # The frames take_all() joins, emptied and reused
+
+    def depth(self) -> int:
+        return len(self.entries)
+
+    # Adds a frame, returns False if an older frame had to be dropped to make room for it
+    def put(self, data:bytes, key = None) -> bool:
+        queuedAt = time.perf_counter() if self.latency is not None else 0.0
+        with self.lock:
+            self.enqueued += 1
+            if self.behindSince is None:
+                self.behindSince = time.monotonic()
+            if key is not None:
+                entry = self.pending.get(key)
+                if entry is not None:
+                    # Timed from the newer frame, what matters is how stale the state is when it goes out
+                    entry[1] = data
+                    entry[2] = queuedAt
+                    self.coalesced += 1
+                    return True
+            dropped = False
+            if len(self.entries) >= self.maxDepth:
+                dropped = self.drop_oldest()
+                if dropped and self.onDrop is not None:
+                    self.onDrop()
+            if self.spare:
+                entry = self.spare.pop()
+                entry[0] = key
+                entry[1] = data
+                entry[2] = queuedAt
+            else:
+                entry = [key, data, queuedAt]
+            self.entries.append(entry)
+            if key is not None:
+                self.pending[key] = entry
+            self.maxDepthSeen = max(self.maxDepthSeen, len(self.entries))
+            return not dropped
+
+    def drop_oldest(self) -> bool:
+        for entry in self.entries:
+            if entry[0] is not None:
+                self.entries.remove(entry)
+                del self.pending[entry[0]]
+                self.dropped += 1
+                return True
+        return False
+
+    # Hands over everything waiting, in order, as one buffer so it can go out in one write
+    def take_all(self) -> bytes:
+        with self.lock:
+            parts = self.parts
+            for entry in self.entries:
+                parts.append(entry[1])
+                if self.latency is not None:
+                    self.inFlight.append(entry[2])
+                entry[1] = None
+                if len(self.spare) < self.maxDepth:
+                    self.spare.append(entry)
+            # One frame is handed over as it is, without a copy
+            data = b"".join(parts)
+            parts.clear()
+            self.sent += len(self.entries)
+            self.bytesSent += len(data)
+            self.entries.clear()
+            self.pending.clear()
+            return data
+
+    # Called by the writer once everything handed over has actually been written
+    def caught_up(self) -> None:
+        with self.lock:
+            if not self.entries:
+                self.behindSince = None
+            if self.inFlight:
+                now = time.perf_counter()
+                for queuedAt in self.inFlight:
+                    self.latency.observe(now - queuedAt)
+                self.inFlight.clear()
+
+    # Nothing is queued and everything handed to the writer has been written
+    def idle(self) -> bool:
+        return self.behindSince is None
+
+    def should_evict(self, now:float) -> bool:
+        return self.behindSince is not None and now - self.behindSince > self.evictAfter
+
+    def stats(self) -> dict:
+        return {"depth": len(self.entries), "maxDepth": self.maxDepthSeen, "enqueued": self.enqueued,
+                "sent": self.sent, "bytesSent": self.bytesSent, "dropped": self.dropped, "coalesced": self.coalesced}
+
+# Author:  Daniel Krutsick
+# Purpose:  One thread that writes every peer's queue with non-blocking sends, for the threaded server
+# Pre:  Sockets are added with add() before anything is sent to them. They may stay blocking for the
+#       reader thread, a send is only made once the selector says the socket can take data
+# Post:  Peers that fall behind for longer than evictAfter are shut down, which makes their
+#        handle_client thread see the disconnect and clean up like any other disconnect
+class FanoutWriter(threading.Thread):
+    def __init__(self, maxDepth:int = MAX_QUEUE_DEPTH, evictAfter:float = EVICT_AFTER) -> None:
+        super().__init__(daemon=True)
+        self.maxDepth = maxDepth
+        self.evictAfter = evictAfter
+        self.queues = {} # socket -> PeerQueue
+        self.unsent = {} # socket -> memoryview of bytes taken from the queue but not written yet
+        self.queuesLock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.wakeRecv, self.wakeSend = socket.socketpair()
+        self.wakeRecv.setblocking(False)
+        self.wakeSend.setblocking(False)
+        self.selector.register(self.wakeRecv, selectors.EVENT_READ)
+        self.woken = False
+        self.running = True
+        self.evicted = 0
+
+    def add(self, sock:socket.socket) -> PeerQueue:
+        peer = PeerQueue(self.maxDepth, self.evictAfter)
+        with self.queuesLock:
+            self.queues[sock] = peer
+        return peer
+
+    def remove(self, sock:socket.socket) -> None:
+        with self.queuesLock:
+            self.queues.pop(sock, None)
+        self.wake()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Waits for everything queued for a peer to be written, before its socket is handed to another
+    #           process (pongShardServer.py) that will write to it next
+    # Pre:  Nothing else is queued for sock while this waits
+    # Post:  Returns True once the peer is caught up, False if it was evicted or did not catch up within timeout
+    def drain(self, sock:socket.socket, timeout:float = 1.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            peer = self.queues.get(sock)
+            if peer is None:
+                return False
+            if peer.idle():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            self.wake()
+            time.sleep(0.001)
+
+    # Queues a frame for one peer and returns right away, the writer thread does the actual send
+    def send(self, sock:socket.socket, data:bytes, key = None) -> None:
+        peer = self.queues.get(sock)
+        if peer is not None:
+            peer.put(data, key)
+            self.wake()
+
+    def wake(self) -> None:
+        # One wake byte is enough no matter how many frames were queued since the last loop
+        if not self.woken:
+            self.woken = True
+            try:
+                self.wakeSend.send(b"\0")
+            except (BlockingIOError, OSError):
+                pass
+
+    def stop(self) -> None:
+        self.running = False
+        self.wake()
+
+    def evict(self, sock:socket.socket) -> None:
+        self.evicted += 1
+        log.warning("[EVICTED] %s fell too far behind and was disconnected", sock)
+        with self.queuesLock:
+            self.queues.pop(sock, None)
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    # Writes as much as the socket will take right now, returns True if everything went out
+    def flush(self, sock:socket.socket, peer:PeerQueue) -> bool:
+        view = self.unsent.get(sock)
+        if view is None:
+            data = peer.take_all()
+            if not data:
+                peer.caught_up()
+                return True
+            view = memoryview(data)
+        try:
+            n = sock.send(view[:SEND_CHUNK], SEND_FLAGS)
+        except (BlockingIOError, socket.timeout):
+            n = 0
+        if n < len(view):
+            self.unsent[sock] = view[n:]
+            return False
+        self.unsent.pop(sock, None)
+        peer.caught_up()
+        return not peer.depth()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Writer loop, a peer with something queued is watched for writability and only written
+    #           to once the selector says it can take data, so no send ever waits on a slow peer
+    # Pre:  start() has been called on the thread
+    # Post:  Runs until stop() is called
+    def run(self) -> None:
+        registered = set()
+        while self.running:
+            writable = set()
+            for key, _ in self.selector.select(timeout=0.1):
+                if key.fileobj is self.wakeRecv:
+                    try:
+                        self.wakeRecv.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    # Cleared after reading so a wake sent in between is never lost
+                    self.woken = False
+                else:
+                    writable.add(key.fileobj)
+            now = time.monotonic()
+            with self.queuesLock:
+                peers = list(self.queues.items())
+            waiting = set()
+            for sock, peer in peers:
+                if not peer.depth() and sock not in self.unsent:
+                    continue
+                done = False
+                if sock in writable:
+                    try:
+                        done = self.flush(sock, peer)
+                    except OSError:
+                        # The reader thread will see the same error and clean the client up
+                        done = True
+                        self.unsent.pop(sock, None)
+                        peer.take_all()
+                        peer.inFlight.clear()
+                if not done:
+                    if peer.should_evict(now):
+                        self.unsent.pop(sock, None)
+                        self.evict(sock)
+                        continue
+                    waiting.add(sock)
+            # Only sockets with something left to write are watched for becoming writable
+            for sock in registered - waiting:
+                try:
+                    self.selector.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+            for sock in waiting - registered:
+                try:
+                    self.selector.register(sock, selectors.EVENT_WRITE)
+                except (KeyError, ValueError, OSError):
+                    waiting.discard(sock)
+            registered = waiting
+            for sock in list(self.unsent):
+                if sock not in self.queues:
+                    del self.unsent[sock]
+        self.selector.close()
+
+    def stats(self) -> dict:
+        with self.queuesLock:
+            peers = list(self.queues.values())
+        totals = {"peers": len(peers), "evicted": self.evicted, "depth": 0, "dropped": 0, "coalesced": 0, "sent": 0}
+        for peer in peers:
+            s = peer.stats()
+            for name in ("depth", "dropped", "coalesced", "sent"):
+                totals[name] += s[name]
+        return totals
+
+    # Counters for each peer, keyed by the peer's address
+    def peer_stats(self) -> dict:
+        with self.queuesLock:
+            peers = list(self.queues.items())
+        stats = {}
+        for sock, peer in peers:
+            try:
+                name = str(sock.getpeername())
+            except OSError:
+                name = str(sock)
+            stats[name] = peer.stats()
+        return stats
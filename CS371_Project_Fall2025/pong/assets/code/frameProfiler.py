@@ -0,0 +1,171 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Times every phase of every client frame (events, network, update, draw, send,
+#                           and the wait for the next frame), for the overlay playGame() shows with F3
+#                           and for a timeline file to look at afterwards
+# Misc:                     Each mark() is one perf_counter() call and a dict update, so the profiler is
+#                           always on and costs a few microseconds a frame. The per frame dicts are kept in a
+#                           ring and reused, so it makes no new objects a frame. The overlay is only re-rendered
+#                           a few times a second, so showing it barely changes what it measures.
+#                           export() writes the Chrome trace event format: open chrome://tracing or
+#                           https://ui.perfetto.dev and load the file to see every frame on a timeline,
+#                           with the round trip and backlog as counters under it.
+# =================================================================================================
+
+import json
+import time
+from collections import deque
+from typing import Optional
+
+HISTORY = 120 # Frames the overlay averages over, two seconds at 60 fps
+TRACE_EVENTS = 500000 # Newest trace events kept, about ten minutes of frames
+OVERLAY_REFRESH = 0.25 # Seconds between re-rendering the overlay text
+HITCH = 2 / 60 # A frame longer than two frames' worth counts as a hitch
+
+# Author:  Jacob Blankenship
+# Purpose:  Frame by frame phase timings, their averages, and a trace of them
+# Pre:  begin() at the top of every frame, then mark(phase) as each phase ends. value() for anything else
+#       worth showing, like the round trip
+# Post:  summary() has the averages over the last HISTORY frames, export() writes the trace kept so far
+class FrameProfiler:
+    def __init__(self, history:int = HISTORY, trace:bool = False, traceEvents:int = TRACE_EVENTS) -> None:
+        # Ring of the newest frames: their length in seconds and a {phase: seconds} dict each, one more slot
+        # than history for the frame being timed. The dicts are cleared and reused instead of made every frame
+        self.totals = [0.0] * (history + 1)
+        self.spent = [{} for _ in range(history + 1)]
+        self.slot = 0 # The slot of the frame being timed
+        self.filled = 0 # Finished frames in the ring, at most history
+        self.phases = [] # Phase names in the order they were first marked, the overlay shows them that way
+        self.current = self.spent[0]
+        self.frameStart: Optional[float] = None
+        self.last = 0.0
+        self.values = {} # name -> newest value() given, shown on the overlay
+        # (kind, name, start, seconds or value) tuples, turned into trace events only by export()
+        self.events: Optional[deque] = deque(maxlen=traceEvents) if trace else None
+        self.origin = time.perf_counter()
+        self.frames = 0
+        self.hitches = 0
+        self.showing = False
+        self.overlay = None # The rendered overlay surface, and when it was rendered
+        self.overlayAt = 0.0
+        self.font = None
+
+    # Starts a frame, and ends the one before it
+    def begin(self) -> None:
+        now = time.perf_counter()
+        if self.frameStart is not None:
+            total = now - self.frameStart
+            self.totals[self.slot] = total
+            self.slot = (self.slot + 1) % len(self.totals)
+            if self.filled < len(self.totals) - 1:
+                self.filled += 1
+            self.frames += 1
+            if total > HITCH:
+                self.hitches += 1
+            if self.events is not None:
+                self.events.append(("X", "frame", self.frameStart, total))
+        self.frameStart = self.last = now
+        # Zeroed instead of cleared, clear() would throw away the dict's table and make a new one next mark()
+        current = self.current = self.spent[self.slot]
+        for phase in current:
+            current[phase] = 0.0
+
+    # Ends phase, everything since the last mark (or begin()) is counted as its time
+    def mark(self, phase:str) -> None:
+        now = time.perf_counter()
+        spent = now - self.last
+        current = self.current
+        if phase in current:
+            current[phase] += spent
+        else:
+            current[phase] = spent
+            if phase not in self.phases:
+                self.phases.append(phase)
+        if self.events is not None:
+            self.events.append(("X", phase, self.last, spent))
+        self.last = now
+
+    # A number to show on the overlay and to keep as a counter in the trace, None when it is not known yet
+    def value(self, name:str, value) -> None:
+        self.values[name] = value
+        if self.events is not None and value is not None:
+            self.events.append(("C", name, self.last, value))
+
+    # Author:  Jacob Blankenship
+    # Purpose:  Averages over the last HISTORY frames
+    # Pre:  None
+    # Post:  Returns fps, the average and worst frame in ms, and (average ms, worst ms) for every phase
+    def summary(self) -> dict:
+        if not self.filled:
+            return {"fps": 0.0, "frameMs": 0.0, "worstMs": 0.0, "phases": {}, "hitches": self.hitches}
+        # The finished frames are the filled slots just before the one being timed
+        slots = [(self.slot - 1 - i) % len(self.totals) for i in range(self.filled)]
+        totals = [self.totals[i] for i in slots]
+        total = sum(totals)
+        phases = {}
+        for phase in self.phases:
+            spent = [self.spent[i].get(phase, 0.0) for i in slots]
+            phases[phase] = (sum(spent) / len(slots) * 1000, max(spent) * 1000)
+        return {"fps": len(slots) / total if total else 0.0, "frameMs": total / len(slots) * 1000,
+                "worstMs": max(totals) * 1000, "phases": phases, "hitches": self.hitches}
+
+    def lines(self) -> list:
+        s = self.summary()
+        lines = [f"FPS {s['fps']:.1f}  frame {s['frameMs']:.1f} ms  worst {s['worstMs']:.1f}  hitches {s['hitches']}"]
+        for phase, (average, worst) in s["phases"].items():
+            lines.append(f"{phase:<8} {average:6.2f} ms  max {worst:6.2f}")
+        shown = []
+        for name, value in self.values.items():
+            shown.append(f"{name} {'-' if value is None else format(value, 'g')}")
+        # Two values to a line keeps the overlay narrow enough to stay clear of the score
+        for i in range(0, len(shown), 2):
+            lines.append("  ".join(shown[i:i + 2]))
+        return lines
+
+    # Author:  Jacob Blankenship
+    # Purpose:  The overlay as a surface for PongRenderer.draw() to put on top of the frame
+    # Pre:  pygame is initialized, only called while showing is True
+    # Post:  Returns (surface, where it goes), re-rendered at most every OVERLAY_REFRESH seconds
+    def overlay_surface(self, pygame, position:tuple = (16, 24)) -> tuple:
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlayAt >= OVERLAY_REFRESH:
+            if self.font is None:
+                # pygame's own default font, small enough to fit the breakdown in a corner
+                self.font = pygame.font.Font(None, 18)
+            rendered = [self.font.render(line, True, (0, 255, 0)) for line in self.lines()]
+            height = sum(surface.get_height() for surface in rendered)
+            surface = pygame.Surface((max(s.get_width() for s in rendered) + 8, height + 8))
+            surface.set_alpha(200)
+            y = 4
+            for line in rendered:
+                surface.blit(line, (4, y))
+                y += line.get_height()
+            self.overlay = surface
+            self.overlayAt = now
+        return self.overlay, position
+
+    def toggle(self) -> None:
+        self.showing = not self.showing
+        self.overlay = None
+
+    # Author:  Jacob Blankenship
+    # Purpose:  Writes the trace kept so far as a Chrome trace event file
+    # Pre:  The profiler was made with trace=True
+    # Post:  path holds every frame and phase as a complete ("X") event and every value() as a counter ("C")
+    #        event, times in microseconds since the profiler was made. The whole file is rewritten each time
+    def export(self, path:str) -> int:
+        events = []
+        for kind, name, start, amount in self.events or ():
+            event = {"name": name, "ph": kind, "ts": round((start - self.origin) * 1e6, 1), "pid": 1, "tid": 1}
+            if kind == "X":
+                event["dur"] = round(amount * 1e6, 1)
+                event["cat"] = "frame" if name == "frame" else "phase"
+            else:
+                event["args"] = {name: amount}
+            events.append(event)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"frames": self.frames,
+                       "hitches": self.hitches}}, f)
+        return len(events)
@@ -0,0 +1,429 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  The Pong physics from playGame() without any drawing, so the server can
+#                           own the simulation on a fixed tick, the client can draw the same rules,
+#                           and bots can play whole matches as fast as the CPU allows
+# Misc:                     Uses the Ball and Paddle classes from helperCode.py unchanged, only
+#                           pygame.Rect is needed so no window or pygame.init() is required.
+#                           A controller is anything that takes the sim and returns "up", "down" or "",
+#                           see ChaseBot and ScriptedInput, and run_match() plays one match with two of them.
+#                           advance() steps several ticks at once: instead of checking every tick, it works
+#                           out the first tick the ball touches a paddle, a wall or an edge (swept collision)
+#                           and jumps straight there, so a server can step at 20 or 30 Hz and still end up
+#                           exactly where stepping at 60 Hz would have. A ball fast enough to pass through a
+#                           paddle or wall between two ticks, which step() would miss, is bounced where it hit.
+#                           The exact test only runs for a ball that fast, a ball at normal speed near a wall
+#                           or paddle is checked tick by tick like step() does, which is cheaper.
+# =================================================================================================
+
+import random
+from typing import Callable, Optional, Sequence
+
+import pygame
+
+from assets.code.helperCode import Ball, Paddle
+from assets.code.wireProtocol import GameState
+
+WIN_SCORE = 9 # The game ends once either score goes past this, same as playGame()
+MAX_TICKS = 60 * 60 * 10 # run_match() gives up on a match after 10 minutes of play at 60 Hz
+INF = float("inf")
+
+# Author:  Daniel Krutsick
+# Purpose:  Swept test of the ball against one box, both moving in straight lines
+# Pre:  axes holds a list of conditions for each axis (and any other limit, like when a paddle stops).
+#       A condition (a, b) holds at tick j when a + b*j > 0, the box and ball overlap while all of them hold
+# Post:  Returns (tick, None) for the first whole tick in [first, last] they overlap at, which is the tick a
+#        colliderect() check every tick would have caught it, or (tick, time) when the ball went all the way
+#        through the box along one axis between two whole ticks, with time the exact tick they first touched
+#        as a (numerator, denominator) pair. None if they do not meet in [first, last]. Clipping a corner
+#        between two ticks is not a hit, the same as for colliderect() every tick
+def first_contact(axes:Sequence[Sequence[tuple]], first:int, last:int) -> Optional[tuple]:
+    lo, hi = -INF, INF
+    through = False # Some axis is crossed so fast no whole tick lands inside it
+    # Plain comparisons instead of min() and max(), this runs for everything the ball gets near
+    for conditions in axes:
+        axisLo, axisHi = -INF, INF
+        for a, b in conditions:
+            if b > 0:
+                tick = -a // b + 1
+                if tick > axisLo:
+                    axisLo = tick
+            elif b < 0:
+                tick = (a - 1) // -b
+                if tick < axisHi:
+                    axisHi = tick
+            elif a <= 0:
+                return None
+        if axisLo > axisHi:
+            through = True
+        if axisLo > lo:
+            lo = axisLo
+        if axisHi < hi:
+            hi = axisHi
+    start = lo if lo > first else first
+    if start <= (hi if hi < last else last):
+        return start, None
+    if through and lo == hi + 1 and first <= lo <= last:
+        # The last condition to start holding is when they touch, and every other one has to still hold then.
+        # Compared as whole numbers, -a/b against -c/d is -a*d against -c*b since b and d are positive
+        num, den = None, 1
+        for conditions in axes:
+            for a, b in conditions:
+                if b > 0 and (num is None or -a * den > num * b):
+                    num, den = -a, b
+        for conditions in axes:
+            for a, b in conditions:
+                if b < 0 and num * -b >= a * den:
+                    return None
+        return lo, (num, den)
+    return None
+
+# num / den rounded to the nearest whole number, halves to the even one like round() does, den is positive
+def round_ratio(num:int, den:int) -> int:
+    whole, rest = divmod(num, den)
+    if 2 * rest > den or (2 * rest == den and whole % 2):
+        whole += 1
+    return whole
+
+# Author:  Daniel Krutsick
+# Purpose:  One match worth of world state, stepped one frame at a time with the same rules as playGame()
+# Pre:  Screen dimensions match the ones the clients are drawing with (640x480 by default)
+# Post:  After each step(), bounced and scored tell the caller which sounds to play that frame
+class PongSim:
+    def __init__(self, screenWidth:int = 640, screenHeight:int = 480) -> None:
+        self.screenWidth = screenWidth
+        self.screenHeight = screenHeight
+        self.topWall = pygame.Rect(-10, 0, screenWidth+20, 10)
+        self.bottomWall = pygame.Rect(-10, screenHeight-10, screenWidth+20, 10)
+
+        paddleHeight = 50
+        paddleWidth = 10
+        paddleStartPosY = (screenHeight/2)-(paddleHeight/2)
+        self.leftPaddle = Paddle(pygame.Rect(10, paddleStartPosY, paddleWidth, paddleHeight))
+        self.rightPaddle = Paddle(pygame.Rect(screenWidth-20, paddleStartPosY, paddleWidth, paddleHeight))
+        self.paddles = {"left": self.leftPaddle, "right": self.rightPaddle}
+        self.paddlePair = (self.leftPaddle, self.rightPaddle) # Made once, move_paddles() runs every frame
+        self.ball = Ball(pygame.Rect(screenWidth/2, screenHeight/2, 5, 5), -5, 0)
+        # Where the ball can be without scoring or touching a wall, for advance(): its x between the two edges
+        # and its top and bottom between the walls. The paddles are checked on their own
+        self.openArea = (0, self.topWall.bottom, screenWidth, self.bottomWall.top)
+        # Between these two x the ball can not touch a paddle at all
+        self.betweenPaddles = (self.leftPaddle.rect.right, self.rightPaddle.rect.left)
+        # Below these speeds (x, y) every tick the ball touches something it overlaps it, so nothing can be
+        # passed through and advance() can simply check every tick like step() does
+        ballRect = self.ball.rect
+        self.sweepSpeed = (paddleWidth + ballRect.w, min(self.topWall.h + ballRect.h, paddleHeight + ballRect.h - self.leftPaddle.speed))
+
+        self.lScore = 0
+        self.rScore = 0
+        self.tick = 0
+        self.bounced = False
+        self.scored = False
+
+    # Sets which way a paddle is moving, "up", "down" or "" to stop, like the KEYDOWN/KEYUP handling
+    def set_input(self, side:str, moving:str) -> None:
+        if side in self.paddles and moving in ("up", "down", ""):
+            self.paddles[side].moving = moving
+
+    def is_over(self) -> bool:
+        return self.lScore > WIN_SCORE or self.rScore > WIN_SCORE
+
+    def move_paddles(self) -> None:
+        for paddle in self.paddlePair:
+            if paddle.moving == "down":
+                if paddle.rect.bottom < self.screenHeight-10:
+                    paddle.rect.y += paddle.speed
+            elif paddle.moving == "up":
+                if paddle.rect.top > 10:
+                    paddle.rect.y -= paddle.speed
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Advances the match by one frame: paddles, ball, scoring, then paddle and wall bounces
+    # Pre:  The game is not over, calling step() after is_over() only counts the tick
+    # Post:  tick is one higher and the world matches what one playGame() frame would have produced
+    def step(self) -> None:
+        self.tick += 1
+        self.move_paddles()
+        if self.is_over():
+            self.bounced = False
+            self.scored = False
+            return
+        self.step_ball()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  The ball half of step(), also used on its own by playGame() which moves the paddles itself
+    # Pre:  The paddles are where they should be for this frame
+    # Post:  The ball has moved, bounced and scored exactly like one playGame() frame, bounced and scored are set
+    def step_ball(self) -> None:
+        self.bounced = False
+        self.scored = False
+        self.ball.updatePos()
+        self.resolve_ball()
+
+    # The rest of step_ball() after the ball has moved, scoring then paddle and wall bounces. Only ever
+    # sets bounced and scored, so advance() can run it several times in one step
+    def resolve_ball(self) -> None:
+        ball = self.ball
+
+        # If the ball makes it past the edge of the screen, update score and serve again
+        if ball.rect.x > self.screenWidth:
+            self.lScore += 1
+            self.scored = True
+            ball.reset(nowGoing="right")
+        elif ball.rect.x < 0:
+            self.rScore += 1
+            self.scored = True
+            ball.reset(nowGoing="left")
+
+        if ball.rect.colliderect(self.leftPaddle.rect):
+            self.bounced = True
+            ball.hitPaddle(self.leftPaddle.rect.centery)
+        elif ball.rect.colliderect(self.rightPaddle.rect):
+            self.bounced = True
+            ball.hitPaddle(self.rightPaddle.rect.centery)
+
+        if ball.rect.colliderect(self.topWall) or ball.rect.colliderect(self.bottomWall):
+            self.bounced = True
+            ball.hitWall()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Advances the match by ticks frames in one go, with each paddle's input held the whole time
+    # Pre:  ticks is 1 or more
+    # Post:  The world is the same as after calling step() ticks times. bounced and scored are set if the
+    #        ball bounced or someone scored on any of those ticks. The ball is moved straight to each tick
+    #        something happens on instead of through every tick in between
+    def advance(self, ticks:int) -> None:
+        self.bounced = False
+        self.scored = False
+        self.tick += ticks
+        ball = self.ball
+        rect = ball.rect
+        # Nearly every step the ball touches nothing, then only the paddles' end positions are needed
+        if self.lScore <= WIN_SCORE and self.rScore <= WIN_SCORE and self.sweep_clear(ticks):
+            rect.x += ball.xVel * ticks
+            rect.y += ball.yVel * ticks
+            # paddle_plan()'s end position, without making the plan
+            for paddle in self.paddlePair:
+                moving = paddle.moving
+                if moving:
+                    prect = paddle.rect
+                    speed = paddle.speed
+                    room = self.screenHeight - 10 - prect.bottom if moving == "down" else prect.y - 10
+                    if room > 0:
+                        moves = -(-room // speed)
+                        moves = moves if moves < ticks else ticks
+                        prect.y += speed * moves if moving == "down" else -speed * moves
+            return
+        # Something is in reach, but at normal speeds it can only be hit the way step() would hit it, and the
+        # ticks are checked one by one. Exactly what step() does, only bounced and scored add up over the ticks
+        sweepX, sweepY = self.sweepSpeed
+        if -sweepX < ball.xVel < sweepX and -sweepY < ball.yVel < sweepY:
+            for _ in range(ticks):
+                self.move_paddles()
+                if not self.is_over():
+                    ball.updatePos()
+                    self.resolve_ball()
+            return
+        plans = [self.paddle_plan(paddle, ticks) for paddle in self.paddlePair]
+        done = 0 # Ticks of this step the ball has been moved through
+        while done < ticks and not self.is_over():
+            # After a bounce the rest of the step is usually clear again
+            if done and self.sweep_clear(ticks - done):
+                break
+            hit = self.first_hit(plans, done, ticks)
+            if hit is None:
+                break
+            tick, touched, what = hit
+            xVel, yVel = ball.xVel, ball.yVel
+            for paddle, y, speed, moves in plans:
+                paddle.rect.y = y + speed * min(tick, moves)
+            if touched is None:
+                rect.x += xVel * (tick - done)
+                rect.y += yVel * (tick - done)
+                self.resolve_ball()
+            else:
+                # The ball would have passed right through, so it bounces from where it touched instead
+                num, den = touched
+                rect.x = round_ratio(rect.x * den + xVel * (num - done * den), den)
+                rect.y = round_ratio(rect.y * den + yVel * (num - done * den), den)
+                self.bounced = True
+                if what is self.topWall or what is self.bottomWall:
+                    ball.hitWall()
+                else:
+                    ball.hitPaddle(what.centery)
+            done = tick
+        if done < ticks and not self.is_over():
+            rect.x += ball.xVel * (ticks - done)
+            rect.y += ball.yVel * (ticks - done)
+        for paddle, y, speed, moves in plans:
+            paddle.rect.y = y + speed * moves
+
+    # Whether the box the ball sweeps through in the next ticks ticks stays clear of the walls, the edges and
+    # every paddle grown by as far as it can move in that time. If it does, first_hit() would find nothing
+    def sweep_clear(self, ticks:int) -> bool:
+        rect = self.ball.rect
+        x, y = rect.x, rect.y
+        endX, endY = x + self.ball.xVel * ticks, y + self.ball.yVel * ticks
+        left, right = (x, endX) if x < endX else (endX, x)
+        top, bottom = (y, endY + rect.h) if y < endY else (endY, y + rect.h)
+        openLeft, openTop, openRight, openBottom = self.openArea
+        if left < openLeft or right > openRight or top < openTop or bottom > openBottom:
+            return False
+        right += rect.w
+        paddlesLeft, paddlesRight = self.betweenPaddles
+        if left >= paddlesLeft and right <= paddlesRight:
+            return True
+        for paddle in self.paddlePair:
+            prect = paddle.rect
+            reach = paddle.speed * ticks if paddle.moving else 0
+            if not (left >= prect.right or right <= prect.left or top >= prect.bottom + reach
+                    or bottom <= prect.top - reach):
+                return False
+        return True
+
+    # Where a paddle is on each tick of advance()'s step: it moves speed a tick until move_paddles() would stop
+    # it at the top or bottom, then stays put. Returns (paddle, y at the start, pixels a tick, ticks it moves)
+    def paddle_plan(self, paddle:Paddle, ticks:int) -> tuple:
+        moving = paddle.moving
+        y = paddle.rect.y
+        if not moving:
+            return paddle, y, 0, 0
+        if moving == "down":
+            speed, room = paddle.speed, self.screenHeight - 10 - paddle.rect.bottom
+        else:
+            speed, room = -paddle.speed, y - 10
+        if room <= 0:
+            return paddle, y, 0, 0
+        moves = -(-room // paddle.speed)
+        return paddle, y, speed, moves if moves < ticks else ticks
+
+    # Author:  Daniel Krutsick
+    # Purpose:  The first tick in (done, ticks] of advance()'s step that step() would have had to do something on
+    # Pre:  The ball is where it is on tick done, plans is where advance() puts the paddles on each tick
+    # Post:  Returns (tick, touched, what): touched is None when the ball overlaps what on that tick (or has
+    #        gone past an edge, then what is None), or the fraction of a tick it touched at if it passed through
+    def first_hit(self, plans:list, done:int, ticks:int) -> Optional[tuple]:
+        rect = self.ball.rect
+        xVel, yVel = self.ball.xVel, self.ball.yVel
+        w, h = rect.w, rect.h
+        # The box the ball sweeps through for the rest of the step. Nearly every step it is nowhere near
+        # anything, and only what it reaches needs the exact test
+        dx, dy = xVel * (ticks - done), yVel * (ticks - done)
+        left, right = (rect.x, rect.x + dx + w) if dx > 0 else (rect.x + dx, rect.x + w)
+        top, bottom = (rect.y, rect.y + dy + h) if dy > 0 else (rect.y + dy, rect.y + h)
+        # The ball's position on tick j of the step is (x + xVel*j, y + yVel*j)
+        x, y = rect.x - xVel * done, rect.y - yVel * done
+        found = []
+        # Only an edge the box goes past can be crossed
+        edges = []
+        if left < 0:
+            edges.append((-x, -xVel))
+        if right - w > self.screenWidth:
+            edges.append((x - self.screenWidth, xVel))
+        for edge in edges:
+            hit = first_contact([[edge]], done + 1, ticks)
+            if hit is not None:
+                found.append((hit[0], None, None))
+        for wall in (self.topWall, self.bottomWall):
+            if top >= wall.bottom or bottom <= wall.top:
+                continue
+            hit = first_contact([[(wall.right - x, -xVel), (x + w - wall.left, xVel)], [(wall.bottom - y, -yVel), (y + h - wall.top, yVel)]],
+                                done + 1, ticks)
+            if hit is not None:
+                found.append((hit[0], hit[1], wall))
+        for paddle, start, speed, moves in plans:
+            prect = paddle.rect
+            end = start + speed * moves
+            if (left >= prect.right or right <= prect.left or top >= (end if speed > 0 else start) + prect.h
+                    or bottom <= (start if speed > 0 else end)):
+                continue
+            across = [(prect.right - x, -xVel), (x + w - prect.left, xVel)]
+            # While moving the paddle's top is start + speed*j, after that it stays at start + speed*moves.
+            # A paddle that moves the whole step has no second piece
+            if not speed or not moves:
+                pieces = ((start, 0, ()),)
+            elif moves >= ticks:
+                pieces = ((start, speed, ()),)
+            else:
+                pieces = ((start, speed, ((moves + 1, -1),)), (end, 0, ((-moves, 1),)))
+            for paddleTop, move, during in pieces:
+                hit = first_contact((across, ((paddleTop + prect.h - y, move - yVel), (y + h - paddleTop, yVel - move)), during),
+                                    done + 1, ticks)
+                if hit is not None:
+                    found.append((hit[0], hit[1], prect))
+        if not found:
+            return None
+        # A pass through happened when the ball touched, before the tick it is caught on
+        return min(found, key=lambda hit: hit[0] if hit[1] is None else hit[1][0] / hit[1][1])
+
+    # Describes the world as the two game states the clients already know how to read, one per paddle,
+    # both stamped with the same tick so neither side looks more up to date than the other
+    def states(self) -> tuple:
+        ball = self.ball.rect
+        return (
+            GameState("left", self.leftPaddle.rect.y, ball.x, ball.y, self.lScore, self.rScore, self.tick),
+            GameState("right", self.rightPaddle.rect.y, ball.x, ball.y, self.lScore, self.rScore, self.tick),
+        )
+
+# Author:  Daniel Krutsick
+# Purpose:  AI paddle input that follows the ball, aiming to hit it a random distance off center so the
+#           return comes back at an angle and rallies do not go on forever
+# Pre:  side is "left" or "right", seed makes the aim repeatable for soak tests and benchmarks
+# Post:  Called once per tick, returns which way the paddle should move
+class ChaseBot:
+    def __init__(self, side:str, deadZone:int = 4, maxAim:int = 20, seed:Optional[int] = None) -> None:
+        self.side = side
+        self.deadZone = deadZone
+        self.maxAim = maxAim
+        self.rng = random.Random(seed)
+        self.aim = 0
+        self.lastXVel = 0
+
+    def __call__(self, sim:PongSim) -> str:
+        ball = sim.ball
+        # A new aim each time the ball turns around, so every return is a little different
+        if ball.xVel != self.lastXVel:
+            self.lastXVel = ball.xVel
+            self.aim = self.rng.randint(-self.maxAim, self.maxAim)
+        offset = ball.rect.centery - self.aim - sim.paddles[self.side].rect.centery
+        return "down" if offset > self.deadZone else "up" if offset < -self.deadZone else ""
+
+# Author:  Daniel Krutsick
+# Purpose:  Plays back a fixed list of inputs, one per tick, for repeatable tests
+# Pre:  moves holds "up", "down" or "" entries
+# Post:  Loops back to the start once the list runs out, or stays still if loop is False
+class ScriptedInput:
+    def __init__(self, moves:Sequence[str], loop:bool = True) -> None:
+        self.moves = moves
+        self.loop = loop
+        self.index = 0
+
+    def __call__(self, sim:PongSim) -> str:
+        if not self.moves or (not self.loop and self.index >= len(self.moves)):
+            return ""
+        move = self.moves[self.index % len(self.moves)]
+        self.index += 1
+        return move
+
+# Author:  Daniel Krutsick
+# Purpose:  Plays one whole match between two controllers with no window and no frame limit
+# Pre:  left and right each take the sim and return "up", "down" or ""
+# Post:  Returns the sim once someone has won or maxTicks have gone by, check is_over() to tell which.
+#        With stepTicks above 1 the controllers are asked once every stepTicks ticks and the sim advance()s
+#        that many at a time, like a server stepping at 60 / stepTicks Hz
+def run_match(left:Callable[[PongSim], str], right:Callable[[PongSim], str], maxTicks:int = MAX_TICKS,
+              sim:Optional[PongSim] = None, stepTicks:int = 1) -> PongSim:
+    sim = sim if sim is not None else PongSim()
+    leftPaddle = sim.leftPaddle
+    rightPaddle = sim.rightPaddle
+    while sim.tick < maxTicks and not sim.is_over():
+        # Same as set_input(), without the checks, since this is the hot loop of every batch run
+        leftPaddle.moving = left(sim)
+        rightPaddle.moving = right(sim)
+        if stepTicks == 1:
+            sim.step()
+        else:
+            sim.advance(stepTicks)
+    return sim
@@ -9,13 +9,18 @@ def updateScore(lScore:int, rScore:int, screen:pygame.surface.Surface, color, sc
     textRect.center = ((screenWidth/2)+5, 50)
     return screen.blit(textSurface, textRect)
 
+# __slots__ keeps the paddles and ball to a few fixed fields with no __dict__, they are touched every frame
 class Paddle:
+    __slots__ = ("rect", "moving", "speed")
+
     def __init__(self, rect: pygame.Rect) -> None:
         self.rect = rect
         self.moving = ""
         self.speed = 5
 
 class Ball:
+    __slots__ = ("rect", "xVel", "yVel", "startXpos", "startYpos")
+
     def __init__(self, rect:pygame.Rect, startXvel:int, startYvel:int) -> None:
         self.rect = rect
         self.xVel = startXvel
@@ -29,7 +34,7 @@ class Ball:
     
     def hitPaddle(self, paddleCenter:int) -> None:
         self.xVel *= -1
-        self.yVel = (self.rect.center[1] - paddleCenter)//2
+        self.yVel = (self.rect.centery - paddleCenter)//2
     
     def hitWall(self) -> None:
         self.yVel *= -1
@@ -0,0 +1,76 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  The threaded server's matchmaking queue, players wait here until they are
+#                           paired into a match, and come back here when it ends
+# Misc:                     join() is called by the accept thread and the client threads and never takes
+#                           a lock, it only puts the connection on a SimpleQueue. Only the matchmaker
+#                           thread reads that queue and the waiting list, so pairing needs no lock either.
+#                           A new connection waits LOBBY_GRACE seconds before it can be paired, the same
+#                           chance to send WATCH:<match> that the async server gives it. A player that
+#                           asks for another match has already had that chance and is paired right away.
+# =================================================================================================
+
+import queue
+import time
+from typing import Callable
+
+LOBBY_GRACE = 0.2 # Seconds a new connection has to send WATCH:<match> before it can be given a paddle
+IDLE_WAIT = 0.5 # Longest the matchmaker sleeps with nothing to do, so it notices the server closing
+
+# Author:  Daniel Krutsick
+# Purpose:  Connections waiting for a match, paired two at a time in the order they arrived
+# Pre:  join() may be called from any thread, next_pairs() only from the one matchmaker thread (or the
+#       supervisor's loop in pongShardServer.py)
+# Post:  next_pairs() never returns a connection twice or one that placeable() turns down
+class Lobby:
+    def __init__(self, grace:float = LOBBY_GRACE) -> None:
+        self.grace = grace
+        self.arrivals = queue.SimpleQueue()
+        self.waiting = {} # connection -> time it may be paired, in the order they joined
+        self.paired = 0
+
+    # Puts a connection in the queue, grace is False for a player coming back from a match
+    def join(self, conn, grace:bool = True) -> None:
+        self.arrivals.put((conn, time.monotonic() + (self.grace if grace else 0.0)))
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    # Seconds until the next grace period still running is over, IDLE_WAIT if there is none. Someone already
+    # past their grace period can only be paired with a new arrival, so only those still running count
+    def next_wait(self) -> float:
+        now = time.monotonic()
+        return min((readyAt - now for readyAt in self.waiting.values() if readyAt > now), default=IDLE_WAIT)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Waits for connections to arrive or finish their grace period, and pairs whoever is ready
+    # Pre:  placeable(conn) says whether conn is still connected and still waiting, it is checked for
+    #       every waiting connection so one that left or started watching drops out of the queue.
+    #       wait is the longest to block, 0 for a caller that runs its own select loop around next_wait()
+    # Post:  Returns a list of (left, right) pairs, oldest first, empty if nobody was ready in time
+    def next_pairs(self, placeable:Callable[[object], bool], wait:float = IDLE_WAIT) -> list:
+        timeout = min(self.next_wait(), wait)
+        try:
+            conn, readyAt = self.arrivals.get(timeout=timeout) if timeout > 0 else self.arrivals.get_nowait()
+            self.waiting.setdefault(conn, readyAt)
+            # A burst of arrivals is taken in one go instead of one pairing pass each
+            while True:
+                conn, readyAt = self.arrivals.get_nowait()
+                self.waiting.setdefault(conn, readyAt)
+        except queue.Empty:
+            pass
+        now = time.monotonic()
+        ready = []
+        for conn, readyAt in list(self.waiting.items()):
+            if not placeable(conn):
+                del self.waiting[conn]
+            elif readyAt <= now:
+                ready.append(conn)
+        pairs = list(zip(ready[0::2], ready[1::2]))
+        for left, right in pairs:
+            del self.waiting[left]
+            del self.waiting[right]
+        self.paired += len(pairs)
+        return pairs
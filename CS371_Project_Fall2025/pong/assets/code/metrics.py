@@ -0,0 +1,309 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Counters and latency histograms for the servers, and a small HTTP endpoint
+#                           that serves them, instead of printing what the server is doing
+# Misc:                     Everything on the hot path is a plain attribute add or one bisect into a
+#                           fixed bucket list, nothing is formatted until the endpoint is scraped.
+#                           GET /metrics gives the Prometheus text format, GET /metrics.json a JSON
+#                           object, so both curl and a scraper can read it. The endpoint runs on its
+#                           own thread and only ever reads the counters, so it never blocks a relay.
+# =================================================================================================
+
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# Upper bounds in seconds, from 10 microseconds to 1 second, each about 2.5x the last
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+# Author:  Daniel Krutsick
+# Purpose:  Counts of observed values per bucket, plus their sum and the largest seen
+# Pre:  observe() may be called from any thread, a lost update under contention only makes one count off by one
+# Post:  percentile() gives the upper bound of the bucket the asked for fraction of values falls in
+class Histogram:
+    def __init__(self, bounds:tuple = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # The last bucket holds everything past the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value:float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    # observe(0.0) without the bucket search
+    def observe_zero(self) -> None:
+        self.counts[0] += 1
+        self.count += 1
+
+    # Adds another histogram's observations to this one, both must use the same bounds
+    def merge(self, other:"Histogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction:float) -> float:
+        if not self.count:
+            return 0.0
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return self.max
+
+    def summary(self) -> dict:
+        return {"count": self.count, "sum": self.total, "max": self.max,
+                "p50": self.percentile(0.5), "p99": self.percentile(0.99)}
+
+    # Prometheus histogram lines, buckets are cumulative as the format expects
+    def render(self, name:str, labels:str = "") -> list:
+        lines = []
+        seen = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {seen}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.total:.9f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+# Author:  Daniel Krutsick
+# Purpose:  A threading.Lock that also measures how long callers wait for it and how long it is held
+# Pre:  Used exactly like a threading.Lock, as a context manager or with acquire()/release()
+# Post:  wait and hold get one observation per acquire, in seconds
+class TimedLock:
+    def __init__(self, wait:Optional[Histogram] = None, hold:Optional[Histogram] = None) -> None:
+        self.lock = threading.Lock()
+        self.wait = wait if wait is not None else Histogram()
+        self.hold = hold if hold is not None else Histogram()
+        self.acquiredAt = 0.0
+
+    def acquire(self, blocking:bool = True, timeout:float = -1) -> bool:
+        # Most acquires find the lock free, those are counted as no wait without reading the clock twice
+        if self.lock.acquire(False):
+            self.acquiredAt = time.perf_counter()
+            self.wait.observe_zero()
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self.lock.acquire(True, timeout)
+        if acquired:
+            self.acquiredAt = now = time.perf_counter()
+            self.wait.observe(now - start)
+        return acquired
+
+    def release(self) -> None:
+        # Read before releasing, the next holder overwrites it
+        held = time.perf_counter() - self.acquiredAt
+        self.lock.release()
+        self.hold.observe(held)
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+# Author:  Daniel Krutsick
+# Purpose:  What the server knows about one connection that the fan-out queue does not already count
+# Pre:  Updated only by the code reading from that connection
+# Post:  Read by the endpoint next to the connection's PeerQueue stats
+class ConnStats:
+    def __init__(self, name:str) -> None:
+        self.name = name
+        self.framesIn = 0
+        self.bytesIn = 0
+        self.parseFailures = 0 # Lines that were neither a game state nor a command the server knows
+        self.droppedBytes = 0 # Bytes the frame reader had to throw away, copied from FrameReader.dropped
+        self.connectedAt = time.time()
+
+# Author:  Daniel Krutsick
+# Purpose:  Every counter and histogram one server process keeps, and the text the endpoint serves
+# Pre:  Connections are added with add_connection() and removed when they close
+# Post:  render() and snapshot() can be called from any thread at any time
+class ServerMetrics:
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.counters = {"frames_relayed": 0, "connections_opened": 0, "connections_closed": 0, "matches_started": 0}
+        self.relayLatency = Histogram() # From a frame being read to it being queued for every peer
+        self.sendLatency = Histogram() # From a frame being queued to the socket taking it, all peers together
+        self.lockWait = Histogram() # Time spent waiting for clientsLock, threaded server only
+        self.lockHold = Histogram() # Time clientsLock is held
+        self.connections = {} # name -> (ConnStats, PeerQueue or None)
+        self.gauges = {} # name -> function returning a number, read when scraped
+
+    def add_connection(self, name:str, queue = None, stats:Optional[ConnStats] = None) -> ConnStats:
+        stats = stats if stats is not None else ConnStats(name)
+        if queue is not None:
+            queue.latency = self.sendLatency
+        self.connections[name] = (stats, queue)
+        self.counters["connections_opened"] += 1
+        return stats
+
+    def remove_connection(self, name:str) -> None:
+        if self.connections.pop(name, None) is not None:
+            self.counters["connections_closed"] += 1
+
+    def gauge(self, name:str, read:Callable[[], float]) -> None:
+        self.gauges[name] = read
+
+    def inc(self, name:str, amount:int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def histograms(self) -> dict:
+        return {"relay_latency_seconds": self.relayLatency, "send_latency_seconds": self.sendLatency,
+                "lock_wait_seconds": self.lockWait, "lock_hold_seconds": self.lockHold}
+
+    # Counters, histograms and the current gauge values as plain picklable objects, for a worker process to
+    # send its supervisor. Per connection counters are left out, they stay on each worker's own endpoint
+    def export(self) -> dict:
+        return {"counters": dict(self.counters), "histograms": self.histograms(),
+                "gauges": {name: read() for name, read in list(self.gauges.items())}}
+
+    # Adds the counters and histograms of another process's export() to this one
+    def absorb(self, part:dict) -> None:
+        for name, value in part["counters"].items():
+            self.inc(name, value)
+        histograms = self.histograms()
+        for name, histogram in part["histograms"].items():
+            if name in histograms:
+                histograms[name].merge(histogram)
+
+    # Per connection counters, the fan-out queue's included. The dict is copied first so a connection
+    # coming or going while this runs can not break the loop
+    def connection_stats(self) -> dict:
+        result = {}
+        for name, (stats, queue) in list(self.connections.items()):
+            entry = {"frames_in": stats.framesIn, "bytes_in": stats.bytesIn, "parse_failures": stats.parseFailures,
+                     "dropped_bytes": stats.droppedBytes, "connected_seconds": round(time.time() - stats.connectedAt, 3)}
+            if queue is not None:
+                q = queue.stats()
+                entry.update({"frames_out": q["sent"], "bytes_out": q["bytesSent"], "queue_depth": q["depth"],
+                              "dropped": q["dropped"], "coalesced": q["coalesced"]})
+            result[name] = entry
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "counters": dict(self.counters),
+            "gauges": {name: read() for name, read in list(self.gauges.items())},
+            "histograms": {name: h.summary() for name, h in self.histograms().items()},
+            "connections": self.connection_stats(),
+        }
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Every metric in the Prometheus text format, prefixed with pong_
+    # Pre:  None
+    # Post:  Returns the whole page as one string, per connection metrics are labelled with the peer address
+    def render(self) -> str:
+        lines = [f"pong_uptime_seconds {time.time() - self.started:.3f}"]
+        for name, value in list(self.counters.items()):
+            lines.append(f"pong_{name}_total {value}")
+        for name, read in list(self.gauges.items()):
+            lines.append(f"pong_{name} {read()}")
+        for name, histogram in self.histograms().items():
+            lines.append(f"# TYPE pong_{name} histogram")
+            lines.extend(histogram.render(f"pong_{name}"))
+        for name, entry in self.connection_stats().items():
+            label = 'peer="' + name.replace('"', "'") + '"'
+            for field, value in entry.items():
+                lines.append(f"pong_connection_{field}{{{label}}} {value}")
+        return "\n".join(lines) + "\n"
+
+# Author:  Daniel Krutsick
+# Purpose:  The metrics of a supervisor and all of its worker processes served as one, for pongShardServer.py
+# Pre:  update() is given each worker's newest export(), retire() is called when a worker is replaced
+# Post:  render() and snapshot() add up the supervisor's own metrics, every live worker's last report and
+#        the final report of every retired worker, so counters never go backwards when a worker restarts
+class MergedMetrics:
+    def __init__(self, own:ServerMetrics) -> None:
+        self.own = own
+        self.parts = {} # worker name -> its last export()
+        self.retired = ServerMetrics() # Counters and histograms of workers that are gone
+
+    def update(self, name:str, part:dict) -> None:
+        self.parts[name] = part
+
+    def retire(self, name:str) -> None:
+        part = self.parts.pop(name, None)
+        if part is not None:
+            self.retired.absorb(part)
+
+    # One ServerMetrics holding the sum, gauges of the workers are added up by name next to the supervisor's own
+    def merged(self) -> ServerMetrics:
+        total = ServerMetrics()
+        total.started = self.own.started
+        total.absorb(self.own.export())
+        total.absorb(self.retired.export())
+        total.connections = self.own.connections
+        total.gauges = dict(self.own.gauges)
+        sums = {}
+        for part in list(self.parts.values()):
+            total.absorb(part)
+            for name, value in part["gauges"].items():
+                sums[name] = sums.get(name, 0) + value
+        for name, value in sums.items():
+            total.gauges["workers_" + name] = lambda value=value: value
+        return total
+
+    def snapshot(self) -> dict:
+        return self.merged().snapshot()
+
+    def render(self) -> str:
+        return self.merged().render()
+
+# Answers GET /metrics and /metrics.json from the ServerMetrics the endpoint was started with
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics: Optional[ServerMetrics] = None
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path in ("/", "/metrics"):
+            body = self.metrics.render().encode('utf-8')
+            contentType = "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body = json.dumps(self.metrics.snapshot(), indent=1).encode('utf-8')
+            contentType = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Scrapes are not worth a line in the server's output each
+    def log_message(self, format, *args) -> None:
+        pass
+
+# Author:  Daniel Krutsick
+# Purpose:  Serves metrics over HTTP on a daemon thread, next to either server mode
+# Pre:  host and port are free, port 0 picks any free port (read it back from the returned server)
+# Post:  Returns the running ThreadingHTTPServer, call shutdown() on it to stop
+def start_metrics_endpoint(metrics:ServerMetrics, host:str, port:int) -> ThreadingHTTPServer:
+    handler = type("BoundMetricsHandler", (MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,476 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Client netcode, so what playGame() draws no longer jumps around whenever
+#                           game states arrive late or bunched up
+# Misc:                     Remote things (the opponent paddle, and the ball when the server runs the
+#                           physics) are drawn a little in the past, between two states that have both
+#                           already arrived. The player's own paddle is moved right away when a key is
+#                           pressed, and when the server owns the physics it is corrected against the
+#                           server's position with any inputs the server has not applied yet replayed.
+#                           StateMailbox hands states from the receive threads to playGame() without a
+#                           queue that has to be drained every frame, and StateSender takes the sends off
+#                           the frame loop the same way in the other direction. When the clients run the
+#                           physics, BallAuthority moves the ball on the shared match clock (clockSync.py).
+# =================================================================================================
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from assets.code.wireProtocol import GameState
+
+INTERP_DELAY = 0.1 # Seconds remote things are drawn behind the newest state, covers most jitter under 150 ms RTT
+MAX_EXTRAPOLATE = 0.05 # Seconds past the newest state we will guess ahead before holding still
+CLOCK_WINDOW = 120 # States used to work out the sender's clock, about two seconds at 60 Hz
+SNAP_DISTANCE = 100 # A ball that moved further than this between two states was served again, not moving
+SEND_RATE = 60 # Most writes a second the sender makes, one per frame, while the link keeps up
+MIN_SEND_RATE = 20 # Fewest writes a second, at 60 frames a second that is 3 inputs to a write (the server keeps 6)
+KEEPALIVE = 0.5 # Seconds an unchanged state is held back before it is sent again anyway
+QUEUE_DELAY = 0.05 # Seconds of round trip over the lowest one seen that means packets are queueing up somewhere
+SEND_STALL = 0.005 # Seconds a write may block before the socket's buffer counts as full
+RATE_STEP = 10 # Writes a second the rate grows by for every second the link keeps up
+MAX_CATCHUP = 12 # Most match ticks the ball is moved in one frame, a longer gap (a window being dragged) is skipped
+VELOCITY_TICKS = 4 # Two of the other player's states at most this many ticks apart give the ball's speed
+
+# Author:  Jacob Blankenship
+# Purpose:  Timestamped buffer of the game states for one remote paddle side
+# Pre:  Every state pushed carries the sender's tick in its time field, 60 ticks to the second
+# Post:  sample() gives the state as it was INTERP_DELAY ago on the sender's clock, blended between the
+#        two states either side of that moment
+class SnapshotBuffer:
+    def __init__(self, tickRate:int = 60, delay:float = INTERP_DELAY, size:int = 64) -> None:
+        self.tickRate = tickRate
+        self.delay = delay
+        self.snapshots = deque(maxlen=size) # (tick, state), oldest first
+        self.offsets = deque(maxlen=CLOCK_WINDOW)
+        self.offset: Optional[float] = None # Local time the sender's tick 0 would have arrived with no delay
+
+    # Adds a state as it arrives, states older than the newest one we have are late and are skipped
+    def push(self, state:GameState, now:Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        if self.snapshots and state.time <= self.snapshots[-1][0]:
+            # A tick far behind the newest means the sender started counting again, anything else is just late
+            if self.snapshots[-1][0] - state.time < self.tickRate:
+                return
+            self.snapshots.clear()
+            self.offsets.clear()
+        self.snapshots.append((state.time, state))
+        # The state that took the least time to arrive shows the real clock difference, the rest is jitter
+        self.offsets.append(now - state.time / self.tickRate)
+        self.offset = min(self.offsets)
+
+    def latest(self) -> Optional[GameState]:
+        return self.snapshots[-1][1] if self.snapshots else None
+
+    # Author:  Jacob Blankenship
+    # Purpose:  The remote state to draw this frame
+    # Pre:  Called once per rendered frame
+    # Post:  Returns None until something has been pushed. Scores come from the older of the two states,
+    #        so a point is never shown before the ball has actually reached the edge
+    def sample(self, now:Optional[float] = None) -> Optional[GameState]:
+        if not self.snapshots:
+            return None
+        if now is None:
+            now = time.monotonic()
+        renderTick = (now - self.offset - self.delay) * self.tickRate
+        oldTick, old = self.snapshots[0]
+        if renderTick <= oldTick:
+            return old
+        newTick, new = self.snapshots[-1]
+        if renderTick >= newTick:
+            if len(self.snapshots) < 2 or renderTick - newTick > MAX_EXTRAPOLATE * self.tickRate:
+                return new
+            # Nothing newer has arrived yet, keep going the way the last two states were heading
+            oldTick, old = self.snapshots[-2]
+            return self.blend(old, new, (renderTick - oldTick) / (newTick - oldTick), int(renderTick))
+        for tick, state in reversed(self.snapshots):
+            if tick <= renderTick:
+                oldTick, old = tick, state
+                break
+            newTick, new = tick, state
+        return self.blend(old, new, (renderTick - oldTick) / (newTick - oldTick), int(renderTick))
+
+    @staticmethod
+    def blend(old:GameState, new:GameState, t:float, tick:int) -> GameState:
+        pos = round(old.pos + (new.pos - old.pos) * t)
+        if abs(new.bx - old.bx) > SNAP_DISTANCE or abs(new.by - old.by) > SNAP_DISTANCE:
+            # Sliding the ball back across the court after a point would look like a second ball
+            bx, by = (old.bx, old.by) if t < 1 else (new.bx, new.by)
+        else:
+            bx = round(old.bx + (new.bx - old.bx) * t)
+            by = round(old.by + (new.by - old.by) * t)
+        scores = old if t < 1 else new
+        return GameState(old.name, pos, bx, by, scores.lscore, scores.rscore, tick)
+
+# Author:  Jacob Blankenship
+# Purpose:  Moves the player's own paddle as soon as its input is read, and lines it back up with the
+#           server's position without throwing away the inputs the server has not seen yet
+# Pre:  apply() is called once per frame with the paddle's moving value, and its return value is sent
+#       to the server as the input sequence number
+# Post:  paddle.rect.y always shows where the paddle will be once the server catches up to our inputs
+class PaddlePredictor:
+    def __init__(self, paddle, screenHeight:int, size:int = 120) -> None:
+        self.paddle = paddle
+        self.screenHeight = screenHeight
+        self.history = deque(maxlen=size) # (sequence number, moving) the server has not acknowledged
+        self.seq = 0
+        self.corrections = 0
+
+    # One frame of paddle movement, the same rule playGame() and PongSim use
+    def move(self, y:int, moving:str) -> int:
+        if moving == "down":
+            if y + self.paddle.rect.height < self.screenHeight-10:
+                y += self.paddle.speed
+        elif moving == "up":
+            if y > 10:
+                y -= self.paddle.speed
+        return y
+
+    def apply(self, moving:str) -> int:
+        self.seq += 1
+        self.history.append((self.seq, moving))
+        self.paddle.rect.y = self.move(self.paddle.rect.y, moving)
+        return self.seq
+
+    # Starts from the server's position after it applied ackedSeq and replays every input since
+    def reconcile(self, serverY:int, ackedSeq:int) -> None:
+        while self.history and self.history[0][0] <= ackedSeq:
+            self.history.popleft()
+        y = serverY
+        for _, moving in self.history:
+            y = self.move(y, moving)
+        if y != self.paddle.rect.y:
+            self.corrections += 1
+            self.paddle.rect.y = y
+
+# Author:  Jacob Blankenship
+# Purpose:  Game states from the receive threads to playGame(), already parsed, with only the newest one
+#           per side kept for reading and a short ring of recent ones for each side's interpolation buffer
+# Pre:  The publish methods are only called by receive threads, take(), recent() and drain() only by playGame()
+# Post:  take() is O(1) and recent() never returns more than size states, however many arrived since the
+#        last frame, so a burst after a stall costs the same as a normal frame. Nothing here takes a lock,
+#        every write is one assignment or one deque append, which are atomic in CPython
+class StateMailbox:
+    def __init__(self, size:int = 16) -> None:
+        self.latest = {"left": None, "right": None} # side -> (state, the input ack that came before it)
+        self.seen = {"left": None, "right": None} # The latest entry take() last returned, only used by playGame()
+        self.rings = {"left": deque(maxlen=size), "right": deque(maxlen=size)}
+        self.ack = 0
+        self.score: Optional[tuple] = None
+        self.ended = False # The server sent END, the other player left or asked for a new match
+        self.published = 0
+
+    # Forgets the last match, called when START for the next one arrives. Anything published after this
+    # belongs to the new match, since the server sends START before any of its states
+    def clear(self) -> None:
+        for side in self.latest:
+            self.latest[side] = None
+            self.seen[side] = None
+            self.rings[side].clear()
+        self.ack = 0
+        self.score = None
+        self.ended = False
+
+    # The server has applied our inputs up to seq as of the states that follow
+    def publish_ack(self, seq:int) -> None:
+        self.ack = seq
+
+    def publish_end(self) -> None:
+        self.ended = True
+
+    def publish_score(self, lScore:int, rScore:int) -> None:
+        self.score = (lScore, rScore)
+
+    def publish(self, state:GameState) -> None:
+        if state.name not in self.latest:
+            return
+        # The ack is stored with the state so playGame() never pairs a new ack with an older position
+        self.latest[state.name] = (state, self.ack)
+        self.rings[state.name].append(state)
+        self.published += 1
+
+    # The newest state for side and its ack, or (None, ack) if nothing new arrived since the last call
+    def take(self, side:str) -> tuple:
+        entry = self.latest[side]
+        if entry is None or entry is self.seen[side]:
+            return None, self.ack
+        self.seen[side] = entry
+        return entry
+
+    # Every state for side that arrived since the last call, oldest first, at most size of them
+    def recent(self, side:str) -> list:
+        states = []
+        self.drain(side, states.append)
+        return states
+
+    # recent() without building a list, each state is handed to push instead. Returns how many there were
+    def drain(self, side:str, push:Callable[[GameState], None]) -> int:
+        ring = self.rings[side]
+        count = len(ring)
+        for _ in range(count):
+            push(ring.popleft())
+        return count
+
+# Author:  Daniel Krutsick
+# Purpose:  The server's side of prediction, numbered paddle inputs waiting for a tick. One is used per
+#           tick, the same one input per frame the client predicted with, so bunched up inputs are not lost
+# Pre:  push() is given each IN line's direction and sequence number as it arrives
+# Post:  take() returns the next input for this tick, or None if none arrived and the paddle keeps going
+class InputQueue:
+    def __init__(self, maxBacklog:int = 6) -> None:
+        self.pending = deque()
+        self.maxBacklog = maxBacklog
+        self.lastSeq = 0
+
+    def push(self, seq:int, moving:str) -> None:
+        if seq <= self.lastSeq or (self.pending and seq <= self.pending[-1][0]):
+            return
+        self.pending.append((seq, moving))
+        # A backlog only adds delay, past a few frames of it the oldest inputs are skipped
+        while len(self.pending) > self.maxBacklog:
+            self.pending.popleft()
+
+    def take(self) -> Optional[tuple]:
+        if not self.pending:
+            return None
+        seq, moving = self.pending.popleft()
+        self.lastSeq = seq
+        return seq, moving
+
+# Whether two states only differ in their tick, compared field by field so no slices are made
+def same_state(a:GameState, b:GameState) -> bool:
+    return (a.pos == b.pos and a.bx == b.bx and a.by == b.by and a.lscore == b.lscore and a.rscore == b.rscore
+            and a.name == b.name)
+
+# Author:  Jacob Blankenship
+# Purpose:  Sends the client's game states and inputs from its own thread, so a slow frame never holds up
+#           the network and a slow network never holds up a frame
+# Pre:  playGame() calls offer() with its newest state or push() with each input, both only store it. write
+#       sends bytes to the server and encode turns a GameState into bytes in the format agreed on
+# Post:  At most rate writes a second. Only the newest offered state goes out and one that has not changed
+#        (apart from its tick) is skipped until KEEPALIVE passes, while pushed inputs all go out, everything
+#        due joined into one write. The rate is halved, at most once a round trip, while the round trip grows
+#        past QUEUE_DELAY over the lowest seen or a write blocks, and grows back by RATE_STEP a second otherwise.
+#        failed is set once a write fails and the thread ends
+class StateSender(threading.Thread):
+    def __init__(self, write:Callable[[bytes], None], side:str, encode:Optional[Callable[[GameState], bytes]] = None,
+                 rate:float = SEND_RATE, minRate:float = MIN_SEND_RATE) -> None:
+        super().__init__(daemon=True)
+        self.write = write
+        self.side = side
+        self.encode = encode
+        self.maxRate = rate
+        self.minRate = min(minRate, rate)
+        self.rate = rate
+        self.state: Optional[GameState] = None # The newest offered state, replaced by every offer()
+        self.inputs = deque() # (key, bytes) waiting to go out, every one of them is sent
+        self.wake = threading.Event()
+        self.running = True
+        self.failed = False
+        # When each input (by sequence number) and state (by tick) was written, until the server echoes it. Kept
+        # apart because a tick and a sequence number can be the same number, and an echo of one is no ack of the other
+        self.sentAt = {}
+        self.stateSentAt = {}
+        self.sentLock = threading.Lock() # The receive thread takes from these while this one trims them
+        self.rtt: Optional[float] = None # Smoothed round trip in seconds
+        self.minRtt: Optional[float] = None
+        self.lastCut = 0.0
+        self.offered = 0
+        self.writes = 0
+        self.skipped = 0
+        self.cuts = 0
+
+    def offer(self, state:GameState) -> None:
+        self.state = state
+        self.offered += 1
+        self.wake.set()
+
+    # An input that has to reach the server, key is what the server echoes back for it (its sequence number)
+    def push(self, data:bytes, key = None) -> None:
+        self.inputs.append((key, data))
+        self.wake.set()
+
+    # Called by a receive thread when the server acks an input (key is its sequence number) or echoes our own
+    # state (state is True and key is its tick), for the round trip
+    def echoed(self, key, state:bool = False) -> None:
+        with self.sentLock:
+            sentAt = (self.stateSentAt if state else self.sentAt).pop(key, None)
+        if sentAt is None:
+            return
+        sample = time.perf_counter() - sentAt
+        self.minRtt = sample if self.minRtt is None else min(self.minRtt, sample)
+        self.rtt = sample if self.rtt is None else self.rtt * 0.875 + sample * 0.125
+
+    def stop(self) -> None:
+        self.running = False
+        self.wake.set()
+
+    # Halves the rate while the link backs up, and grows it back a little for every write that went out fine
+    def adapt(self, now:float, blocked:float) -> None:
+        queueing = self.rtt is not None and self.rtt > self.minRtt + QUEUE_DELAY
+        if blocked > SEND_STALL or queueing:
+            # One cut per round trip, the writes since the last cut have not had time to show any effect
+            if now - self.lastCut > max(self.rtt or 0.0, 0.1):
+                self.rate = max(self.minRate, self.rate / 2)
+                self.lastCut = now
+                self.cuts += 1
+        else:
+            self.rate = min(self.maxRate, self.rate + RATE_STEP / self.rate)
+
+    def run(self) -> None:
+        nextSend = 0.0
+        lastWrite = 0.0
+        seen = None # The offered state last looked at, so the same one is not encoded twice
+        sent = None # The state last written
+        keys = [] # What goes into one write, emptied and reused every time
+        parts = []
+        stateKey = None # The tick of the state in this write, if there is one
+        while self.running:
+            self.wake.wait(KEEPALIVE)
+            self.wake.clear()
+            now = time.perf_counter()
+            if now < nextSend:
+                time.sleep(nextSend - now)
+                now = time.perf_counter()
+            keys.clear()
+            parts.clear()
+            stateKey = None
+            while self.inputs:
+                key, data = self.inputs.popleft()
+                keys.append(key)
+                parts.append(data)
+            state = self.state
+            if state is not None and (state is not seen or now - lastWrite >= KEEPALIVE):
+                seen = state
+                if sent is not None and same_state(state, sent) and now - lastWrite < KEEPALIVE:
+                    self.skipped += 1
+                else:
+                    data = self.encode(state)
+                    if data:
+                        stateKey = state.time
+                        parts.append(data)
+                        sent = state
+            if not parts:
+                continue
+            start = time.perf_counter()
+            try:
+                self.write(b"".join(parts))
+            except OSError:
+                self.failed = True
+                return
+            done = time.perf_counter()
+            with self.sentLock:
+                for key in keys:
+                    if key is not None:
+                        self.sentAt[key] = start
+                if stateKey is not None:
+                    self.stateSentAt[stateKey] = start
+                # Anything the server never echoes (a state it coalesced away) is forgotten after a while
+                for sentAt in (self.sentAt, self.stateSentAt):
+                    while len(sentAt) > 256:
+                        del sentAt[next(iter(sentAt))]
+            self.writes += 1
+            lastWrite = done
+            self.adapt(done, done - start)
+            nextSend = now + 1 / self.rate
+
+    def stats(self) -> dict:
+        return {"offered": self.offered, "writes": self.writes, "skipped": self.skipped, "rate": round(self.rate, 1),
+                "cuts": self.cuts, "rttMs": round(self.rtt * 1000, 2) if self.rtt is not None else None}
+
+# Author:  Jacob Blankenship
+# Purpose:  Decides where the ball comes from when the clients run the physics. Both clients step the ball
+#           once per match tick, but whoever's half it is on has the final say, so the player whose paddle
+#           it is heading for decides if it was hit. The other player's states are checked against where our
+#           ball was at the same match tick, and only one that disagrees moves it
+# Pre:  sim is the client's PongSim, clock its ClockSync, and states from the other player are stamped with
+#       match ticks. take() is given the other player's newest state (or None) once per frame, then step()
+# Post:  The ball is moved once per match tick however fast either window draws, so two machines with
+#        different frame rates no longer fight over it. bounced and scored say which sounds to play
+class BallAuthority:
+    def __init__(self, sim, side:str, clock, size:int = 120) -> None:
+        self.sim = sim
+        self.side = side
+        self.clock = clock
+        self.tick = clock.tick() # The match tick the ball is at
+        self.history = deque(maxlen=size) # (tick, x, y, lScore, rScore) of the ball after each step, oldest first
+        self.last: Optional[GameState] = None # The other player's newest state that was looked at
+        self.claimed = -1 # The last match tick the ball was on our half, the other player's states up to it are stale
+        self.hit = False # A correction since the last step() had the other player's paddle turn the ball around
+        self.bounced = False
+        self.scored = False
+        self.corrections = 0
+
+    # Whether the ball is on this player's half, an x position of None means the sim's ball
+    def owns(self, x:Optional[int] = None) -> bool:
+        ball = self.sim.ball.rect
+        centerX = (ball.x if x is None else x) + ball.width / 2
+        half = self.sim.screenWidth / 2
+        return centerX < half if self.side == "left" else centerX >= half
+
+    # Returns True if state moved the ball
+    def take(self, state:Optional[GameState]) -> bool:
+        if state is None or self.owns():
+            return False
+        last = self.last
+        # Older than one already looked at or than the ball leaving our half, or with the ball on our half, which is ours to decide
+        if (last is not None and state.time <= last.time) or state.time <= self.claimed or self.owns(state.bx):
+            return False
+        self.last = state
+        for tick, x, y, lScore, rScore in reversed(self.history):
+            if tick < state.time:
+                break
+            if tick == state.time:
+                if (x, y, lScore, rScore) == (state.bx, state.by, state.lscore, state.rscore):
+                    return False
+                break
+        # Our ball went somewhere else, the other player's paddle (or a point) says where it really is
+        sim = self.sim
+        ball = sim.ball
+        xVel = ball.xVel
+        if (state.lscore, state.rscore) != (sim.lScore, sim.rScore) and abs(state.bx - ball.startXpos) <= SNAP_DISTANCE:
+            # A point was scored, the ball was served again the way Ball.reset() does it
+            ball.xVel = 5 if state.lscore > sim.lScore else -5
+            ball.yVel = 0
+        elif last is not None and 0 < state.time - last.time <= VELOCITY_TICKS and abs(state.bx - last.bx) <= SNAP_DISTANCE:
+            # The states carry no speed, but two close together on the same timeline show it
+            ticks = state.time - last.time
+            ball.xVel = round((state.bx - last.bx) / ticks) or ball.xVel
+            ball.yVel = round((state.by - last.by) / ticks)
+            self.hit = self.hit or ball.xVel * xVel < 0
+        ball.rect.x = state.bx
+        ball.rect.y = state.by
+        sim.lScore = state.lscore
+        sim.rScore = state.rscore
+        # Stepped again from the state's tick up to now
+        while self.history and self.history[-1][0] >= state.time:
+            self.history.pop()
+        self.history.append((state.time, state.bx, state.by, state.lscore, state.rscore))
+        self.tick = state.time
+        self.corrections += 1
+        return True
+
+    # Moves the ball up to the match tick the clock shows now, one sim step per tick
+    def step(self) -> None:
+        now = self.clock.tick()
+        ticks = min(now - self.tick, MAX_CATCHUP)
+        # A clock that was just corrected backwards holds the ball still instead of stepping it twice
+        self.tick = max(self.tick, now)
+        sim = self.sim
+        ball = sim.ball.rect
+        bounced = self.hit
+        scored = False
+        for tick in range(self.tick - ticks + 1, self.tick + 1):
+            if self.owns():
+                self.claimed = tick
+            sim.step_ball()
+            self.history.append((tick, ball.x, ball.y, sim.lScore, sim.rScore))
+            bounced = bounced or sim.bounced
+            scored = scored or sim.scored
+        self.hit = False
+        self.bounced = bounced
+        self.scored = scored
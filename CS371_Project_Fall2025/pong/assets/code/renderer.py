@@ -0,0 +1,131 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Draws the Pong screen for playGame() by only touching what moved, instead
+#                           of clearing and redrawing the whole window and re-rendering the score
+#                           text every frame
+# Misc:                     The walls and center line are drawn once onto a background surface, and
+#                           moving things are erased by copying the background back over where they
+#                           were last frame. Score text is rendered once per score and kept.
+#                           Only the rectangles that changed are passed to pygame.display.update().
+#                           An overlay (the F3 frame profiler) is drawn last and sent in the same update.
+#                           The rect copies and the dirty list are kept and refilled, so drawing a frame
+#                           makes no new lists or Rect copies once the first two frames are drawn.
+# =================================================================================================
+
+from typing import Optional, Sequence
+
+import pygame
+
+# Author:  Jacob Blankenship
+# Purpose:  Dirty rectangle drawing of the walls, center line, paddles, ball and score
+# Pre:  pygame.display.set_mode() has been called and screen is the surface it returned
+# Post:  Each draw() leaves the window looking exactly like the old full redraw did
+class PongRenderer:
+    def __init__(self, screen:pygame.Surface, walls:Sequence[pygame.Rect], scoreFont:pygame.font.Font,
+                 color = (255, 255, 255)) -> None:
+        self.screen = screen
+        self.scoreFont = scoreFont
+        self.color = color
+        screenWidth, screenHeight = screen.get_size()
+
+        # Everything that never moves, converted to the window's pixel format so copying it is a plain blit
+        self.background = pygame.Surface((screenWidth, screenHeight)).convert()
+        self.background.fill((0, 0, 0))
+        for y in range(0, screenHeight, 10):
+            pygame.draw.rect(self.background, color, pygame.Rect((screenWidth/2)-5, y, 5, 5))
+        for wall in walls:
+            pygame.draw.rect(self.background, color, wall)
+
+        self.scoreCache = {} # (lScore, rScore) -> (text surface, where it goes), same spot as updateScore()
+        self.scoreRect = pygame.Rect(0, 0, 0, 0)
+        self.score = None
+        self.scoreText = None # score_surface() of the score on screen, only looked up again when it changes
+        self.drawn = [] # Where each moving rect was drawn last frame, so it can be erased
+        self.current = [] # This frame's copies of the moving rects, swapped with drawn after every draw
+        self.dirty = [] # The rects handed to pygame.display.update(), emptied and refilled every frame
+        self.overlayRect: Optional[pygame.Rect] = None # Where the overlay was drawn last frame
+        self.fullRedraw = True
+        self.frames = 0
+        self.pixelsUpdated = 0
+
+    # The next draw() repaints and updates the whole window, for the first frame or after the window was covered
+    def invalidate(self) -> None:
+        self.fullRedraw = True
+
+    def score_surface(self, lScore:int, rScore:int) -> tuple:
+        key = (lScore, rScore)
+        cached = self.scoreCache.get(key)
+        if cached is None:
+            textSurface = self.scoreFont.render(f"{lScore}   {rScore}", False, self.color)
+            textRect = textSurface.get_rect()
+            textRect.center = ((self.screen.get_width()/2)+5, 50)
+            cached = self.scoreCache[key] = (textSurface, textRect)
+        return cached
+
+    # Author:  Jacob Blankenship
+    # Purpose:  Draws one frame: erases last frame's moving rects, draws the new ones and the score
+    # Pre:  moving holds the current ball and paddle rects, lScore/rScore are the scores to show, overlay
+    #       is None or (surface, position) to draw on top of everything
+    # Post:  The window is up to date, and only the rects that changed were sent to the display
+    def draw(self, moving:Sequence[pygame.Rect], lScore:int, rScore:int, overlay:Optional[tuple] = None) -> None:
+        screen = self.screen
+        background = self.background
+        score = self.score
+        scoreChanged = score is None or score[0] != lScore or score[1] != rScore
+        if scoreChanged:
+            self.scoreText = self.score_surface(lScore, rScore)
+        textSurface, textRect = self.scoreText
+        # The copies from two frames ago are updated in place, so a steady frame makes no new Rects or lists
+        drawn = self.drawn
+        current = self.current
+        if len(current) != len(moving):
+            current[:] = [pygame.Rect(rect) for rect in moving]
+        else:
+            for i in range(len(moving)):
+                current[i].update(moving[i])
+        dirty = self.dirty
+        dirty.clear()
+
+        if self.fullRedraw:
+            screen.blit(background, (0, 0))
+            dirty.append(screen.get_rect())
+        else:
+            # Anything that did not move is already on screen and does not need to be sent again
+            for rect in drawn:
+                if rect not in current:
+                    dirty.append(rect)
+                    screen.blit(background, rect, rect)
+            for rect in current:
+                if rect not in drawn:
+                    dirty.append(rect)
+            if scoreChanged:
+                screen.blit(background, self.scoreRect, self.scoreRect)
+                dirty.append(self.scoreRect)
+                dirty.append(textRect)
+            elif textRect.collidelist(dirty) != -1:
+                # Erasing a paddle or the ball can also erase part of the score, which is drawn on top
+                dirty.append(textRect)
+            if self.overlayRect is not None:
+                # Whatever is under the overlay is drawn again below, so it comes back when the overlay goes
+                screen.blit(background, self.overlayRect, self.overlayRect)
+                dirty.append(self.overlayRect)
+
+        for rect in current:
+            pygame.draw.rect(screen, self.color, rect)
+        screen.blit(textSurface, textRect)
+        self.overlayRect = None
+        if overlay is not None:
+            self.overlayRect = screen.blit(*overlay)
+            dirty.append(self.overlayRect)
+        pygame.display.update(dirty)
+
+        self.frames += 1
+        for rect in dirty:
+            self.pixelsUpdated += rect.w * rect.h
+        self.drawn, self.current = current, drawn
+        if scoreChanged:
+            self.score = (lScore, rScore)
+        self.scoreRect = textRect
+        self.fullRedraw = False
@@ -0,0 +1,232 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Match recordings, every game state a server relays for a match written to
+#                           one compressed file, and read back for pongReplay.py or for debugging desyncs
+# Misc:                     File layout, all numbers big endian:
+#                             header   "PONGRPL1", version, record size
+#                             blocks   BLOCK_HEAD then zlib compressed records, appended as they fill
+#                             index    one INDEX_ENTRY per block, then TRAILER, written by close()
+#                           A record is the payload of a binary BIN1 frame (STATE in wireProtocol.py),
+#                           so binary frames are stored without being decoded. Each block starts with
+#                           the newest state of each paddle from before it (side byte | CARRIED), so
+#                           any tick can be drawn from that one block. A recording that was never closed
+#                           has no index, the reader rebuilds it from the block headers, skipping the
+#                           compressed data, and only the block that was still filling is lost.
+# =================================================================================================
+
+import bisect
+import mmap
+import struct
+import threading
+import zlib
+from typing import Iterator, Optional
+
+from assets.code.wireProtocol import HEADER, PROTO_BINARY, SIDE_IDS, SIDES, STATE, GameState, decode_frame
+
+REPLAY_EXTENSION = ".pongreplay"
+FILE_MAGIC = b"PONGRPL1"
+FILE_VERSION = 1
+# magic, version, size of one record
+FILE_HEADER = struct.Struct("!8sHH")
+BLOCK_MAGIC = 0xB9
+# magic, first tick, last tick, records (carried ones included), compressed length
+BLOCK_HEAD = struct.Struct("!BIIHI")
+# first tick, last tick, records, offset of the block's BLOCK_HEAD
+INDEX_ENTRY = struct.Struct("!IIHQ")
+# offset of the index, blocks in it, end magic. Only a closed recording ends with this
+TRAILER = struct.Struct("!QI8s")
+TRAILER_MAGIC = b"PONGIDX1"
+CARRIED = 0x80 # Set in a record's side byte when it repeats a state from before its block
+TICK = struct.Struct("!I")
+TICK_OFFSET = STATE.size - TICK.size # The tick is the last field of a record
+BLOCK_FRAMES = 512 # Records per block, about 8.5 seconds of a match with both players sending at 60 Hz
+
+# Author:  Daniel Krutsick
+# Purpose:  Appends one match's game states to a replay file as they are relayed
+# Pre:  path can be created, record() may be called from any thread
+# Post:  After close() the file has its index and trailer, before that every full block is already on disk
+class ReplayWriter:
+    def __init__(self, path:str, blockFrames:int = BLOCK_FRAMES, level:int = 6) -> None:
+        self.path = path
+        self.blockFrames = blockFrames
+        self.level = level
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, STATE.size))
+        self.offset = FILE_HEADER.size
+        self.lock = threading.Lock() # The threaded server relays from one thread per client
+        self.pending = bytearray()
+        self.count = 0
+        self.firstTick = 0
+        self.lastTick = 0
+        self.latest = {} # side id -> newest record, carried into the next block
+        self.carried = b""
+        self.index = []
+        self.frames = 0
+
+    # Stores one relayed frame. Binary frames are copied as they are, anything else is encoded from state,
+    # which is decoded from the frame first if the caller did not already have it
+    def record(self, kind:Optional[str], frame, state:Optional[GameState] = None) -> None:
+        if kind == PROTO_BINARY and frame is not None:
+            payload = bytes(frame[HEADER.size:HEADER.size + STATE.size])
+        else:
+            if state is None:
+                state = decode_frame(kind, frame)
+                if state is None:
+                    return
+            payload = STATE.pack(SIDE_IDS[state.name], state.pos, state.bx, state.by, state.lscore, state.rscore,
+                                 state.time & 0xFFFFFFFF)
+        self.append(payload)
+
+    def append(self, payload:bytes) -> None:
+        tick = TICK.unpack_from(payload, TICK_OFFSET)[0]
+        with self.lock:
+            if self.file is None:
+                return
+            if self.count == 0:
+                self.firstTick = tick
+                self.lastTick = tick
+            elif tick > self.lastTick:
+                self.lastTick = tick
+            self.pending += payload
+            self.latest[payload[0]] = payload
+            self.count += 1
+            self.frames += 1
+            if self.count >= self.blockFrames:
+                self.write_block()
+
+    # Compresses the pending records, behind the states carried over from the last block, and appends them.
+    # Called with the lock held
+    def write_block(self) -> None:
+        if self.count == 0:
+            return
+        carriedCount = len(self.carried) // STATE.size
+        data = zlib.compress(self.carried + bytes(self.pending), self.level)
+        self.file.write(BLOCK_HEAD.pack(BLOCK_MAGIC, self.firstTick, self.lastTick, carriedCount + self.count, len(data)))
+        self.file.write(data)
+        self.index.append((self.firstTick, self.lastTick, carriedCount + self.count, self.offset))
+        self.offset += BLOCK_HEAD.size + len(data)
+        # The next block starts from the newest state of each paddle as of the end of this one
+        self.carried = b"".join(bytes([side | CARRIED]) + record[1:] for side, record in sorted(self.latest.items()))
+        self.pending = bytearray()
+        self.count = 0
+
+    # Writes out the last block, the index and the trailer. Anything recorded after this is ignored
+    def close(self) -> None:
+        with self.lock:
+            if self.file is None:
+                return
+            self.write_block()
+            indexOffset = self.offset
+            self.file.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+            self.file.write(TRAILER.pack(indexOffset, len(self.index), TRAILER_MAGIC))
+            self.file.close()
+            self.file = None
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "blocks": len(self.index), "bytes": self.offset}
+
+def record_to_state(record:tuple) -> GameState:
+    side, pos, bx, by, lscore, rscore, tm = record
+    return GameState(SIDES[side & 1], pos, bx, by, lscore, rscore, tm)
+
+# Author:  Daniel Krutsick
+# Purpose:  Reads a replay file through mmap, decompressing only the blocks that are asked for
+# Pre:  path was written by ReplayWriter, closed or not
+# Post:  states_at() jumps to any tick by decoding one block, frames() plays the recording back in order
+class ReplayReader:
+    def __init__(self, path:str) -> None:
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, recordSize = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION or recordSize != STATE.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {FILE_VERSION} Pong replay")
+        self.index = self.read_index()
+        self.complete = self.index is not None
+        if self.index is None:
+            self.index = self.scan_index()
+        # Players' ticks can arrive slightly out of order, so the search keys never go backwards
+        self.keys = []
+        for firstTick, _, _, _ in self.index:
+            self.keys.append(max(firstTick, self.keys[-1]) if self.keys else firstTick)
+        self.cachedBlock = -1
+        self.cached = None
+
+    # The index written by close(), or None if the recording was cut short
+    def read_index(self) -> Optional[list]:
+        end = len(self.data)
+        if end < FILE_HEADER.size + TRAILER.size:
+            return None
+        indexOffset, blocks, magic = TRAILER.unpack_from(self.data, end - TRAILER.size)
+        if magic != TRAILER_MAGIC or indexOffset + blocks * INDEX_ENTRY.size != end - TRAILER.size:
+            return None
+        return [INDEX_ENTRY.unpack_from(self.data, indexOffset + i * INDEX_ENTRY.size) for i in range(blocks)]
+
+    # Walks the block headers from the start of the file, stopping at the first one that is incomplete
+    def scan_index(self) -> list:
+        index = []
+        offset = FILE_HEADER.size
+        end = len(self.data)
+        while offset + BLOCK_HEAD.size <= end:
+            magic, firstTick, lastTick, count, length = BLOCK_HEAD.unpack_from(self.data, offset)
+            if magic != BLOCK_MAGIC or offset + BLOCK_HEAD.size + length > end:
+                break
+            index.append((firstTick, lastTick, count, offset))
+            offset += BLOCK_HEAD.size + length
+        return index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def first_tick(self) -> int:
+        return self.index[0][0] if self.index else 0
+
+    def last_tick(self) -> int:
+        return max((lastTick for _, lastTick, _, _ in self.index), default=0)
+
+    # Records of one block as unpacked STATE tuples, the block last asked for is kept decoded.
+    # GameStates are only built for the records handed out, most of a block is just scanned for its ticks
+    def block(self, i:int) -> list:
+        if i != self.cachedBlock:
+            offset = self.index[i][3]
+            length = BLOCK_HEAD.unpack_from(self.data, offset)[4]
+            start = offset + BLOCK_HEAD.size
+            self.cached = list(STATE.iter_unpack(zlib.decompress(self.data[start:start + length])))
+            self.cachedBlock = i
+        return self.cached
+
+    # Index of the block holding tick, the first block for ticks before the recording started
+    def find_block(self, tick:int) -> int:
+        return max(bisect.bisect_right(self.keys, tick) - 1, 0)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  The newest state of each paddle as of tick, the way a client would have drawn the match then
+    # Pre:  The recording has at least one block
+    # Post:  Returns (left, right) GameStates, either can be None before that paddle's first state
+    def states_at(self, tick:int) -> tuple:
+        newest = [None, None]
+        for record in self.block(self.find_block(tick)):
+            if not record[0] & CARRIED and record[6] > tick:
+                break
+            newest[record[0] & 1] = record
+        return tuple(record_to_state(record) if record else None for record in newest)
+
+    # Every recorded state in the order it was relayed, starting at the block that holds startTick
+    def frames(self, startTick:Optional[int] = None) -> Iterator[GameState]:
+        first = 0 if startTick is None else self.find_block(startTick)
+        for i in range(first, len(self.index)):
+            for record in self.block(i):
+                if not record[0] & CARRIED and (startTick is None or record[6] >= startTick):
+                    yield record_to_state(record)
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
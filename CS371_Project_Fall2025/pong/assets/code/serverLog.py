@@ -0,0 +1,137 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Leveled, rate limited server output, replacing print() in the servers
+# Misc:                     Log calls keep the "[TAG] message" text the servers always printed, but pass
+#                           their values as arguments (log.info("[NEW CONNECTION] %s", addr)) so nothing
+#                           is formatted for a message that is filtered out. Once setup_logging() has
+#                           run, a record is only put on a queue by the thread that logged it, and a
+#                           listener thread formats and writes it, so a slow terminal never slows a relay.
+#                           Each message template is limited to a burst per interval, the rest are
+#                           counted and reported with the next one that gets through. Debug output is
+#                           never limited, asking for it means asking for every frame. That check is made
+#                           before the logging module builds a record, so a flood of one warning costs a
+#                           dict lookup per message. Before setup_logging() only warnings reach stderr.
+# =================================================================================================
+
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+LOGGER_NAME = "pong"
+RATE_BURST = 10 # Messages with the same template allowed per interval before they are suppressed
+RATE_INTERVAL = 5.0 # Seconds
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+listener: Optional[logging.handlers.QueueListener] = None
+
+# Author:  Daniel Krutsick
+# Purpose:  Lets through at most burst messages per template per interval
+# Pre:  allow() may be called from any thread
+# Post:  Returns None for a message that should be dropped, otherwise how many were dropped since the last one
+class RateLimiter:
+    def __init__(self, burst:int = RATE_BURST, interval:float = RATE_INTERVAL) -> None:
+        self.burst = burst
+        self.interval = interval
+        self.windows = {} # template -> [window start, messages let through, messages suppressed]
+        self.lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self, template:str) -> Optional[int]:
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(template)
+            skipped = 0
+            if window is None or now - window[0] >= self.interval:
+                skipped = window[2] if window is not None else 0
+                window = self.windows[template] = [now, 0, 0]
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed += 1
+                return None
+            window[1] += 1
+            return skipped
+
+# Author:  Daniel Krutsick
+# Purpose:  The logger the servers use, debug/info/warning/error like a logging.Logger but rate limited
+# Pre:  msg is a constant template and the values go in args, the template is what gets rate limited
+# Post:  A message below the level or over its rate is dropped before anything is formatted or allocated
+class ServerLogger:
+    def __init__(self, logger:logging.Logger, limiter:RateLimiter) -> None:
+        self.logger = logger
+        self.limiter = limiter
+
+    def isEnabledFor(self, level:int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level:int, msg:str, *args) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        skipped = self.limiter.allow(msg) if level > logging.DEBUG else 0
+        if skipped is None:
+            return
+        if skipped:
+            msg = f"{msg} ({skipped} similar messages suppressed)"
+        self.logger.log(level, msg, *args, stacklevel=3)
+
+    def debug(self, msg:str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg:str, *args) -> None:
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg:str, *args) -> None:
+        self.log(logging.WARNING, msg, *args)
+
+    def error(self, msg:str, *args) -> None:
+        self.log(logging.ERROR, msg, *args)
+
+serverLogger = ServerLogger(logging.getLogger(LOGGER_NAME), RateLimiter())
+
+def get_logger() -> ServerLogger:
+    return serverLogger
+
+# The stock QueueHandler formats the message in the logging thread, this one leaves that to the
+# listener. Every argument the servers log is an immutable value or an object that outlives the record
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        return record
+
+# Author:  Daniel Krutsick
+# Purpose:  Sends the pong logger's output through a queue to a listener thread that writes it to stream
+# Pre:  Called once at startup by a server's entry point, level is a logging level or a name in LEVELS
+# Post:  Returns the logger, later calls only change the level and rate limit
+def setup_logging(level = logging.INFO, stream = None, burst:int = RATE_BURST, interval:float = RATE_INTERVAL) -> ServerLogger:
+    global listener
+    if isinstance(level, str):
+        level = LEVELS.get(level.lower(), logging.INFO)
+    serverLogger.limiter.burst = burst
+    serverLogger.limiter.interval = interval
+    log = serverLogger.logger
+    log.setLevel(level)
+    if listener is not None:
+        return serverLogger
+    output = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+    records = queue.SimpleQueue()
+    log.addHandler(DeferredQueueHandler(records))
+    log.propagate = False
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    return serverLogger
+
+# Writes out everything still queued, servers call this on their way out
+def stop_logging() -> None:
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+        log = serverLogger.logger
+        for handler in list(log.handlers):
+            log.removeHandler(handler)
+        log.propagate = True
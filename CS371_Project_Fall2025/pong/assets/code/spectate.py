@@ -0,0 +1,103 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  The spectator side of a match, shared by both servers and pongRelay.py.
+#                           Spectators get their own slower feed instead of every player frame, so the
+#                           players' relay never loops over the audience
+# Misc:                     Player frames are only stored as they arrive (the newest one per paddle
+#                           side). At most rate times a second, and only if something changed, the
+#                           stored states are encoded once per wire format and the same bytes are queued
+#                           for every spectator, keyed so a slow spectator only ever holds the newest
+#                           packet. A spectator that joins late gets the stored states right away.
+#                           Spectators see START:spectator (or START:spectator:AUTH) instead of a side.
+# =================================================================================================
+
+import threading
+import time
+from typing import Optional
+
+from assets.code.wireProtocol import PROTO_BINARY, PROTO_SYNC, ENCODERS, GameState, decode_frame
+
+SPECTATOR_RATE = 20 # Packets per second sent to spectators, the client interpolates between them
+SPECTATOR_KEY = "spectate" # Queue key for spectator packets, a newer packet replaces one still waiting
+SPECTATOR_SIDE = "spectator"
+SPECTATOR_DELAY = 0.15 # Seconds a spectating client draws behind the feed, three packets at the default rate
+
+# Delta frames only make sense against a snapshot one particular peer acknowledged, so spectators
+# that asked for SYNC1 get full binary states, which every client decoder already reads
+def spectator_proto(proto:str) -> str:
+    return PROTO_BINARY if proto == PROTO_SYNC else proto
+
+# Author:  Daniel Krutsick
+# Purpose:  Newest state of each paddle in one match, sent to that match's spectators at a fixed rate
+# Pre:  offer() is called with every player frame, due() whenever the caller could send a packet
+# Post:  encode() gives both states as one packet in the asked for format, encoded at most once per
+#        format for every change, however many spectators it goes to
+class SpectatorFeed:
+    def __init__(self, rate:float = SPECTATOR_RATE) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.latest = {} # side -> (kind, frame bytes, state), frame or state may be None
+        self.encoded = {} # proto -> packet for the current latest states
+        self.changed = False
+        self.nextSend = 0.0
+        self.lock = threading.Lock() # The threaded server offers from more than one thread
+        self.offered = 0
+        self.packets = 0
+
+    # Stores a player's frame as it arrived (bytes, not a view into a receive buffer), a frame that is
+    # already in the format a spectator wants is never decoded
+    def offer(self, kind:Optional[str], frame:Optional[bytes], side:str, state:Optional[GameState] = None) -> None:
+        if kind == PROTO_SYNC:
+            kind, frame = None, None
+        self.latest[side] = (kind, frame, state)
+        self.encoded = {}
+        self.changed = True
+        self.offered += 1
+
+    # True at most once per interval, and only when a new state arrived since the last packet
+    def due(self, now:Optional[float] = None) -> bool:
+        if not self.changed:
+            return False
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if not self.changed or now < self.nextSend:
+                return False
+            self.changed = False
+            # Scheduled from the last send so the rate holds steady, unless the feed went quiet for a while
+            self.nextSend += self.interval
+            if self.nextSend < now:
+                self.nextSend = now + self.interval
+            self.packets += 1
+            return True
+
+    def has_state(self) -> bool:
+        return bool(self.latest)
+
+    # Both stored states in proto, as one packet, built once per proto until the next offer()
+    def encode(self, proto:str) -> bytes:
+        proto = spectator_proto(proto)
+        # Held locally, so a packet built while another thread offers a new state is not cached as the new one
+        encoded = self.encoded
+        packet = encoded.get(proto)
+        if packet is not None:
+            return packet
+        parts = []
+        for side in ("left", "right"):
+            stored = self.latest.get(side)
+            if stored is None:
+                continue
+            kind, frame, state = stored
+            if kind == proto and frame is not None:
+                parts.append(frame)
+                continue
+            if state is None:
+                state = decode_frame(kind, frame)
+                self.latest[side] = (kind, frame, state)
+            parts.append(ENCODERS[proto](state))
+        packet = encoded[proto] = b"".join(parts)
+        return packet
+
+    def stats(self) -> dict:
+        return {"offered": self.offered, "packets": self.packets}
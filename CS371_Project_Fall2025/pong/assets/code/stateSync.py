@@ -0,0 +1,184 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Snapshot/delta state sync for game state frames (the SYNC1 wire format)
+# Misc:                     Every so often a full snapshot is sent, and the receiver acknowledges it.
+#                           Every other frame is a delta holding only the fields that differ from the
+#                           last acknowledged snapshot, and nothing at all is sent while a state has not
+#                           changed. Deltas never depend on each other, so any of them can be dropped
+#                           or replaced by a newer one on the way without breaking the ones after it.
+#                           The same SyncSession is used by playGame's send path and by the servers.
+# =================================================================================================
+
+import threading
+from typing import Optional
+
+from assets.code.wireProtocol import (GameState, MAGIC_SYNC, SIDES, SIDE_IDS, SYNC_ACK, SYNC_DELTA, SYNC_DELTA_FIELDS,
+                                      SYNC_DELTA_HEAD, SYNC_HEAD, SYNC_SNAPSHOT, SYNC_SNAPSHOT_BODY)
+
+SNAPSHOT_INTERVAL = 30 # Frames between full snapshots, a new baseline keeps the deltas small
+MAX_UNACKED = 16 # Snapshots remembered while waiting for their ack
+
+# Author:  Jacob Blankenship
+# Purpose:  Sending half of one state stream (one paddle side over one connection)
+# Pre:  encode() is given each new state for this side, ack() each snapshot id the peer acknowledged,
+#       the two may be called from different threads
+# Post:  encode() returns the bytes to send, or None if the state has not changed since the last one
+class StateEncoder:
+    def __init__(self, side:str) -> None:
+        self.side = SIDE_IDS[side]
+        self.nextId = 0
+        self.unacked = {} # snapshot id -> state, oldest first
+        self.unackedLock = threading.Lock()
+        # (snapshot id, state) of the last acknowledged snapshot, kept as one tuple so an ack arriving on
+        # another thread can never pair one snapshot's id with another snapshot's state
+        self.baseline: Optional[tuple] = None
+        self.last: Optional[GameState] = None
+        self.sinceSnapshot = 0
+
+    # A session goes to another process along with its client in pongShardServer.py, locks can not be pickled
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["unackedLock"]
+        return state
+
+    def __setstate__(self, state:dict) -> None:
+        self.__dict__.update(state)
+        self.unackedLock = threading.Lock()
+
+    def encode(self, state:GameState) -> Optional[bytes]:
+        # The tick moves every frame on its own, so it alone does not count as a change
+        if self.last is not None and state[:6] == self.last[:6]:
+            return None
+        self.last = state
+        self.sinceSnapshot += 1
+        baseline = self.baseline
+        if baseline is None or self.sinceSnapshot >= SNAPSHOT_INTERVAL or not 0 <= state.time - baseline[1].time <= 0xFF:
+            return self.snapshot(state)
+        return self.delta(state, *baseline)
+
+    # The last frame encode() returned may never arrive (a full send queue dropped it), so the next state is
+    # sent even if it did not change, as a snapshot so the peer gets a fresh baseline too
+    def resend(self) -> None:
+        self.last = None
+        self.sinceSnapshot = SNAPSHOT_INTERVAL
+
+    def snapshot(self, state:GameState) -> bytes:
+        snapshotId = self.nextId
+        self.nextId = (self.nextId + 1) & 0xFF
+        with self.unackedLock:
+            self.unacked[snapshotId] = state
+            if len(self.unacked) > MAX_UNACKED:
+                del self.unacked[next(iter(self.unacked))]
+        self.sinceSnapshot = 0
+        return SYNC_HEAD.pack(MAGIC_SYNC, SYNC_SNAPSHOT | self.side, snapshotId) + SYNC_SNAPSHOT_BODY.pack(
+            state.pos, state.bx, state.by, state.lscore, state.rscore, state.time & 0xFFFFFFFF)
+
+    def delta(self, state:GameState, baseId:int, base:GameState) -> bytes:
+        mask = 0
+        body = []
+        for bit, (name, field) in enumerate(SYNC_DELTA_FIELDS):
+            value = getattr(state, name)
+            baseValue = getattr(base, name)
+            if value != baseValue:
+                mask |= 1 << bit
+                body.append(field.pack(value - baseValue if name == "time" else value))
+        return (SYNC_HEAD.pack(MAGIC_SYNC, SYNC_DELTA | self.side, baseId)
+                + SYNC_DELTA_HEAD.pack(mask) + b"".join(body))
+
+    def ack(self, snapshotId:int) -> None:
+        with self.unackedLock:
+            state = self.unacked.get(snapshotId)
+            if state is None:
+                return
+            # Anything older than the snapshot just acknowledged will never be used as a baseline
+            for oldId in list(self.unacked):
+                del self.unacked[oldId]
+                if oldId == snapshotId:
+                    break
+        self.baseline = (snapshotId, state)
+
+# Author:  Jacob Blankenship
+# Purpose:  Receiving half of one state stream
+# Pre:  decode() is given each sync frame for this side in the order it arrived
+# Post:  Returns the full GameState a frame describes, or None if its baseline is unknown
+class StateDecoder:
+    def __init__(self, side:str) -> None:
+        self.side = side
+        self.snapshots = {} # snapshot id -> state, ids wrap around so old entries are overwritten
+
+    def decode_snapshot(self, frame:bytes) -> GameState:
+        _, _, snapshotId = SYNC_HEAD.unpack_from(frame)
+        pos, bx, by, lscore, rscore, tm = SYNC_SNAPSHOT_BODY.unpack_from(frame, SYNC_HEAD.size)
+        state = GameState(self.side, pos, bx, by, lscore, rscore, tm)
+        self.snapshots[snapshotId] = state
+        return state
+
+    def decode_delta(self, frame:bytes) -> Optional[GameState]:
+        _, _, baseId = SYNC_HEAD.unpack_from(frame)
+        mask, = SYNC_DELTA_HEAD.unpack_from(frame, SYNC_HEAD.size)
+        base = self.snapshots.get(baseId)
+        if base is None:
+            return None
+        values = base._asdict()
+        offset = SYNC_HEAD.size + SYNC_DELTA_HEAD.size
+        for bit, (name, field) in enumerate(SYNC_DELTA_FIELDS):
+            if mask & (1 << bit):
+                value = field.unpack_from(frame, offset)[0]
+                values[name] = base.time + value if name == "time" else value
+                offset += field.size
+        return GameState(**values)
+
+# Author:  Jacob Blankenship
+# Purpose:  Everything one end of a connection needs for SYNC1, an encoder and decoder per paddle side
+#           and the acks waiting to be sent back
+# Pre:  encode() and take_acks() are called by the sending thread, receive() by the receiving thread
+# Post:  Acks for received snapshots pile up until take_acks() hands them to the sender
+class SyncSession:
+    def __init__(self) -> None:
+        self.encoders = {side: StateEncoder(side) for side in SIDES}
+        self.decoders = {side: StateDecoder(side) for side in SIDES}
+        self.acks = bytearray()
+        self.acksLock = threading.Lock()
+
+    # Pickled with the encoders, for the same reason as StateEncoder
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["acksLock"]
+        return state
+
+    def __setstate__(self, state:dict) -> None:
+        self.__dict__.update(state)
+        self.acksLock = threading.Lock()
+
+    def encode(self, state:GameState) -> Optional[bytes]:
+        return self.encoders[state.name].encode(state)
+
+    # Called when a frame queued for the peer was dropped, it may have been one of ours
+    def resend(self) -> None:
+        for encoder in self.encoders.values():
+            encoder.resend()
+
+    # Handles one sync frame, returns the GameState it carried (acks and undecodable deltas give None)
+    def receive(self, frame:bytes) -> Optional[GameState]:
+        kind = frame[1] & 0xF0
+        sideId = frame[1] & 0x0F
+        if sideId >= len(SIDES):
+            return None
+        side = SIDES[sideId]
+        if kind == SYNC_ACK:
+            self.encoders[side].ack(frame[2])
+            return None
+        if kind == SYNC_SNAPSHOT:
+            state = self.decoders[side].decode_snapshot(frame)
+            with self.acksLock:
+                self.acks += SYNC_HEAD.pack(MAGIC_SYNC, SYNC_ACK | sideId, frame[2])
+            return state
+        return self.decoders[side].decode_delta(frame)
+
+    def take_acks(self) -> bytes:
+        with self.acksLock:
+            acks = bytes(self.acks)
+            self.acks.clear()
+        return acks
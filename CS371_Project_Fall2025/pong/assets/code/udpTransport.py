@@ -0,0 +1,186 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Optional UDP channel for the per frame game states, so one lost packet no
+#                           longer holds up every state behind it the way it does on TCP
+# Misc:                     The TCP connection is still made first and carries START, the PROTO
+#                           handshake and every message that must arrive (such as SCORE). A client asks
+#                           for UDP with PROTO:UDP1\n, a server that has UDP turned on answers
+#                           UDP:<token>\n, and from then on the client sends datagrams to the same port
+#                           number as the TCP server. Every datagram starts with the token and a
+#                           sequence number, and any datagram older than the newest one already
+#                           received is thrown away since a newer state replaces it anyway. The payload
+#                           is one or more ordinary frames (binary states or text lines).
+# =================================================================================================
+
+import random
+import socket
+import struct
+import threading
+from typing import Optional
+
+MAGIC_UDP = 0xB9
+# magic, token, sequence number
+DATAGRAM_HEAD = struct.Struct("!BII")
+MAX_DATAGRAM = 1200 # Stays under a typical path MTU so datagrams are never fragmented
+SEQ_MASK = 0xFFFFFFFF
+
+# True if sequence number a comes after b, allowing for the counter wrapping around
+def seq_newer(a:int, b:int) -> bool:
+    return 0 < ((a - b) & SEQ_MASK) < 0x80000000
+
+def pack_datagram(token:int, seq:int, payload:bytes) -> bytes:
+    return DATAGRAM_HEAD.pack(MAGIC_UDP, token, seq & SEQ_MASK) + payload
+
+# Returns (token, sequence number, payload) or None if data is not one of our datagrams
+def unpack_datagram(data:bytes) -> Optional[tuple]:
+    if len(data) < DATAGRAM_HEAD.size or data[0] != MAGIC_UDP:
+        return None
+    _, token, seq = DATAGRAM_HEAD.unpack_from(data)
+    return token, seq, memoryview(data)[DATAGRAM_HEAD.size:]
+
+# Author:  Daniel Krutsick
+# Purpose:  Keeps only datagrams newer than the last one accepted from one sender
+# Pre:  accept() is called with the sequence number of every datagram as it arrives
+# Post:  lost counts the sequence numbers that were skipped over, stale the late ones thrown away
+class SequenceFilter:
+    def __init__(self) -> None:
+        self.last: Optional[int] = None
+        self.received = 0
+        self.lost = 0
+        self.stale = 0
+
+    def accept(self, seq:int) -> bool:
+        if self.last is not None and not seq_newer(seq, self.last):
+            self.stale += 1
+            return False
+        if self.last is not None:
+            self.lost += ((seq - self.last) & SEQ_MASK) - 1
+        self.last = seq
+        self.received += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"received": self.received, "lost": self.lost, "stale": self.stale}
+
+# Author:  Daniel Krutsick
+# Purpose:  What the server knows about one client's UDP channel
+# Pre:  Created by UdpRegistry.add() when the client asks for UDP over its TCP connection
+# Post:  addr is None until the first datagram with this token arrives, nothing can be sent before that
+class UdpPeer:
+    def __init__(self, token:int, owner) -> None:
+        self.token = token
+        self.owner = owner # The TCP side of the same client, a socket or an async Connection
+        self.addr = None
+        self.inbound = SequenceFilter()
+        self.nextSeq = 0
+        self.sent = 0
+        self.seqLock = threading.Lock() # The threaded server relays from more than one thread
+
+    def pack(self, payload:bytes) -> bytes:
+        with self.seqLock:
+            self.nextSeq = (self.nextSeq + 1) & SEQ_MASK
+            self.sent += 1
+            seq = self.nextSeq
+        return pack_datagram(self.token, seq, payload)
+
+# Author:  Daniel Krutsick
+# Purpose:  Token to peer lookup for a server's UDP socket, used by both the threaded and async servers
+# Pre:  add() and remove() may run on any thread, accept() runs wherever datagrams are received
+# Post:  accept() only returns payloads from a known token that are newer than the last one accepted
+class UdpRegistry:
+    def __init__(self) -> None:
+        self.peers = {} # token -> UdpPeer
+        self.lock = threading.Lock()
+        self.rejected = 0 # Datagrams that were not ours or had no known token
+        self.removed = {"received": 0, "lost": 0, "stale": 0, "sent": 0} # Counters of peers that already left
+
+    def add(self, owner) -> UdpPeer:
+        with self.lock:
+            token = random.getrandbits(32)
+            while token in self.peers:
+                token = random.getrandbits(32)
+            peer = UdpPeer(token, owner)
+            self.peers[token] = peer
+        return peer
+
+    def remove(self, peer:UdpPeer) -> None:
+        with self.lock:
+            if self.peers.pop(peer.token, None) is not None:
+                for name, value in peer.inbound.stats().items():
+                    self.removed[name] += value
+                self.removed["sent"] += peer.sent
+
+    def accept(self, data:bytes, addr) -> Optional[tuple]:
+        unpacked = unpack_datagram(data)
+        peer = self.peers.get(unpacked[0]) if unpacked is not None else None
+        if peer is None:
+            self.rejected += 1
+            return None
+        _, seq, payload = unpacked
+        if not peer.inbound.accept(seq):
+            return None
+        # The client's address is learned from its datagrams, and follows it if its NAT mapping changes
+        peer.addr = addr
+        return peer, payload
+
+    def stats(self) -> dict:
+        with self.lock:
+            peers = list(self.peers.values())
+            totals = dict(self.removed)
+        totals["peers"] = len(peers)
+        totals["rejected"] = self.rejected
+        for peer in peers:
+            for name, value in peer.inbound.stats().items():
+                totals[name] += value
+            totals["sent"] += peer.sent
+        return totals
+
+# Author:  Jacob Blankenship
+# Purpose:  The client's end of the UDP channel, a connected datagram socket to the server's port
+# Pre:  start() is called with the token from the server's UDP:<token> line
+# Post:  ready is True once the token is known, send() and receive() can then be used from two threads
+class UdpClient:
+    def __init__(self, host:str, port:int) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((host, port))
+        self.token: Optional[int] = None
+        self.nextSeq = 0
+        self.inbound = SequenceFilter()
+
+    @property
+    def ready(self) -> bool:
+        return self.token is not None
+
+    # The first datagram only tells the server where we are, the states follow every frame after it
+    def start(self, token:int) -> None:
+        self.token = token
+        self.send(b"")
+
+    def send(self, payload:bytes) -> None:
+        self.nextSeq = (self.nextSeq + 1) & SEQ_MASK
+        try:
+            self.sock.send(pack_datagram(self.token, self.nextSeq, payload))
+        except OSError:
+            # Nothing is queued or retried on this channel, the next frame replaces this one
+            pass
+
+    # Blocks until a datagram newer than the last one arrives, returns its payload or None once closed
+    def receive(self) -> Optional[bytes]:
+        while True:
+            try:
+                data = self.sock.recv(MAX_DATAGRAM)
+            except ConnectionRefusedError:
+                # An ICMP error from a datagram sent before the server was listening, just keep going
+                continue
+            except OSError:
+                return None
+            unpacked = unpack_datagram(data)
+            if unpacked is None or unpacked[0] != self.token:
+                continue
+            if self.inbound.accept(unpacked[1]):
+                return bytes(unpacked[2])
+
+    def close(self) -> None:
+        self.sock.close()
@@ -0,0 +1,296 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Encoding and decoding of game state frames, shared by the client and server
+# Misc:                     Two formats are spoken. The original text line
+#                           PN:<side>:PP:<y>:BX:<x>:BY:<y>:LS:<n>:RS:<n>:TM:<n>\n and a fixed size
+#                           binary record. A client asks for binary by sending PROTO:BIN1\n, and the
+#                           server answers PROTO:BIN1\n once it will send binary frames to that client.
+#                           Servers that do not know the request ignore it and everything stays text.
+#                           PROTO:SYNC1 asks for snapshot/delta frames instead (see stateSync.py),
+#                           clients ask for BIN1 first so an older server can still agree to that.
+#                           PROTO:UDP1 asks for the states to go over UDP instead (see udpTransport.py).
+# =================================================================================================
+
+import re
+import struct
+from collections import namedtuple
+from typing import Optional
+
+PROTO_TEXT = "TEXT"
+PROTO_BINARY = "BIN1"
+PROTO_SYNC = "SYNC1"
+PROTO_UDP = "UDP1"
+
+# Every binary frame starts with this byte, text lines start with a letter, so one stream can hold both
+MAGIC = 0xB7
+VERSION = 1
+# Header: magic, version, payload length. The length lets a reader skip frames from a newer version
+HEADER = struct.Struct("!BBH")
+# Payload: side (0 left, 1 right), paddle y, ball x, ball y, left score, right score, tick
+STATE = struct.Struct("!BhhhBBI")
+# Header and payload packed in one call for the common case
+FRAME = struct.Struct("!BBHBhhhBBI")
+MAX_PAYLOAD = 1024 # Anything claiming to be longer than this is garbage, not a newer version
+
+# Snapshot/delta frames have their own magic byte and no length field, the size follows from the kind
+# and, for deltas, from which fields the mask says are present
+MAGIC_SYNC = 0xB8
+SYNC_SNAPSHOT = 0x10
+SYNC_DELTA = 0x20
+SYNC_ACK = 0x30
+# magic, kind | side, snapshot id
+SYNC_HEAD = struct.Struct("!BBB")
+# paddle y, ball x, ball y, left score, right score, tick
+SYNC_SNAPSHOT_BODY = struct.Struct("!hhhBBI")
+# Follows SYNC_HEAD in a delta, whose id is the acknowledged snapshot it is against: bit mask of the
+# fields that follow
+SYNC_DELTA_HEAD = struct.Struct("!B")
+# Delta fields in mask bit order, the tick is sent as the number of ticks since the snapshot
+SYNC_DELTA_FIELDS = (("pos", struct.Struct("!h")), ("bx", struct.Struct("!h")), ("by", struct.Struct("!h")),
+                     ("lscore", struct.Struct("!B")), ("rscore", struct.Struct("!B")), ("time", struct.Struct("!B")))
+
+SIDES = ("left", "right")
+SIDE_IDS = {"left": 0, "right": 1}
+
+# One game state frame, whichever format it arrived in
+GameState = namedtuple("GameState", ["name", "pos", "bx", "by", "lscore", "rscore", "time"])
+
+# A number that fits the binary format's signed 16 bit fields (-32767 to 32767), and one that fits its
+# unsigned 8 bit score fields (0 to 255), both allowing leading zeros
+INT16 = r'-?0*(?:\d{1,4}|[12]\d{4}|3[01]\d{3}|32[0-6]\d{2}|327[0-5]\d|3276[0-7])'
+UINT8 = r'0*(?:\d{1,2}|1\d{2}|2[0-4]\d|25[0-5])'
+
+# Regex to parse each text game message. Only the two paddle sides and numbers every other format can hold
+# match, so a line that gets through can be converted for any peer, the recorder and the spectator feed
+MSG_PATTERN = re.compile(
+    rf'PN:(?P<name>left|right):PP:(?P<pos>{INT16}):BX:(?P<bx>{INT16}):BY:(?P<by>{INT16}):LS:(?P<lscore>{UINT8}):'
+    rf'RS:(?P<rscore>{UINT8}):TM:(?P<time>\d+)'
+)
+
+# The same pattern over raw bytes, used to validate a line without decoding it. The whole line has
+# to match (trailing whitespace such as \r is allowed) so only well formed lines get forwarded
+MSG_PATTERN_BYTES = re.compile(MSG_PATTERN.pattern.encode('ascii') + rb'\s*')
+
+FRAME_LINE = "LINE" # Kind given by FrameReader to any text line that is not a game state
+
+# Author:  Jacob Blankenship
+# Purpose:  Turns one text line into a GameState
+# Pre:  message is a single line without its newline
+# Post:  Returns the GameState, or None if the line does not match MSG_PATTERN
+def parse_text(message:str) -> Optional[GameState]:
+    match = MSG_PATTERN.match(message)
+    if not match:
+        return None
+    name, pos, bx, by, lscore, rscore, tm = match.groups()
+    return GameState(name, int(pos), int(bx), int(by), int(lscore), int(rscore), int(tm))
+
+def encode_text(state:GameState) -> bytes:
+    return (
+        f"PN:{state.name}:PP:{state.pos}:BX:{state.bx}:BY:{state.by}:"
+        f"LS:{state.lscore}:RS:{state.rscore}:TM:{state.time}\n"
+    ).encode('utf-8')
+
+# Whether every field of state fits the binary format, the time field wraps instead so it always does
+def fits_binary(state:GameState) -> bool:
+    return (state.name in SIDE_IDS and -32768 <= state.pos <= 32767 and -32768 <= state.bx <= 32767
+            and -32768 <= state.by <= 32767 and 0 <= state.lscore <= 255 and 0 <= state.rscore <= 255)
+
+# Raises ValueError for a state that does not fit, instead of whichever KeyError or struct.error packing it would
+def encode_binary(state:GameState) -> bytes:
+    if not fits_binary(state):
+        raise ValueError(f"game state does not fit the binary format: {state}")
+    return FRAME.pack(MAGIC, VERSION, STATE.size, SIDE_IDS[state.name], state.pos, state.bx, state.by,
+                      state.lscore, state.rscore, state.time & 0xFFFFFFFF)
+
+# Decodes the payload of one binary frame that starts at offset, the header is assumed to be checked
+def decode_binary(buffer, offset:int = 0) -> GameState:
+    side, pos, bx, by, lscore, rscore, tm = STATE.unpack_from(buffer, offset + HEADER.size)
+    return GameState(SIDES[side], pos, bx, by, lscore, rscore, tm)
+
+ENCODERS = {PROTO_TEXT: encode_text, PROTO_BINARY: encode_binary}
+# The PROTO: request lines a server answers, the sync format is stateful so it has no entry in ENCODERS
+PROTO_REQUESTS = {f"PROTO:{proto}".encode('utf-8'): proto for proto in (PROTO_BINARY, PROTO_SYNC)}
+# Asks for a UDP channel, which is answered with UDP:<token> instead of an echo and only by servers with UDP on
+PROTO_UDP_REQUEST = f"PROTO:{PROTO_UDP}".encode('utf-8')
+
+# Size of the sync frame starting at start, 0 if more bytes are needed to tell, -1 if it is not valid
+def sync_frame_size(buffer, start:int, end:int) -> int:
+    if end - start < 2:
+        return 0
+    kind = buffer[start + 1] & 0xF0
+    if kind == SYNC_SNAPSHOT:
+        return SYNC_HEAD.size + SYNC_SNAPSHOT_BODY.size
+    if kind == SYNC_ACK:
+        return SYNC_HEAD.size
+    if kind != SYNC_DELTA:
+        return -1
+    headSize = SYNC_HEAD.size + SYNC_DELTA_HEAD.size
+    if end - start < headSize:
+        return 0
+    mask = buffer[start + headSize - 1]
+    size = headSize
+    for bit, (_, field) in enumerate(SYNC_DELTA_FIELDS):
+        if mask & (1 << bit):
+            size += field.size
+    return size
+
+# Author:  Daniel Krutsick
+# Purpose:  Splits a received byte stream into frames, whichever format each frame is in
+# Pre:  feed() is given the bytes from recv() in the order they arrived
+# Post:  feed() returns the complete frames so far, a GameState for each binary frame and the stripped
+#        bytes of each non-empty text line (text game states still go through parse_game_state).
+#        Sync frames are handed to sync (a stateSync.SyncSession), which turns them back into GameStates
+class FrameDecoder:
+    def __init__(self, sync = None) -> None:
+        self.buffer = bytearray()
+        self.sync = sync
+
+    def feed(self, data:bytes) -> list:
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        start = 0
+        end = len(buffer)
+        while start < end:
+            if buffer[start] == MAGIC:
+                if end - start < HEADER.size:
+                    break
+                _, version, length = HEADER.unpack_from(buffer, start)
+                if length > MAX_PAYLOAD:
+                    # The stream can not be trusted anymore, throw away what we have
+                    start = end
+                    break
+                frameEnd = start + HEADER.size + length
+                if frameEnd > end:
+                    break
+                if version == VERSION and length == STATE.size and buffer[start + HEADER.size] < len(SIDES):
+                    frames.append(decode_binary(buffer, start))
+                start = frameEnd
+            elif buffer[start] == MAGIC_SYNC:
+                size = sync_frame_size(buffer, start, end)
+                if size < 0:
+                    start = end
+                    break
+                if size == 0 or start + size > end:
+                    break
+                if self.sync is not None:
+                    state = self.sync.receive(bytes(buffer[start:start + size]))
+                    if state is not None:
+                        frames.append(state)
+                start += size
+            else:
+                newline = buffer.find(b"\n", start)
+                if newline == -1:
+                    break
+                line = bytes(buffer[start:newline]).strip()
+                if line:
+                    frames.append(line)
+                start = newline + 1
+        del buffer[:start]
+        return frames
+
+# Author:  Daniel Krutsick
+# Purpose:  Relay side framing, checks each frame once and hands back the original bytes so they can be
+#           forwarded without a decode/parse/format/encode round trip
+# Pre:  Either recv_from() reads straight from a blocking socket, or feed() is given each received chunk
+# Post:  frames() yields (kind, frame) for every complete frame, kind is PROTO_TEXT or PROTO_BINARY for
+#        valid game states and PROTO_SYNC for sync frames (frame is a memoryview of the whole frame)
+#        and FRAME_LINE for any other text line (frame is the stripped bytes). The memoryviews point into
+#        the receive buffer, so they are only good until the next recv_from() or feed()
+class FrameReader:
+    def __init__(self, size:int = 65536) -> None:
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.dropped = 0 # Bytes thrown away because they could never become a valid frame
+
+    # Makes room for need more bytes at the end of the buffer by sliding the unread bytes to the front.
+    # Slice assignment keeps the same length, so it works even while memoryviews of the buffer are alive
+    def compact(self, need:int = 1) -> None:
+        if self.start == self.end:
+            self.start = self.end = 0
+        if len(self.buffer) - self.end >= need:
+            return
+        remaining = self.end - self.start
+        if remaining + need > len(self.buffer):
+            # The unfinished frame can never fit, so it can only be garbage
+            self.dropped += remaining
+            self.start = self.end = 0
+            return
+        self.buffer[:remaining] = self.view[self.start:self.end]
+        self.start = 0
+        self.end = remaining
+
+    # Reads straight into the buffer, returns the number of bytes read (0 means the peer closed)
+    def recv_from(self, sock) -> int:
+        self.compact()
+        n = sock.recv_into(self.view[self.end:])
+        self.end += n
+        return n
+
+    # Same as recv_from() for callers that already have the bytes, such as an asyncio StreamReader
+    def feed(self, data:bytes) -> None:
+        data = data[-len(self.buffer):]
+        self.compact(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    # Throws away an unfinished frame, for datagrams where the rest of it can never arrive
+    def discard(self) -> None:
+        self.dropped += self.end - self.start
+        self.start = self.end = 0
+
+    def frames(self):
+        buffer = self.buffer
+        view = self.view
+        end = self.end
+        while self.start < end:
+            start = self.start
+            if buffer[start] == MAGIC:
+                if end - start < HEADER.size:
+                    return
+                _, version, length = HEADER.unpack_from(buffer, start)
+                if length > MAX_PAYLOAD:
+                    self.dropped += end - start
+                    self.start = end
+                    return
+                frameEnd = start + HEADER.size + length
+                if frameEnd > end:
+                    return
+                self.start = frameEnd
+                if version == VERSION and length == STATE.size and buffer[start + HEADER.size] < len(SIDES):
+                    yield PROTO_BINARY, view[start:frameEnd]
+                else:
+                    self.dropped += frameEnd - start
+            elif buffer[start] == MAGIC_SYNC:
+                size = sync_frame_size(buffer, start, end)
+                if size < 0:
+                    self.dropped += end - start
+                    self.start = end
+                    return
+                if size == 0 or start + size > end:
+                    return
+                self.start = start + size
+                yield PROTO_SYNC, view[start:start + size]
+            else:
+                newline = buffer.find(b"\n", start, end)
+                if newline == -1:
+                    return
+                self.start = newline + 1
+                line = view[start:newline]
+                if MSG_PATTERN_BYTES.fullmatch(line):
+                    yield PROTO_TEXT, view[start:newline + 1]
+                else:
+                    line = bytes(line).strip()
+                    if line:
+                        yield FRAME_LINE, line
+
+# Decodes a frame handed out by FrameReader, only needed when it has to change format on the way out.
+# Sync frames can only be decoded by the SyncSession of the connection they came from
+def decode_frame(kind:str, frame) -> GameState:
+    if kind == PROTO_BINARY:
+        return decode_binary(frame)
+    return parse_text(bytes(frame).decode('utf-8').strip())
@@ -0,0 +1,123 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Load benchmark for the async multi-room server engine
+# Misc:                     Run from the pong folder with "python benchmarks/asyncRoomsBench.py".
+#                           The server runs in its own process so its CPU time can be measured
+#                           apart from the bot clients, and the result is reported in matches per core.
+# =================================================================================================
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pongAsyncServer import AsyncPongServer
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of the server process, answers "mark" and "stop" commands over the pipe
+# Pre:  pipe is one end of a multiprocessing.Pipe, the other end is held by the benchmark
+# Post:  Sends the port once listening, the CPU time on each "mark", and the stats on "stop"
+def server_process(pipe) -> None:
+    # The per-connection prints would dominate the measurement, so they are silenced here
+    sys.stdout = open(os.devnull, "w")
+    server = AsyncPongServer("127.0.0.1", 0)
+
+    async def main():
+        ready = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(server.serve(ready))
+        await ready.wait()
+        pipe.send(server.port)
+
+        def commands():
+            while True:
+                cmd = pipe.recv()
+                if cmd == "mark":
+                    pipe.send(time.process_time())
+                else:
+                    loop.call_soon_threadsafe(server.close)
+                    return
+        threading.Thread(target=commands, daemon=True).start()
+        await task
+
+    asyncio.run(main())
+    pipe.send({"cpu": time.process_time(), "matches": server.matchesStarted, "frames": server.framesRelayed})
+
+# Author:  Daniel Krutsick
+# Purpose:  One headless player, sends a game state line at the given rate and counts what comes back
+# Pre:  The server is listening on host:port
+# Post:  Returns the number of frames received once stop is set
+async def bot(host:str, port:int, rate:int, stop:asyncio.Event, started:asyncio.Queue) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    side = (await reader.readline()).decode().strip().split(":")[1]
+    await started.put(side)
+    received = 0
+
+    async def drain():
+        nonlocal received
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            received += 1
+
+    drainTask = asyncio.create_task(drain())
+    tick = 0
+    interval = 1 / rate
+    while not stop.is_set():
+        writer.write(f"PN:{side}:PP:215:BX:320:BY:240:LS:0:RS:0:TM:{tick}\n".encode('utf-8'))
+        tick += 1
+        await asyncio.sleep(interval)
+    writer.close()
+    drainTask.cancel()
+    return received
+
+async def run_bots(port:int, matches:int, rate:int, duration:float, pipe) -> dict:
+    stop = asyncio.Event()
+    started = asyncio.Queue()
+    tasks = [asyncio.create_task(bot("127.0.0.1", port, rate, stop, started)) for _ in range(matches * 2)]
+    for _ in range(matches * 2):
+        await started.get()
+    pipe.send("mark")
+    cpuStart = pipe.recv()
+    wallStart = time.perf_counter()
+    await asyncio.sleep(duration)
+    pipe.send("mark")
+    cpuEnd = pipe.recv()
+    wall = time.perf_counter() - wallStart
+    stop.set()
+    received = sum(await asyncio.gather(*tasks))
+    return {"cpu": cpuEnd - cpuStart, "wall": wall, "received": received}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Matches per core benchmark for pongAsyncServer")
+    parser.add_argument("--matches", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--rate", type=int, default=60, help="frames per second sent by each bot")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'matches':>8} {'started':>8} {'server cpu %':>13} {'frames/s':>10} {'matches/core':>13}")
+    for matches in args.matches:
+        parent, child = multiprocessing.Pipe()
+        proc = multiprocessing.Process(target=server_process, args=(child,))
+        proc.start()
+        port = parent.recv()
+        result = asyncio.run(run_bots(port, matches, args.rate, args.duration, parent))
+        parent.send("stop")
+        stats = parent.recv()
+        proc.join()
+        load = result["cpu"] / result["wall"]
+        perCore = matches / load if load > 0 else float("inf")
+        # started is how many rooms the server really paired up, fewer than matches means bots failed to join
+        print(f"{matches:>8} {stats['matches']:>8} {load * 100:>12.1f}% {result['received'] / result['wall']:>10.0f} "
+              f"{perCore:>13.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Match ticks per second for N matches, one PongSim per match against one
+#                           BatchSim holding all of them
+# Misc:                     Run from the pong folder with "python benchmarks/batchSimBench.py".
+#                           First --check matches are played by ChaseBots on PongSims while a BatchSim
+#                           gets the same inputs, and every number is compared after every tick. Then
+#                           both paths step --ticks ticks of the same random inputs for each N.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.batchSim import MOVES, BatchSim
+from assets.code.gameSim import ChaseBot, PongSim
+
+# Plays count bot matches both ways to the end and returns how many ticks were compared
+def check_identical(count:int, seed:int) -> int:
+    sims = [PongSim() for _ in range(count)]
+    bots = [(ChaseBot("left", seed=seed + 2 * i), ChaseBot("right", seed=seed + 2 * i + 1)) for i in range(count)]
+    batch = BatchSim(count)
+    while not all(sim.is_over() for sim in sims):
+        for i, (sim, (left, right)) in enumerate(zip(sims, bots)):
+            sim.set_input("left", left(sim))
+            sim.set_input("right", right(sim))
+            batch.set_input(i, "left", sim.leftPaddle.moving)
+            batch.set_input(i, "right", sim.rightPaddle.moving)
+            sim.step()
+        batch.step()
+        for i, sim in enumerate(sims):
+            ball = sim.ball
+            expected = (ball.rect.x, ball.rect.y, ball.xVel, ball.yVel, sim.leftPaddle.rect.y, sim.rightPaddle.rect.y,
+                        sim.lScore, sim.rScore, sim.scored, sim.bounced)
+            got = (batch.bx[i], batch.by[i], batch.xVel[i], batch.yVel[i], batch.leftY[i], batch.rightY[i],
+                   batch.lScore[i], batch.rScore[i], batch.scored[i], batch.bounced[i])
+            assert expected == tuple(v.item() for v in got), f"match {i} differs at tick {batch.tick}: {expected} != {got}"
+    return batch.tick * count
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PongSim per match against one BatchSim for N matches")
+    parser.add_argument("--matches", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--ticks", type=int, default=300, help="ticks stepped for each N")
+    parser.add_argument("--check", type=int, default=50, help="bot matches compared tick by tick first")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    compared = check_identical(args.check, args.seed)
+    print(f"identical: {args.check} whole matches, {compared:,} match ticks compared field by field")
+
+    rng = np.random.default_rng(args.seed)
+    names = {number: name for name, number in MOVES.items()}
+    print(f"{'matches':>8} {'PongSim ticks/s':>16} {'BatchSim ticks/s':>17} {'speedup':>8}")
+    for count in args.matches:
+        # Inputs are held for a few ticks at a time like a real player's, and are the same for both paths
+        inputs = np.repeat(rng.integers(-1, 2, size=(args.ticks // 10 + 1, 2, count)), 10, axis=0)[:args.ticks]
+
+        sims = [PongSim() for _ in range(count)]
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            left, right = inputs[tick].tolist()
+            for sim, l, r in zip(sims, left, right):
+                sim.leftPaddle.moving = names[l]
+                sim.rightPaddle.moving = names[r]
+                sim.step()
+        scalar = time.perf_counter() - start
+
+        batch = BatchSim(count)
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            batch.set_inputs(inputs[tick, 0], inputs[tick, 1])
+            batch.step()
+        vector = time.perf_counter() - start
+
+        assert [sim.lScore for sim in sims] == batch.lScore.tolist() and [sim.ball.rect.x for sim in sims] == batch.bx.tolist()
+        total = count * args.ticks
+        print(f"{count:>8} {total / scalar:>16,.0f} {total / vector:>17,.0f} {scalar / vector:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
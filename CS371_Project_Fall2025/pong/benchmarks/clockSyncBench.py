@@ -0,0 +1,218 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  What the two clients of a match where they run the physics see of the ball,
+#                           when the ball comes from whichever frame counter is higher (what playGame()
+#                           used to do) and when it comes from the shared match clock (clockSync.py and
+#                           BallAuthority in netcode.py)
+# Misc:                     Run from the pong folder with "python benchmarks/clockSyncBench.py".
+#                           Nothing is drawn or sent over a socket: two headless clients with bot paddles
+#                           run at their own frame rates on a simulated clock, and every state and clock
+#                           ping goes through a relay with its own latency and jitter to each client.
+#                           Reports jumps of the ball by more than --jump pixels between two frames (not
+#                           counting serves), how far apart the two clients' balls are, whether they agree
+#                           on the score, and how far the clients' match clocks are from the server's.
+#                           With the match clock, corrections is how many of the other player's states
+#                           disagreed with where the ball was at the same tick and moved it.
+# =================================================================================================
+
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from assets.code.clockSync import MatchClock, ClockSync
+from assets.code.gameSim import ChaseBot, PongSim
+from assets.code.netcode import BallAuthority
+from assets.code.wireProtocol import GameState
+
+# The client clock the way BallAuthority reads it, at the simulated time
+class SimulatedClock:
+    def __init__(self, sync:ClockSync, env:"Network") -> None:
+        self.sync = sync
+        self.env = env
+
+    def tick(self) -> int:
+        return self.sync.tick(self.env.now)
+
+# Author:  Jacob Blankenship
+# Purpose:  The relay between the two clients, as the threaded server does it, on a simulated clock
+# Pre:  latency maps each side to its one way delay in seconds
+# Post:  Every message arrives in order on each link, after the link's delay plus up to jitter seconds
+class Network:
+    def __init__(self, latency:dict, jitter:float, rng:random.Random) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng
+        self.now = 0.0
+        self.events = [] # (time, order, function, args)
+        self.order = 0
+        self.lastArrival = {} # link -> time the last message on it arrives, TCP never reorders
+        self.clock = MatchClock(started=0.0)
+
+    def at(self, when:float, function, *args) -> None:
+        self.order += 1
+        heapq.heappush(self.events, (when, self.order, function, args))
+
+    def deliver(self, link:tuple, side:str, function, *args) -> None:
+        arrival = max(self.now + self.latency[side] + self.rng.random() * self.jitter, self.lastArrival.get(link, 0.0))
+        self.lastArrival[link] = arrival
+        self.at(arrival, function, *args)
+
+    # A client's state goes to both clients, its own one back to it too
+    def send_state(self, client:"Client", state:GameState) -> None:
+        self.deliver((client.side, "up"), client.side, self.relay, state)
+
+    def relay(self, state:GameState) -> None:
+        for client in self.clients:
+            self.deliver((client.side, "down"), client.side, client.receive, state)
+
+    def send_ping(self, client:"Client", ping:bytes) -> None:
+        self.deliver((client.side, "up"), client.side, self.answer, client, ping)
+
+    def answer(self, client:"Client", ping:bytes) -> None:
+        reply = self.clock.answer(ping.strip(), self.now)
+        self.deliver((client.side, "down"), client.side, client.clock_answer, reply.decode('utf-8').strip())
+
+    def run(self, seconds:float) -> None:
+        while self.events and self.events[0][0] <= seconds:
+            self.now, _, function, args = heapq.heappop(self.events)
+            function(*args)
+
+# Author:  Jacob Blankenship
+# Purpose:  One player's client, its frame loop the way playGame() runs it without a window
+# Pre:  mode is "counter" for the old frame counter rule or "clock" for the match clock
+# Post:  Keeps the numbers the benchmark reports on
+class Client:
+    def __init__(self, side:str, fps:float, mode:str, env:Network, seed:int) -> None:
+        self.side = side
+        self.other = "right" if side == "left" else "left"
+        self.fps = fps
+        self.mode = mode
+        self.env = env
+        self.sim = PongSim()
+        self.bot = ChaseBot(side, seed=seed)
+        self.latest = {"left": None, "right": None} # Newest state of each side that arrived since the last frame
+        self.opponentY = None
+        self.sync = 0 # The old frame counter
+        self.clock = ClockSync()
+        self.authority = None
+        self.jumps = 0
+        self.lastBall = None
+        self.lastScore = (0, 0)
+
+    def start(self) -> None:
+        # START reaches each client after its own delay
+        self.clock.reset(self.env.now)
+        self.authority = BallAuthority(self.sim, self.side, SimulatedClock(self.clock, self.env))
+        self.frame()
+
+    def receive(self, state:GameState) -> None:
+        self.latest[state.name] = state
+        if state.name == self.other:
+            self.opponentY = state.pos
+
+    def clock_answer(self, line:str) -> None:
+        self.clock.answer(line, self.env.now)
+
+    def frame(self) -> None:
+        sim = self.sim
+        paddles = sim.paddles
+        if self.opponentY is not None:
+            paddles[self.other].rect.y = self.opponentY
+        paddles[self.side].moving = self.bot(sim)
+        paddles[self.other].moving = ""
+        left, right = self.latest["left"], self.latest["right"]
+        self.latest = {"left": None, "right": None}
+        if self.mode == "counter":
+            # playGame() before the match clock: the higher counter wins, and the other client copies it
+            if left and right:
+                if left.time >= right.time:
+                    authoritative = left
+                    if self.side == "right":
+                        self.sync = left.time
+                else:
+                    authoritative = right
+                    if self.side == "left":
+                        self.sync = right.time
+                sim.ball.rect.x = authoritative.bx
+                sim.ball.rect.y = authoritative.by
+                sim.lScore = authoritative.lscore
+                sim.rScore = authoritative.rscore
+            sim.move_paddles()
+            sim.step_ball()
+            tick = self.sync
+            self.sync += 1
+        else:
+            self.authority.take(left if self.other == "left" else right)
+            sim.move_paddles()
+            self.authority.step()
+            tick = self.authority.tick
+            ping = self.clock.request(self.env.now)
+            if ping is not None:
+                self.env.send_ping(self, ping)
+        ball = (sim.ball.rect.x, sim.ball.rect.y)
+        score = (sim.lScore, sim.rScore)
+        if self.lastBall is not None and score == self.lastScore:
+            if max(abs(ball[0] - self.lastBall[0]), abs(ball[1] - self.lastBall[1])) > self.env.jumpLimit:
+                self.jumps += 1
+        self.lastBall = ball
+        self.lastScore = score
+        self.env.send_state(self, GameState(self.side, paddles[self.side].rect.y, ball[0], ball[1], score[0], score[1], tick))
+        self.env.at(self.env.now + 1 / self.fps, self.frame)
+
+def run(mode:str, fps:tuple, latency:tuple, jitter:float, seconds:float, jump:int, seed:int) -> dict:
+    env = Network({"left": latency[0], "right": latency[1]}, jitter, random.Random(seed))
+    env.jumpLimit = jump
+    clients = [Client("left", fps[0], mode, env, seed), Client("right", fps[1], mode, env, seed + 1)]
+    env.clients = clients
+    apart = []
+    clockErrors = []
+
+    def sample() -> None:
+        left, right = clients[0].sim.ball.rect, clients[1].sim.ball.rect
+        apart.append(max(abs(left.x - right.x), abs(left.y - right.y)))
+        if mode == "clock":
+            for client in clients:
+                if client.clock.synced:
+                    clockErrors.append(abs(client.clock.match_time(env.now) - env.now))
+        env.at(env.now + 0.01, sample)
+
+    for client in clients:
+        env.at(env.latency[client.side], client.start)
+    env.at(1.0, sample)
+    env.run(seconds)
+    apart.sort()
+    scores = [(client.sim.lScore, client.sim.rScore) for client in clients]
+    return {"corrections": sum(client.authority.corrections for client in clients) if mode == "clock" else None,
+            "jumps": sum(client.jumps for client in clients),
+            "p50": statistics.median(apart), "p99": apart[int(len(apart) * 0.99)],
+            "agree": scores[0] == scores[1], "scores": scores,
+            "clock": max(clockErrors) * 1000 if clockErrors else None}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ball agreement between two clients, frame counters against the match clock")
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.015, 0.040], help="one way delay of the left and right client")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--jump", type=int, default=25, help="pixels the ball may move between two frames before it counts as a jump")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(f"{'fps':>7} {'mode':>8} {'corrections':>11} {'jumps':>6} {'apart p50':>10} {'p99':>5}  {'scores':<22} {'clock err':>9}")
+    for fps in ((60, 60), (60, 50), (75, 45)):
+        for mode in ("counter", "clock"):
+            r = run(mode, fps, tuple(args.latency), args.jitter, args.seconds, args.jump, args.seed)
+            clock = f"{r['clock']:.1f} ms" if r["clock"] is not None else "-"
+            scores = f"{r['scores'][0]} {r['scores'][1]}" + ("" if r["agree"] else " differ")
+            corrections = r["corrections"] if r["corrections"] is not None else "-"
+            print(f"{fps[0]:>3}/{fps[1]:<3} {mode:>8} {corrections:>11} {r['jumps']:>6} {r['p50']:>7} px {r['p99']:>5}  "
+                  f"{scores:<22} {clock:>9}")
+
+if __name__ == "__main__":
+    main()
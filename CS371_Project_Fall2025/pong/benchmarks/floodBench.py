@@ -0,0 +1,213 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  What a few misbehaving clients do to a real match, with the per connection
+#                           limits in admission.py and with every limit turned off
+# Misc:                     Run from the pong folder with "python benchmarks/floodBench.py".
+#                           One match of two loadBench.py bots plays while --attackers clients of each
+#                           --attack kind misbehave, reconnecting as soon as they are disconnected:
+#                           "rate" sends game state lines as fast as it can (and reads what it is sent, so
+#                           the fan-out queues do not evict it first), "oversize" sends one line that never
+#                           ends, "garbage" sends lines that are not anything the server knows, and "connect"
+#                           opens --connections sockets and sits on them. The table shows the bots' latency,
+#                           how many of their states arrived, the server's CPU, and the kicked_* and
+#                           connections_rejected counters from the server's metrics.
+# =================================================================================================
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # The servers import pygame through the game code
+
+from assets.code.admission import Limits
+from loadBench import free_port, worker_process
+
+# Every limit far past anything the attackers reach, the server as it was before admission.py
+NO_LIMITS = Limits(maxClients=1 << 30, frameRate=1e12, frameBurst=1 << 60, maxPending=1 << 60,
+                   maxBadFrames=1 << 60, maxDropped=1 << 60)
+
+def counters(metrics) -> dict:
+    return {"cpu": time.process_time(), "counters": dict(metrics.counters)}
+
+# Author:  Jacob Blankenship
+# Purpose:  Body of the server process, the threaded or async server with the given limits
+# Pre:  port is free, pipe is one end of a multiprocessing.Pipe
+# Post:  Answers "mark" with its CPU time and counters, and returns once told to stop
+def server_process(mode:str, port:int, limits:Limits, pipe) -> None:
+    from assets.code.serverLog import setup_logging
+    setup_logging("error") # Every kick is a warning, printing them would be most of the run
+    if mode == "thread":
+        import pongServer
+        pongServer.HOST = "127.0.0.1"
+        pongServer.PORT = port
+        pongServer.limits = limits
+
+        def answer() -> None:
+            while pipe.recv() == "mark":
+                pipe.send(counters(pongServer.metrics))
+            pongServer.running = False
+
+        threading.Thread(target=answer, daemon=True).start()
+        pipe.send("ready")
+        pongServer.start_server()
+        return
+    from pongAsyncServer import AsyncPongServer
+    server = AsyncPongServer("127.0.0.1", port, limits=limits)
+
+    async def main():
+        ready = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(server.serve(ready))
+        await ready.wait()
+
+        def answer() -> None:
+            while pipe.recv() == "mark":
+                pipe.send(counters(server.metrics))
+            loop.call_soon_threadsafe(server.close)
+
+        threading.Thread(target=answer, daemon=True).start()
+        pipe.send("ready")
+        await task
+
+    asyncio.run(main())
+
+# Reads and throws away whatever the server sends, until the connection closes
+def drain(sock:socket.socket) -> None:
+    try:
+        while sock.recv(65536):
+            pass
+    except OSError:
+        pass
+
+# Author:  Jacob Blankenship
+# Purpose:  One misbehaving client, reconnecting every time the server disconnects it, until end
+# Pre:  A server is listening on port
+# Post:  Returns how many times it connected
+def attacker(kind:str, port:int, end:float, connections:int) -> int:
+    connected = 0
+    state = b"PN:left:PP:215:BX:320:BY:240:LS:0:RS:0:TM:0\n" * 64
+    garbage = b"HELLO THERE\n" * 64
+    endless = b"x" * 4096
+    while time.time() < end:
+        socks = []
+        try:
+            for _ in range(connections if kind == "connect" else 1):
+                sock = socket.create_connection(("127.0.0.1", port))
+                # A send or read never waits much past the end of the run
+                sock.settimeout(max(0.01, end - time.time()))
+                connected += 1
+                socks.append(sock)
+            if kind == "connect":
+                # Idle until the end, or until the last one is rejected and reads as closed
+                socks[-1].recv(1)
+                time.sleep(0.01)
+                continue
+            sock = socks[0]
+            threading.Thread(target=drain, args=(sock,), daemon=True).start()
+            data = {"rate": state, "garbage": garbage, "oversize": endless}[kind]
+            while time.time() < end:
+                sock.sendall(data)
+        except OSError:
+            # Disconnected by the server, try again a little later like a client that keeps retrying
+            time.sleep(0.01)
+        finally:
+            for sock in socks:
+                sock.close()
+    return connected
+
+def attack_process(kind:str, port:int, attackers:int, end:float, connections:int, pipe) -> None:
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(attacker(kind, port, end, connections)), daemon=True)
+               for _ in range(attackers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pipe.send(sum(results))
+
+# Author:  Jacob Blankenship
+# Purpose:  One run, a bot match under one kind of attack against one server mode
+# Pre:  args holds the command line options
+# Post:  Returns the bots' latencies and delivery, the server's CPU and its counters over the run
+def run(mode:str, kind:str, limited:bool, args) -> dict:
+    port = free_port()
+    limits = Limits(maxClients=args.max_clients) if limited else NO_LIMITS
+    pipe, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=server_process, args=(mode, port, limits, child), daemon=True)
+    server.start()
+    pipe.recv()
+
+    # The bots connect first so they are paired with each other, then the attack starts before the window
+    start = time.time() + args.warmup
+    end = start + args.duration
+    botPipe, botChild = multiprocessing.Pipe()
+    bots = multiprocessing.Process(target=worker_process, args=([port, port], args.rate, start, end, botChild), daemon=True)
+    bots.start()
+    time.sleep(args.warmup / 2)
+    attackPipe = None
+    if kind != "none":
+        attackPipe, attackChild = multiprocessing.Pipe()
+        multiprocessing.Process(target=attack_process, args=(kind, port, args.attackers, end, args.connections, attackChild),
+                                daemon=True).start()
+    time.sleep(max(0.0, start - time.time()))
+    pipe.send("mark")
+    before = pipe.recv()
+    time.sleep(max(0.0, end - time.time()))
+    pipe.send("mark")
+    after = pipe.recv()
+    result = botPipe.recv()
+    connects = attackPipe.recv() if attackPipe is not None else 0
+    pipe.send("stop")
+    server.join(10)
+    if server.is_alive():
+        server.terminate()
+
+    latencies = sorted(result["latencies"])
+    counted = {name: after["counters"].get(name, 0) for name in after["counters"]
+               if name.startswith("kicked_") or name == "connections_rejected"}
+    return {
+        "p50": statistics.median(latencies) if latencies else None,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else None,
+        "delivered": result["received"] / result["sent"] if result["sent"] else 0.0,
+        "cpu": (after["cpu"] - before["cpu"]) / args.duration * 100,
+        "connects": connects,
+        "counters": counted,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A bot match next to misbehaving clients, with and without admission limits")
+    parser.add_argument("--server", choices=["thread", "async", "both"], default="both")
+    parser.add_argument("--attack", nargs="+", choices=["none", "rate", "oversize", "garbage", "connect"],
+                        default=["none", "rate", "oversize", "garbage", "connect"])
+    parser.add_argument("--attackers", type=int, default=4, help="misbehaving clients of each kind")
+    parser.add_argument("--connections", type=int, default=100, help="sockets each connect attacker opens")
+    parser.add_argument("--max-clients", type=int, default=64, help="the connection cap with limits on")
+    parser.add_argument("--rate", type=int, default=60, help="state lines per second sent by each bot")
+    parser.add_argument("--duration", type=float, default=4.0, help="seconds measured per run")
+    parser.add_argument("--warmup", type=float, default=1.5)
+    args = parser.parse_args()
+
+    modes = ["thread", "async"] if args.server == "both" else [args.server]
+    print(f"{'server':>7} {'attack':>9} {'limits':>7} {'p50 ms':>7} {'p99 ms':>8} {'delivered':>10} {'cpu %':>6} "
+          f"{'connects':>9}  counters")
+    for mode in modes:
+        for kind in args.attack:
+            for limited in ((True,) if kind == "none" else (False, True)):
+                r = run(mode, kind, limited, args)
+                p50 = f"{r['p50']:.2f}" if r["p50"] is not None else "-"
+                p99 = f"{r['p99']:.2f}" if r["p99"] is not None else "-"
+                shown = " ".join(f"{name}={count}" for name, count in sorted(r["counters"].items())) or "-"
+                print(f"{mode:>7} {kind:>9} {'on' if limited else 'off':>7} {p50:>7} {p99:>8} {r['delivered'] * 100:>9.1f}% "
+                      f"{r['cpu']:>6.1f} {r['connects']:>9}  {shown}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Load generator for both server modes, headless bot clients playing N matches
+#                           at once, reporting throughput, latency, and server CPU and memory per match
+# Misc:                     Run from the pong folder with "python benchmarks/loadBench.py".
+#                           The bots do exactly what pongClient.py does on the wire: connect, wait for
+#                           START:<side>, then send a PN:...:TM: line every frame and read the other
+#                           player's lines. The TM field carries the send time in microseconds instead of
+#                           the frame count (the server never reads it), so latency can be measured
+#                           between bots in different processes. --server thread starts one pongServer.py
+#                           process and --server async one pongAsyncServer.py process, each hosting every
+#                           match, --server sharded one pongShardServer.py supervisor with --shards worker
+#                           processes (its CPU and memory are the supervisor's and workers' added up),
+#                           and bots run in --workers processes of their own. --out writes every run as JSON, and --baseline compares against
+#                           an earlier --out file and exits with status 1 if throughput dropped or p99
+#                           latency grew by more than --tolerance.
+# =================================================================================================
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # The servers import pygame through the game code
+
+try:
+    import resource # Not on Windows, memory is reported as 0 there
+except ImportError:
+    resource = None
+
+TM_WRAP = 1 << 32 # The binary format's TM field is 32 bits, so the timestamp wraps there (about 71 minutes)
+
+# Peak resident memory of this process in KB, 0 where it can not be read
+def peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+# This process's CPU time and peak memory, with the relay latency and frames relayed from its metrics
+def local_mark(metrics) -> dict:
+    return {"cpu": time.process_time(), "rss": peak_rss_kb(), "relay": metrics.relayLatency.summary(),
+            "relayed": metrics.counters["frames_relayed"]}
+
+# Answers "mark" with what read() returns until told to stop
+def answer_marks(pipe, read, stop) -> None:
+    while True:
+        cmd = pipe.recv()
+        if cmd == "mark":
+            pipe.send(read())
+        else:
+            stop()
+            return
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of the threaded server process, the real start_server() pairing every match on port
+# Pre:  port is free, pipe is one end of a multiprocessing.Pipe
+# Post:  Returns once told to stop, the server's own shutdown path runs as usual
+def thread_server_process(port:int, pipe) -> None:
+    import pongServer
+    from assets.code.serverLog import setup_logging
+    setup_logging("warning")
+    pongServer.HOST = "127.0.0.1"
+    pongServer.PORT = port
+    threading.Thread(target=answer_marks, args=(pipe, lambda: local_mark(pongServer.metrics),
+                                                lambda: setattr(pongServer, "running", False)), daemon=True).start()
+    pipe.send("ready")
+    pongServer.start_server()
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of the async server process, one AsyncPongServer hosting every match on port
+# Pre:  port is free, pipe is one end of a multiprocessing.Pipe
+# Post:  Returns once told to stop
+def async_server_process(port:int, pipe) -> None:
+    from pongAsyncServer import AsyncPongServer
+    from assets.code.serverLog import setup_logging
+    setup_logging("warning")
+    server = AsyncPongServer("127.0.0.1", port)
+
+    async def main():
+        ready = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(server.serve(ready))
+        await ready.wait()
+        threading.Thread(target=answer_marks, args=(pipe, lambda: local_mark(server.metrics),
+                                                    lambda: loop.call_soon_threadsafe(server.close)), daemon=True).start()
+        pipe.send("ready")
+        await task
+
+    asyncio.run(main())
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of the sharded server process, a ShardServer supervisor and its worker processes
+# Pre:  port is free, shards is the number of workers
+# Post:  Returns once told to stop and every worker has exited
+def shard_server_process(port:int, pipe, shards:int) -> None:
+    import pongShardServer
+    from assets.code.serverLog import setup_logging
+    setup_logging("warning")
+    # Workers report their CPU time with their status, asked for often so a mark is never far behind
+    pongShardServer.HEALTH_INTERVAL = 0.1
+    server = pongShardServer.ShardServer("127.0.0.1", port, shards, logLevel="warning")
+
+    def read() -> dict:
+        cpu, rss = server.usage()
+        merged = server.merged.merged()
+        return {"cpu": cpu, "rss": rss, "relay": merged.relayLatency.summary(),
+                "relayed": merged.counters["frames_relayed"]}
+
+    ready = threading.Event()
+
+    def marks() -> None:
+        ready.wait()
+        pipe.send("ready")
+        answer_marks(pipe, read, server.close)
+
+    threading.Thread(target=marks, daemon=True).start()
+    server.serve(ready)
+
+def now_us() -> int:
+    return time.time_ns() // 1000 % TM_WRAP
+
+# Author:  Daniel Krutsick
+# Purpose:  One headless player, pongClient.py's handshake and state line without the window
+# Pre:  A server is listening on port, start is the wall clock time the measured window opens
+# Post:  Returns (latencies in ms, lines sent, lines received) for the window, or None if it never got START
+async def bot(port:int, rate:int, start:float, end:float) -> tuple:
+    for attempt in range(50):
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            break
+        except OSError:
+            # The server only listens once its process is up
+            await asyncio.sleep(0.1)
+    else:
+        return None
+    try:
+        line = await asyncio.wait_for(reader.readline(), max(end - time.time(), 1.0))
+    except asyncio.TimeoutError:
+        writer.close()
+        return None
+    if not line.startswith(b"START:"):
+        writer.close()
+        return None
+    side = line.decode().strip().split(":")[1]
+    # The server also sends a player's own states back to it, only the other player's are counted
+    own = f"PN:{side}:".encode('utf-8')
+    latencies = []
+    counts = {"sent": 0, "received": 0}
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if not line.startswith(b"PN:") or line.startswith(own):
+                continue
+            arrived = time.time()
+            if start <= arrived < end:
+                counts["received"] += 1
+                sent = int(line.rsplit(b":", 1)[1])
+                latencies.append(((now_us() - sent) % TM_WRAP) / 1000)
+
+    receiveTask = asyncio.create_task(receive())
+    frame = 0
+    first = time.perf_counter()
+    # Sending stops a little after the window so the last states sent in it can still arrive
+    while time.time() < end + 0.2:
+        frame += 1
+        writer.write(f"PN:{side}:PP:215:BX:320:BY:240:LS:0:RS:0:TM:{now_us()}\n".encode('utf-8'))
+        if start <= time.time() < end:
+            counts["sent"] += 1
+        await asyncio.sleep(max(0.0, first + frame / rate - time.perf_counter()))
+    receiveTask.cancel()
+    writer.close()
+    return latencies, counts["sent"], counts["received"]
+
+# Body of one bot worker process, runs a bot for every port in ports and sends back what they measured
+def worker_process(ports:list, rate:int, start:float, end:float, pipe) -> None:
+    async def main():
+        return await asyncio.gather(*(bot(port, rate, start, end) for port in ports))
+    results = asyncio.run(main())
+    latencies = []
+    sent = received = failed = 0
+    for result in results:
+        if result is None:
+            failed += 1
+            continue
+        latencies.extend(result[0])
+        sent += result[1]
+        received += result[2]
+    pipe.send({"latencies": latencies, "sent": sent, "received": received, "failed": failed, "rss": peak_rss_kb()})
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Author:  Daniel Krutsick
+# Purpose:  One run, N matches played against the chosen server mode for the warmup and measured window
+# Pre:  args holds the command line options
+# Post:  Returns one result record, as written to --out
+def run(mode:str, matches:int, args) -> dict:
+    workers = args.workers or max(1, min(matches, math.ceil(matches / 50)))
+    port = free_port()
+    pipe, child = multiprocessing.Pipe()
+    if mode == "sharded":
+        # Not a daemon, a daemon process may not start worker processes of its own
+        server = multiprocessing.Process(target=shard_server_process, args=(port, child, args.shards))
+    else:
+        target = thread_server_process if mode == "thread" else async_server_process
+        server = multiprocessing.Process(target=target, args=(port, child), daemon=True)
+    server.start()
+    pipe.recv()
+
+    # Every process works to the same wall clock window, set far enough ahead for all bots to connect
+    start = time.time() + args.warmup + 0.05 * matches
+    end = start + args.duration
+    bots = []
+    for w in range(workers):
+        # An even number of bots per worker, though the server may still pair bots from two workers
+        share = [port] * (2 * ((w + 1) * matches // workers - w * matches // workers))
+        botPipe, botChild = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=worker_process, args=(share, args.rate, start, end, botChild), daemon=True)
+        process.start()
+        bots.append((process, botPipe))
+
+    time.sleep(max(0.0, start - time.time()))
+    pipe.send("mark")
+    before = pipe.recv()
+    time.sleep(max(0.0, end - time.time()))
+    pipe.send("mark")
+    after = pipe.recv()
+
+    results = [botPipe.recv() for _, botPipe in bots]
+    for process, _ in bots:
+        process.join(10)
+    pipe.send("stop")
+    server.join(10)
+    if server.is_alive():
+        server.terminate()
+
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    received = sum(result["received"] for result in results)
+    sent = sum(result["sent"] for result in results)
+    cpu = after["cpu"] - before["cpu"]
+    relayed = after["relayed"] - before["relayed"]
+    return {
+        "server": mode,
+        "shards": args.shards if mode == "sharded" else 1,
+        "matches": matches,
+        "rate": args.rate,
+        "duration": args.duration,
+        "bots_failed": sum(result["failed"] for result in results),
+        "sent_per_s": sent / args.duration,
+        "received_per_s": received / args.duration,
+        "relayed_per_s": relayed / args.duration,
+        "delivered": received / sent if sent else 0.0,
+        "latency_p50_ms": statistics.median(latencies) if latencies else None,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99)] if latencies else None,
+        "latency_max_ms": latencies[-1] if latencies else None,
+        "server_relay_p99_ms": after["relay"]["p99"] * 1000,
+        "server_cpu_pct": cpu / args.duration * 100,
+        "server_cpu_pct_per_match": cpu / args.duration * 100 / matches,
+        "server_rss_kb_per_match": after["rss"] / matches,
+    }
+
+# Compares each run with the same server mode, worker count and match count in baseline, returns the regressions found
+def compare(runs:list, baseline:list, tolerance:float) -> list:
+    previous = {(r["server"], r.get("shards", 1), r["matches"]): r for r in baseline}
+    problems = []
+    for r in runs:
+        old = previous.get((r["server"], r["shards"], r["matches"]))
+        if old is None:
+            continue
+        name = f"{r['server']} x{r['matches']}"
+        if r["received_per_s"] < old["received_per_s"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {r['received_per_s']:.0f}/s, was {old['received_per_s']:.0f}/s")
+        if old["latency_p99_ms"] and r["latency_p99_ms"] and r["latency_p99_ms"] > old["latency_p99_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p99 latency {r['latency_p99_ms']:.2f} ms, was {old['latency_p99_ms']:.2f} ms")
+        if r["bots_failed"] > old["bots_failed"]:
+            problems.append(f"{name}: {r['bots_failed']} bots never started, was {old['bots_failed']}")
+    return problems
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless bot load against pongServer.py, sweeping concurrent matches")
+    parser.add_argument("--server", choices=["thread", "async", "sharded", "both"], default="both")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="worker processes for --server sharded")
+    parser.add_argument("--matches", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rate", type=int, default=60, help="state lines per second sent by each bot")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per run")
+    parser.add_argument("--warmup", type=float, default=1.5, help="seconds before measuring, on top of connect time")
+    parser.add_argument("--workers", type=int, default=0, help="bot processes, 0 picks one per 50 matches")
+    parser.add_argument("--out", help="write every run to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --out to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed change against the baseline, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    modes = ["thread", "async"] if args.server == "both" else [args.server]
+    runs = []
+    print(f"{'server':>7} {'matches':>8} {'recv/s':>9} {'delivered':>10} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'relay p99':>10} {'cpu %':>6} {'cpu %/match':>12} {'KB/match':>9} {'failed':>7}")
+    for mode in modes:
+        for matches in args.matches:
+            r = run(mode, matches, args)
+            runs.append(r)
+            label = f"shard{args.shards}" if mode == "sharded" else mode
+            p50 = f"{r['latency_p50_ms']:.2f}" if r["latency_p50_ms"] is not None else "-"
+            p99 = f"{r['latency_p99_ms']:.2f}" if r["latency_p99_ms"] is not None else "-"
+            print(f"{label:>7} {matches:>8} {r['received_per_s']:>9,.0f} {r['delivered'] * 100:>9.1f}% {p50:>7} {p99:>7} "
+                  f"{'<=' + format(r['server_relay_p99_ms'], 'g'):>10} {r['server_cpu_pct']:>6.1f} "
+                  f"{r['server_cpu_pct_per_match']:>12.2f} {r['server_rss_kb_per_match']:>9,.0f} {r['bots_failed']:>7}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                       "time": time.strftime("%Y-%m-%d %H:%M:%S"), "runs": runs}, f, indent=1)
+        print(f"results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(runs, json.load(f)["runs"], args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  How fast one long running server starts matches, with players arriving and
+#                           with players going back to the lobby after each match
+# Misc:                     Run from the pong folder with "python benchmarks/lobbyBench.py".
+#                           "restart" times what every match used to cost when the threaded server ran
+#                           one match per process: starting a new server process until it listens.
+#                           "connect" has --players clients connect, get START, send a few states and
+#                           hang up, over and over. "requeue" keeps them connected and has each send
+#                           REQUEUE after a few states, as pongClient.py does when a match is over.
+#                           Both report matches started per second and the time from joining the lobby
+#                           (connecting or sending REQUEUE) to START. New connections wait the lobby's
+#                           grace period for a WATCH line first, so "connect" is never faster than that.
+#                           The server's frame rate limit is lifted, a requeue player sends its states
+#                           far faster than a real client. A player that is disconnected anyway stops and
+#                           is counted in the dropped column.
+# =================================================================================================
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+PONG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Body of the threaded server process, answers "matches" with the number started so far until told to stop
+def server_process(port:int, pipe) -> None:
+    import pongServer
+    from assets.code.admission import Limits
+    from assets.code.serverLog import setup_logging
+    setup_logging("warning")
+    pongServer.HOST = "127.0.0.1"
+    pongServer.PORT = port
+    # Every player sends its states and REQUEUE back to back, far over the 240 a second a real client is held to
+    pongServer.limits = Limits(frameRate=1e12, frameBurst=1 << 60)
+
+    def commands():
+        while pipe.recv() == "matches":
+            pipe.send((pongServer.metrics.counters["matches_started"], time.process_time()))
+        pongServer.running = False
+
+    threading.Thread(target=commands, daemon=True).start()
+    pipe.send("ready")
+    pongServer.start_server()
+
+# Author:  Daniel Krutsick
+# Purpose:  Starts a fresh threaded server process again and again, the old cost of every match
+# Pre:  count is how many times to start one
+# Post:  Returns the seconds each took from being started to accepting a connection
+def restart_bench(count:int) -> list:
+    times = []
+    script = ("import sys, pongServer\n"
+              "pongServer.HOST = '127.0.0.1'\n"
+              "pongServer.PORT = int(sys.argv[1])\n"
+              "pongServer.start_server()\n")
+    for _ in range(count):
+        port = free_port()
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-c", script, str(port)], cwd=PONG_DIR, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), 0.1).close()
+                break
+            except OSError:
+                time.sleep(0.002)
+        times.append(time.perf_counter() - start)
+        process.kill()
+        process.wait()
+    return times
+
+# Author:  Daniel Krutsick
+# Purpose:  One player that keeps joining the lobby until the end time
+# Pre:  The server is listening on port, requeue picks REQUEUE over reconnecting
+# Post:  Returns the seconds from each join to its START, and whether the server disconnected the player
+async def player(port:int, end:float, requeue:bool, states:int) -> tuple:
+    waits = []
+    reader = writer = None
+    dropped = False
+    try:
+        while time.perf_counter() < end:
+            joined = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            else:
+                writer.write(b"REQUEUE\n")
+            try:
+                while True:
+                    # Whoever joins last may have nobody left to play, so the wait ends with the run
+                    line = await asyncio.wait_for(reader.readline(), max(0.5, end + 0.5 - time.perf_counter()))
+                    if not line or line.startswith(b"START:"):
+                        break
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                # A requeue player is only hung up on by the server, one that reconnects hangs up itself
+                dropped = requeue
+                break
+            waits.append(time.perf_counter() - joined)
+            side = line.decode().strip().split(":")[1]
+            for tick in range(states):
+                writer.write(f"PN:{side}:PP:215:BX:320:BY:240:LS:0:RS:0:TM:{tick}\n".encode('utf-8'))
+            await writer.drain()
+            if not requeue:
+                writer.close()
+                writer = None
+    except ConnectionError:
+        dropped = True
+    if writer is not None:
+        writer.close()
+    return waits, dropped
+
+def churn_bench(port:int, pipe, players:int, seconds:float, requeue:bool, states:int) -> dict:
+    async def main():
+        end = time.perf_counter() + seconds
+        return await asyncio.gather(*(player(port, end, requeue, states) for _ in range(players)))
+    pipe.send("matches")
+    startMatches, startCpu = pipe.recv()
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    pipe.send("matches")
+    endMatches, endCpu = pipe.recv()
+    waits = sorted(wait for waitList, _ in results for wait in waitList)
+    return {"matches": endMatches - startMatches, "dropped": sum(dropped for _, dropped in results), "per_second": (endMatches - startMatches) / elapsed,
+            "cpu": (endCpu - startCpu) / elapsed * 100,
+            "p50": statistics.median(waits) if waits else 0.0, "p99": waits[int(len(waits) * 0.99)] if waits else 0.0}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Match creation rate of one long running server")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 20, 100])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--states", type=int, default=5, help="states each player sends per match")
+    parser.add_argument("--restarts", type=int, default=5, help="server processes to start for the restart figure")
+    args = parser.parse_args()
+
+    if args.restarts:
+        times = restart_bench(args.restarts)
+        print(f"restart: new server process until it accepts, median {statistics.median(times) * 1000:.0f} ms "
+              f"(at most {1 / statistics.median(times):.1f} matches/s one after another)")
+
+    port = free_port()
+    pipe, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=server_process, args=(port, child), daemon=True)
+    server.start()
+    pipe.recv()
+    print(f"{'mode':>8} {'players':>8} {'matches':>8} {'matches/s':>10} {'join->START p50':>16} {'p99':>8} {'server cpu %':>13} {'dropped':>8}")
+    for requeue in (False, True):
+        for players in args.players:
+            r = churn_bench(port, pipe, players, args.seconds, requeue, args.states)
+            mode = "requeue" if requeue else "connect"
+            print(f"{mode:>8} {players:>8} {r['matches']:>8} {r['per_second']:>10.1f} {r['p50'] * 1000:>13.1f} ms "
+                  f"{r['p99'] * 1000:>5.1f} ms {r['cpu']:>13.1f} {r['dropped']:>8}")
+            # Everyone from the last run has to be gone before the next one, or they would be paired with it
+            time.sleep(0.5)
+    pipe.send("stop")
+    server.join(5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Cost of one rendered frame reading the network, draining and parsing a
+#                           queue.Queue in playGame() against reading the StateMailbox
+# Misc:                     Run from the pong folder with "python benchmarks/mailboxBench.py".
+#                           Each run is one burst of --burst text states for both sides arriving at once,
+#                           like the backlog after a network stall. The queue path is what playGame() used
+#                           to do, the mailbox path is timed on the render side only, since the parsing
+#                           moved to the receive thread.
+# =================================================================================================
+
+import argparse
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.netcode import SnapshotBuffer, StateMailbox
+from assets.code.wireProtocol import parse_text
+
+def lines(count:int) -> list:
+    return [f"PN:{side}:PP:{tick % 400}:BX:{tick % 640}:BY:{tick % 480}:LS:0:RS:0:TM:{tick}"
+            for tick in range(count) for side in ("left", "right")]
+
+# The old playGame() loop, every message is parsed and every opponent state goes into the buffer
+def queue_frame(messages:queue.Queue, buffer:SnapshotBuffer) -> dict:
+    latest = {"left": None, "right": None}
+    while not messages.empty():
+        parsed = parse_text(messages.get_nowait())
+        latest[parsed.name] = parsed
+        if parsed.name == "right":
+            buffer.push(parsed)
+    return latest
+
+def mailbox_frame(mailbox:StateMailbox, buffer:SnapshotBuffer) -> dict:
+    latest = {side: mailbox.take(side)[0] for side in ("left", "right")}
+    for state in mailbox.recent("right"):
+        buffer.push(state)
+    return latest
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render side cost of a burst of states, queue against mailbox")
+    parser.add_argument("--burst", type=int, nargs="+", default=[1, 10, 60, 300, 1000], help="states per side in one burst")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'burst':>6} {'queue us/frame':>15} {'mailbox us/frame':>17}")
+    for burst in args.burst:
+        text = lines(burst)
+        queueTime = mailboxTime = 0.0
+        for _ in range(args.repeat):
+            messages = queue.Queue()
+            for line in text:
+                messages.put(line)
+            buffer = SnapshotBuffer()
+            start = time.perf_counter()
+            queued = queue_frame(messages, buffer)
+            queueTime += time.perf_counter() - start
+
+            mailbox = StateMailbox()
+            for line in text:
+                mailbox.publish(parse_text(line))
+            buffer = SnapshotBuffer()
+            start = time.perf_counter()
+            taken = mailbox_frame(mailbox, buffer)
+            mailboxTime += time.perf_counter() - start
+            # Both ways have to end the frame on the same newest state for each side
+            for side in ("left", "right"):
+                if queued[side].time != taken[side].time:
+                    sys.exit(f"burst {burst}: the mailbox kept tick {taken[side].time} for {side}, "
+                             f"the queue {queued[side].time}")
+        print(f"{burst:>6} {queueTime / args.repeat * 1e6:>15,.1f} {mailboxTime / args.repeat * 1e6:>17,.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  What the server's output and instrumentation cost per frame, and a live
+#                           scrape of the metrics endpoint
+# Misc:                     Run from the pong folder with "python benchmarks/metricsBench.py".
+#                           "output" times one line per relayed frame the old way (print to a terminal,
+#                           here a pipe that something reads) against the leveled logger with the line
+#                           turned off and with a flood of warnings that the rate limit holds back.
+#                           "hot path" times a plain lock against TimedLock and one Histogram.observe().
+#                           "live" runs an async server with its metrics port open, plays two text
+#                           players against each other and prints what /metrics.json reports.
+# =================================================================================================
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.metrics import Histogram, TimedLock
+from assets.code.serverLog import setup_logging, stop_logging
+from assets.code.wireProtocol import GameState
+
+def per_call(fn, count:int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+def output_bench(count:int) -> None:
+    state = GameState("left", 215, 320, 240, 0, 0, 1234)
+    addr = ("127.0.0.1", 50000)
+    # A real terminal is slower still, a pipe read by another process is the cheapest place print() can go
+    reader = subprocess.Popen([sys.executable, "-c", "import sys\nfor _ in sys.stdin: pass"], stdin=subprocess.PIPE, text=True)
+    realStdout = sys.stdout
+    sys.stdout = reader.stdin
+    try:
+        printed = per_call(lambda i: print(f"[{addr}] Relaying message: {state}"), count)
+    finally:
+        sys.stdout = realStdout
+    reader.stdin.close()
+    reader.wait()
+
+    sink = io.StringIO()
+    log = setup_logging("info", sink)
+    debugOff = per_call(lambda i: log.debug("[%s] Relaying message: %s", addr, state), count)
+    guarded = log.isEnabledFor(logging.DEBUG)
+    guardedOff = per_call(lambda i: guarded and log.debug("[%s] Relaying message: %s", addr, state), count)
+    flood = per_call(lambda i: log.warning("[WARNING] Could not parse message: %r", b"garbage"), count)
+    stop_logging()
+    written = sink.getvalue().count("\n")
+    print(f"output, {count:,} lines:")
+    print(f"  print() every frame                 {printed:7.3f} us per frame")
+    print(f"  log.debug() with debug off          {debugOff:7.3f} us per frame")
+    print(f"  isEnabledFor() checked once         {guardedOff:7.3f} us per frame")
+    print(f"  log.warning() flood, rate limited   {flood:7.3f} us per frame ({written} lines written)")
+
+def hot_path_bench(count:int) -> None:
+    plain = threading.Lock()
+    def plainLock(i):
+        with plain:
+            pass
+    timed = TimedLock()
+    def timedLock(i):
+        with timed:
+            pass
+    histogram = Histogram()
+    print(f"hot path, {count:,} calls:")
+    print(f"  threading.Lock                      {per_call(plainLock, count):7.3f} us")
+    print(f"  TimedLock                           {per_call(timedLock, count):7.3f} us")
+    print(f"  Histogram.observe()                 {per_call(lambda i: histogram.observe(i * 1e-7), count):7.3f} us")
+
+async def live_bench(seconds:float, rate:int) -> dict:
+    from pongAsyncServer import AsyncPongServer
+    server = AsyncPongServer("127.0.0.1", 0, metricsPort=0)
+    ready = asyncio.Event()
+    serveTask = asyncio.create_task(server.serve(ready))
+    await ready.wait()
+
+    async def player():
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        side = (await reader.readline()).decode().strip().split(":")[1]
+        async def drain():
+            while await reader.read(65536):
+                pass
+        drainTask = asyncio.create_task(drain())
+        start = time.perf_counter()
+        tick = 0
+        while time.perf_counter() - start < seconds:
+            tick += 1
+            writer.write(f"PN:{side}:PP:215:BX:320:BY:240:LS:0:RS:0:TM:{tick}\n".encode('utf-8'))
+            if tick % 100 == 0:
+                writer.write(b"NOT A FRAME\n")
+            await asyncio.sleep(max(0.0, start + tick / rate - time.perf_counter()))
+        drainTask.cancel()
+        writer.close()
+
+    players = [asyncio.create_task(player()) for _ in range(2)]
+    await asyncio.sleep(seconds / 2)
+    url = f"http://127.0.0.1:{server.metricsPort}"
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(None, lambda: urllib.request.urlopen(url + "/metrics").read().decode())
+    snapshot = json.loads(await loop.run_in_executor(None, lambda: urllib.request.urlopen(url + "/metrics.json").read()))
+    await asyncio.gather(*players)
+    server.close()
+    await serveTask
+    return {"text": text, "snapshot": snapshot}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost of server output and instrumentation, and a live metrics scrape")
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rate", type=int, default=120, help="states per second sent by each player in the live run")
+    args = parser.parse_args()
+
+    output_bench(args.count)
+    hot_path_bench(args.count)
+
+    result = asyncio.run(live_bench(args.seconds, args.rate))
+    snapshot = result["snapshot"]
+    print(f"live, two players at {args.rate} states/s, scraped halfway through:")
+    print(f"  /metrics                            {len(result['text'].splitlines())} lines, "
+          f"{sum(line.startswith('pong_connection_') for line in result['text'].splitlines())} per connection")
+    print(f"  counters                            {snapshot['counters']}")
+    for name in ("relay_latency_seconds", "send_latency_seconds"):
+        h = snapshot["histograms"][name]
+        print(f"  {name:<35} count {h['count']}, p50 <= {h['p50'] * 1e6:g} us, p99 <= {h['p99'] * 1e6:g} us, "
+              f"max {h['max'] * 1e6:.0f} us")
+    for peer, entry in snapshot["connections"].items():
+        print(f"  {peer:<35} in {entry['frames_in']} frames/{entry['bytes_in']} B, out {entry['frames_out']} frames/"
+              f"{entry['bytes_out']} B, parse failures {entry['parse_failures']}")
+
+if __name__ == "__main__":
+    main()
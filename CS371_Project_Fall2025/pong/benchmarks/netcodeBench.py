@@ -0,0 +1,109 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  How smooth and how late the client draws a server-run match, snapping to
+#                           the newest state versus interpolating from the snapshot buffer
+# Misc:                     Run from the pong folder with "python benchmarks/netcodeBench.py".
+#                           A headless match is stepped at 60 Hz, each state reaches the client after
+#                           half the RTT plus random jitter, and the client draws at 60 Hz in between.
+#                           Stutter is the average change in ball speed from one drawn frame to the next
+#                           in pixels, a ball moving in a straight line scores 0.
+#                           The player's paddle is predicted and corrected against server acks, and the
+#                           number of frames where the correction moved it is reported as well.
+# =================================================================================================
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from assets.code.gameSim import PongSim
+from assets.code.helperCode import Paddle
+from assets.code.netcode import InputQueue, PaddlePredictor, SnapshotBuffer
+
+# Moves a paddle toward the ball, but only once it is a few pixels off, so the paddle rests sometimes
+def chase(y:int, ballY:int) -> str:
+    offset = ballY - (y + 25)
+    return "down" if offset > 15 else "up" if offset < -15 else ""
+
+def run(rtt:float, jitter:float, ticks:int, seed:int) -> dict:
+    rng = random.Random(seed)
+    sim = PongSim()
+    buffer = SnapshotBuffer()
+    predictor = PaddlePredictor(Paddle(pygame.Rect(10, sim.leftPaddle.rect.y, 10, 50)), sim.screenHeight)
+    arrivals = [] # (local time, kind, payload) for everything sent down to the client
+    inputs = [] # (server time, input sequence number, moving) sent up by the client
+    serverInputs = InputQueue()
+    shown = {"snap": [], "interp": []}
+    latency = {"snap": 0.0, "interp": 0.0}
+    snapState = None
+    corrections = 0
+
+    for tick in range(ticks):
+        now = tick / 60
+        # The client draws half a frame after the server tick
+        drawTime = now + 1 / 120
+        # Server: queue inputs that have arrived and use one per tick, like run_room(), then send both states down
+        while inputs and inputs[0][0] <= now:
+            _, seq, moving = inputs.pop(0)
+            serverInputs.push(seq, moving)
+        nextInput = serverInputs.take()
+        if nextInput is not None:
+            sim.set_input("left", nextInput[1])
+        sim.set_input("right", chase(sim.rightPaddle.rect.y, sim.ball.rect.y))
+        sim.step()
+        delay = rtt / 2 + rng.random() * jitter
+        left, right = sim.states()
+        arrivals.append((now + delay, "state", (left, right, serverInputs.lastSeq)))
+        arrivals.sort(key=lambda a: a[0])
+
+        # Client: take what has arrived, in arrival order
+        ownState = None
+        while arrivals and arrivals[0][0] <= drawTime:
+            arrivedAt, _, (left, right, ack) = arrivals.pop(0)
+            buffer.push(right, arrivedAt)
+            snapState = right
+            ownState = (left.pos, ack)
+        if ownState is not None:
+            before = predictor.paddle.rect.y
+            predictor.reconcile(*ownState)
+            corrections += predictor.paddle.rect.y != before
+        seq = predictor.apply(chase(predictor.paddle.rect.y, sim.ball.rect.y))
+        inputs.append((drawTime + rtt / 2 + rng.random() * jitter, seq, predictor.history[-1][1]))
+        inputs.sort(key=lambda i: i[0])
+
+        interp = buffer.sample(drawTime)
+        for name, state in (("snap", snapState), ("interp", interp)):
+            if state is not None:
+                shown[name].append(state.bx)
+                latency[name] += drawTime - state.time / 60
+
+    results = {}
+    for name, xs in shown.items():
+        # Second difference of the drawn ball position, skipping serves where the ball jumps to the middle
+        changes = [abs(xs[i] - 2 * xs[i - 1] + xs[i - 2]) for i in range(2, len(xs))]
+        changes = [c for c in changes if c < 100]
+        results[name] = (sum(changes) / len(changes), latency[name] / len(xs) * 1000)
+    results["corrections"] = corrections
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stutter and delay of snapping versus interpolation")
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0.05, 0.1, 0.15], help="round trip times in seconds")
+    parser.add_argument("--jitter", type=float, default=0.03, help="extra random delay per frame, in seconds")
+    parser.add_argument("--ticks", type=int, default=3600, help="60 ticks is one second of play")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'rtt ms':>6} {'snap stutter':>13} {'snap delay ms':>14} {'interp stutter':>15} {'interp delay ms':>16} {'corrections':>12}")
+    for rtt in args.rtt:
+        r = run(rtt, args.jitter, args.ticks, args.seed)
+        print(f"{rtt * 1000:>6.0f} {r['snap'][0]:>13.2f} {r['snap'][1]:>14.0f} {r['interp'][0]:>15.2f} {r['interp'][1]:>16.0f} {r['corrections']:>12}")
+
+if __name__ == "__main__":
+    main()
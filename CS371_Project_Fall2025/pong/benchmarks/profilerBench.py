@@ -0,0 +1,118 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  What the frame profiler (frameProfiler.py) itself costs a frame, so its numbers
+#                           can be trusted, and checks that the F3 overlay leaves no trace in the window
+# Misc:                     Run from the pong folder with "python benchmarks/profilerBench.py".
+#                           "bookkeeping" is begin(), the six marks and five values playGame() makes each
+#                           frame, with and without --trace. "draw" is PongRenderer.draw() for a bot match
+#                           with no overlay, with the overlay as playGame() shows it (re-rendered four times
+#                           a second) and with it re-rendered every frame. "export" writes --frames frames of
+#                           trace. Afterwards the overlay is turned off and the window is compared pixel by
+#                           pixel with a full redraw, which should find no differences.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+PHASES = ("events", "network", "update", "draw", "send", "wait")
+VALUES = ("rtt ms", "clock rtt ms", "states", "msgs", "unsent")
+
+# Microseconds a frame of the profiler calls playGame() makes
+def bookkeeping(frames:int, trace:bool) -> float:
+    from assets.code.frameProfiler import FrameProfiler
+    profiler = FrameProfiler(trace=trace)
+    start = time.perf_counter()
+    for frame in range(frames):
+        profiler.begin()
+        for phase in PHASES:
+            profiler.mark(phase)
+        for name in VALUES:
+            profiler.value(name, frame)
+    return (time.perf_counter() - start) / frames * 1e6
+
+# Author:  Jacob Blankenship
+# Purpose:  Microseconds per renderer draw of a bot match, overlay is None, "shown" or "every frame"
+# Pre:  pygame is initialized with a window open
+# Post:  Returns the time per frame and the profiler, with the overlay still showing
+def draw_cost(screen, font, frames:int, overlay) -> tuple:
+    import pygame
+    from assets.code.frameProfiler import FrameProfiler
+    from assets.code.gameSim import ChaseBot, PongSim
+    from assets.code.renderer import PongRenderer
+    sim = PongSim()
+    bots = (ChaseBot("left", seed=1), ChaseBot("right", seed=2))
+    renderer = PongRenderer(screen, [sim.topWall, sim.bottomWall], font)
+    profiler = FrameProfiler()
+    profiler.showing = overlay is not None
+    spent = 0.0
+    for _ in range(frames):
+        if sim.is_over():
+            sim = PongSim()
+        profiler.begin()
+        sim.set_input("left", bots[0](sim))
+        sim.set_input("right", bots[1](sim))
+        sim.step()
+        profiler.mark("update")
+        start = time.perf_counter()
+        if overlay == "every frame":
+            profiler.overlay = None
+        shown = profiler.overlay_surface(pygame) if profiler.showing else None
+        renderer.draw([sim.ball.rect, sim.leftPaddle.rect, sim.rightPaddle.rect], sim.lScore, sim.rScore, shown)
+        spent += time.perf_counter() - start
+        profiler.mark("draw")
+    return spent / frames * 1e6, (sim, renderer, profiler)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost of the frame profiler and its overlay")
+    parser.add_argument("--frames", type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"bookkeeping: {bookkeeping(args.frames * 10, False):.2f} us a frame, "
+          f"{bookkeeping(args.frames * 10, True):.2f} us with --trace")
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from assets.code.frameProfiler import FrameProfiler
+    pygame.init()
+    screen = pygame.display.set_mode((640, 480))
+    font = pygame.font.Font("./assets/fonts/pong-score.ttf", 32)
+    for overlay in (None, "shown", "every frame"):
+        cost, _ = draw_cost(screen, font, args.frames, overlay)
+        print(f"draw with overlay {str(overlay or 'off'):>11}: {cost:7.1f} us a frame")
+
+    profiler = FrameProfiler(trace=True)
+    for frame in range(args.frames):
+        profiler.begin()
+        for phase in PHASES:
+            profiler.mark(phase)
+        for name in VALUES:
+            profiler.value(name, frame)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "trace.json")
+        start = time.perf_counter()
+        events = profiler.export(path)
+        print(f"export: {events} events ({args.frames} frames) in {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{os.path.getsize(path) / args.frames:.0f} bytes a frame")
+
+    # Turning the overlay off has to put back whatever was under it
+    _, (sim, renderer, profiler) = draw_cost(screen, font, 200, "shown")
+    renderer.draw([sim.ball.rect, sim.leftPaddle.rect, sim.rightPaddle.rect], sim.lScore, sim.rScore, None)
+    expected = pygame.Surface(screen.get_size())
+    expected.blit(renderer.background, (0, 0))
+    for rect in (sim.ball.rect, sim.leftPaddle.rect, sim.rightPaddle.rect):
+        pygame.draw.rect(expected, renderer.color, rect)
+    expected.blit(*renderer.score_surface(sim.lScore, sim.rScore))
+    width, height = screen.get_size()
+    differ = sum(screen.get_at((x, y)) != expected.get_at((x, y)) for x in range(0, width, 2) for y in range(0, height, 2))
+    print(f"pixels left over after hiding the overlay: {differ}")
+
+if __name__ == "__main__":
+    main()
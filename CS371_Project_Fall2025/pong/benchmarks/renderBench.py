@@ -0,0 +1,96 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Frames per second and pixels sent to the display for the old full redraw
+#                           against the dirty rectangle PongRenderer
+# Misc:                     Run from the pong folder with "python benchmarks/renderBench.py".
+#                           Uses SDL's dummy video driver unless --window is given, so it also runs with
+#                           no screen. A bot match is drawn both ways with no frame limit, and every
+#                           --verify frames the renderer's window is compared pixel by pixel with a
+#                           full redraw of the same frame.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from assets.code.gameSim import ChaseBot, PongSim
+from assets.code.helperCode import updateScore
+from assets.code.renderer import PongRenderer
+
+WHITE = (255, 255, 255)
+
+# What playGame() used to do every frame, onto any surface
+def full_redraw(surface:pygame.Surface, sim:PongSim, scoreFont:pygame.font.Font) -> None:
+    screenWidth, screenHeight = surface.get_size()
+    surface.fill((0, 0, 0))
+    pygame.draw.rect(surface, WHITE, sim.ball.rect)
+    for i in range(0, screenHeight, 10):
+        pygame.draw.rect(surface, WHITE, pygame.Rect((screenWidth/2)-5, i, 5, 5))
+    for paddle in sim.paddles.values():
+        pygame.draw.rect(surface, WHITE, paddle.rect)
+    pygame.draw.rect(surface, WHITE, sim.topWall)
+    pygame.draw.rect(surface, WHITE, sim.bottomWall)
+    updateScore(sim.lScore, sim.rScore, surface, WHITE, scoreFont)
+
+# Steps a bot match one tick, starting a new one once it is over so every frame has movement
+def next_frame(sim:PongSim, bots:tuple) -> PongSim:
+    if sim.is_over():
+        sim = PongSim()
+    sim.set_input("left", bots[0](sim))
+    sim.set_input("right", bots[1](sim))
+    sim.step()
+    return sim
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Full redraw against dirty rectangle rendering")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--verify", type=int, default=50, help="compare with a full redraw every this many frames")
+    parser.add_argument("--window", action="store_true", help="draw to a real window instead of the dummy driver")
+    args = parser.parse_args()
+
+    if not args.window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((640, 480))
+    scoreFont = pygame.font.Font("./assets/fonts/pong-score.ttf", 32)
+    pixels = screen.get_width() * screen.get_height()
+
+    sim = PongSim()
+    bots = (ChaseBot("left", seed=1), ChaseBot("right", seed=2))
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        sim = next_frame(sim, bots)
+        full_redraw(screen, sim, scoreFont)
+        pygame.display.update()
+    fullTime = time.perf_counter() - start
+
+    sim = PongSim()
+    bots = (ChaseBot("left", seed=1), ChaseBot("right", seed=2))
+    renderer = PongRenderer(screen, [sim.topWall, sim.bottomWall], scoreFont, WHITE)
+    reference = pygame.Surface(screen.get_size()).convert()
+    checked = 0
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        sim = next_frame(sim, bots)
+        renderer.draw([sim.ball.rect, sim.leftPaddle.rect, sim.rightPaddle.rect], sim.lScore, sim.rScore)
+        if args.verify and frame % args.verify == 0:
+            full_redraw(reference, sim, scoreFont)
+            assert pygame.image.tobytes(screen, "RGB") == pygame.image.tobytes(reference, "RGB"), f"frame {frame} differs"
+            checked += 1
+    dirtyTime = time.perf_counter() - start
+
+    print(f"{args.frames} frames at 640x480, {checked} of the dirty rect frames matched a full redraw pixel for pixel")
+    print(f"full redraw:  {args.frames / fullTime:>8,.0f} fps, {pixels:,} pixels sent per frame")
+    print(f"dirty rects:  {args.frames / dirtyTime:>8,.0f} fps, {renderer.pixelsUpdated / renderer.frames:,.0f} pixels sent per frame, "
+          f"{len(renderer.scoreCache)} score surfaces cached (the pixel checks count against its fps)")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Size, write speed and seek speed of replay files, recorded from bot matches
+# Misc:                     Run from the pong folder with "python benchmarks/replayBench.py".
+#                           Each match is played by two ChaseBots on a PongSim, and both paddles' states
+#                           are recorded every tick the way a server relays them (binary frames, plus
+#                           text frames with --text). The files are then read back and checked against
+#                           what was recorded: every frame in order, states_at() at random ticks against
+#                           a plain scan, and a copy cut off mid-block to stand in for a server that was
+#                           killed before it could close the file.
+# =================================================================================================
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.gameSim import ChaseBot, PongSim
+from assets.code.replay import BLOCK_FRAMES, ReplayReader, ReplayWriter
+from assets.code.wireProtocol import PROTO_BINARY, PROTO_TEXT, encode_binary, encode_text
+
+# Plays one bot match and returns every state both paddles would have sent, in order
+def play(seed:int) -> list:
+    sim = PongSim()
+    left = ChaseBot("left", seed=seed)
+    right = ChaseBot("right", seed=seed + 1)
+    states = []
+    while not sim.is_over():
+        sim.set_input("left", left(sim))
+        sim.set_input("right", right(sim))
+        sim.step()
+        states.extend(sim.states())
+    return states
+
+# The newest state of each paddle among the first recorded states up to tick, without the index
+def scan_states_at(states:list, tick:int) -> tuple:
+    newest = {}
+    for state in states:
+        if state.time > tick:
+            break
+        newest[state.name] = state
+    return newest.get("left"), newest.get("right")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay file size, write speed and seek speed")
+    parser.add_argument("--matches", type=int, default=5)
+    parser.add_argument("--seeks", type=int, default=2000)
+    parser.add_argument("--block", type=int, default=BLOCK_FRAMES, help="records per compressed block")
+    parser.add_argument("--text", action="store_true", help="record text frames, which have to be parsed first")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    kind, encode = (PROTO_TEXT, encode_text) if args.text else (PROTO_BINARY, encode_binary)
+    rng = random.Random(args.seed)
+    folder = tempfile.mkdtemp()
+    totals = {"frames": 0, "bytes": 0, "wire": 0, "write": 0.0, "read": 0.0, "seek": 0.0, "seeks": 0}
+
+    for match in range(args.matches):
+        states = play(args.seed + 2 * match)
+        frames = [encode(state) for state in states]
+        path = os.path.join(folder, f"match{match}.pongreplay")
+
+        start = time.perf_counter()
+        writer = ReplayWriter(path, args.block)
+        for frame in frames:
+            writer.record(kind, frame)
+        writer.close()
+        totals["write"] += time.perf_counter() - start
+        totals["frames"] += len(frames)
+        totals["bytes"] += os.path.getsize(path)
+        totals["wire"] += sum(len(frame) for frame in frames)
+
+        with ReplayReader(path) as reader:
+            assert reader.complete
+            start = time.perf_counter()
+            played = list(reader.frames())
+            totals["read"] += time.perf_counter() - start
+            assert played == states, f"match {match} does not read back the way it was recorded"
+
+            ticks = [rng.randint(reader.first_tick() - 5, reader.last_tick() + 5) for _ in range(args.seeks)]
+            start = time.perf_counter()
+            for tick in ticks:
+                reader.states_at(tick)
+            totals["seek"] += time.perf_counter() - start
+            totals["seeks"] += len(ticks)
+            for tick in ticks[:200]:
+                assert reader.states_at(tick) == scan_states_at(states, tick), f"match {match} differs at tick {tick}"
+
+        # A server killed mid-match leaves no index and half a block, every whole block is still readable
+        with open(path, "rb") as f:
+            data = f.read()
+        cut = os.path.join(folder, f"match{match}-cut.pongreplay")
+        with open(cut, "wb") as f:
+            f.write(data[:len(data) * 2 // 3])
+        with ReplayReader(cut) as reader:
+            assert not reader.complete and len(reader) > 0
+            recovered = list(reader.frames())
+            assert recovered == states[:len(recovered)]
+        os.remove(cut)
+        os.remove(path)
+    os.rmdir(folder)
+
+    frames = totals["frames"]
+    print(f"{args.matches} matches, {frames:,} {kind} frames recorded, read back identical, truncated copies recovered")
+    print(f"file size:  {totals['bytes']:,} bytes, {totals['bytes'] / frames:.2f} bytes per frame "
+          f"({totals['wire'] / frames:.1f} on the wire, {totals['wire'] / totals['bytes']:.1f}x smaller)")
+    print(f"write:      {frames / totals['write']:,.0f} frames/s ({totals['write'] / frames * 1e6:.2f} us per frame)")
+    print(f"read all:   {frames / totals['read']:,.0f} frames/s")
+    print(f"seek:       {totals['seek'] / totals['seeks'] * 1e6:.1f} us per random states_at() "
+          f"against {totals['read'] / args.matches * 1e3:.1f} ms to decode a whole match")
+
+if __name__ == "__main__":
+    main()
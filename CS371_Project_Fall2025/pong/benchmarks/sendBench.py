@@ -0,0 +1,149 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Cost of the client's send path to a 60 fps frame loop, sendall() on every
+#                           frame as playGame() used to do against handing states to the StateSender
+# Misc:                     Run from the pong folder with "python benchmarks/sendBench.py".
+#                           A local sink plays the server: it reads everything and sends it back, as the
+#                           servers send a player's own states back to it. "steady" keeps reading, "slow"
+#                           only reads --link bytes a second through small socket buffers, so the link backs
+#                           up like a congested one, and "idle" offers the same state every frame, like the
+#                           time between a point and the next serve.
+#                           Reports the frame loop's time spent sending (p50/p99/max), frames that missed
+#                           their 16.7 ms, and writes and bytes a second.
+# =================================================================================================
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.netcode import SEND_RATE, StateSender
+from assets.code.wireProtocol import GameState, encode_text
+
+FRAME = 1 / 60
+SMALL_BUFFER = 4096 # Socket buffer size for the slow scenario, so the backlog reaches the sender within seconds
+READ_CHUNK = 100 # Bytes the slow sink reads at a time
+
+# Author:  Jacob Blankenship
+# Purpose:  The server's part, reads the client's writes and sends them back
+# Pre:  conn is the accepted side of the client's connection, link is the bytes a second to read (0 for no limit)
+# Post:  Runs until the client closes
+def sink(conn:socket.socket, link:float) -> None:
+    try:
+        while True:
+            data = conn.recv(READ_CHUNK if link else 65536)
+            if not data:
+                return
+            conn.sendall(data)
+            if link:
+                time.sleep(len(data) / link)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+# Reads the echoed text states and tells the sender each one's tick, for its round trip
+def read_echoes(sock:socket.socket, sender) -> None:
+    pending = b""
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            if sender is not None:
+                for line in lines:
+                    sender.echoed(int(line.rsplit(b":", 1)[1]), state=True)
+    except OSError:
+        pass
+
+def connect(small:bool) -> tuple:
+    listener = socket.socket()
+    if small:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SMALL_BUFFER)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    client = socket.socket()
+    if small:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SMALL_BUFFER)
+    client.connect(listener.getsockname())
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    conn, _ = listener.accept()
+    listener.close()
+    return client, conn
+
+# Author:  Jacob Blankenship
+# Purpose:  One run of the frame loop against the sink
+# Pre:  mode is "inline" or "sender", scenario is "steady", "slow" or "idle"
+# Post:  Returns the frame loop's send times and what went over the socket
+def run(mode:str, scenario:str, seconds:float, link:float, rate:float) -> dict:
+    client, conn = connect(scenario == "slow")
+    start = time.perf_counter()
+    threading.Thread(target=sink, args=(conn, link if scenario == "slow" else 0), daemon=True).start()
+    writes = [0, 0] # writes, bytes
+
+    def write(data:bytes) -> None:
+        client.sendall(data)
+        writes[0] += 1
+        writes[1] += len(data)
+
+    sender = None
+    if mode == "sender":
+        sender = StateSender(write, "left", encode_text, rate)
+        sender.start()
+    threading.Thread(target=read_echoes, args=(client, sender), daemon=True).start()
+
+    sendTimes = []
+    missed = 0
+    frames = int(seconds * 60)
+    nextFrame = time.perf_counter()
+    for tick in range(frames):
+        # The ball moves every frame while in play, and sits still between a point and the serve
+        x = 320 if scenario == "idle" else tick % 600
+        state = GameState("left", 215, x, 240, 0, 0, tick)
+        before = time.perf_counter()
+        if sender is not None:
+            sender.offer(state)
+        else:
+            write(encode_text(state))
+        after = time.perf_counter()
+        sendTimes.append(after - before)
+        nextFrame += FRAME
+        if after > nextFrame:
+            missed += 1
+            nextFrame = after
+        else:
+            time.sleep(nextFrame - after)
+    elapsed = time.perf_counter() - start
+    stats = sender.stats() if sender is not None else {}
+    if sender is not None:
+        sender.stop()
+        sender.join(1)
+    client.close()
+    sendTimes.sort()
+    return {"p50": statistics.median(sendTimes), "p99": sendTimes[int(len(sendTimes) * 0.99)], "max": sendTimes[-1],
+            "missed": missed, "frames": frames, "writes": writes[0] / elapsed, "bytes": writes[1] / elapsed, "sender": stats}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Frame loop cost of sending game states")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--link", type=float, default=1000, help="bytes a second the slow scenario's sink reads")
+    parser.add_argument("--rate", type=float, default=SEND_RATE, help="the sender's most writes a second")
+    args = parser.parse_args()
+    print(f"{'scenario':>8} {'send path':>9} {'p50 us':>8} {'p99 us':>8} {'max ms':>8} {'missed':>7} {'writes/s':>9} {'bytes/s':>8}  sender")
+    for scenario in ("steady", "slow", "idle"):
+        for mode in ("inline", "sender"):
+            r = run(mode, scenario, args.seconds, args.link, args.rate)
+            print(f"{scenario:>8} {mode:>9} {r['p50'] * 1e6:>8.1f} {r['p99'] * 1e6:>8.1f} {r['max'] * 1000:>8.2f} "
+                  f"{r['missed']:>3}/{r['frames']:<3} {r['writes']:>9.1f} {r['bytes']:>8.0f}  {r['sender']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Soak test and physics cost of the headless simulation in gameSim.py
+# Misc:                     Run from the pong folder with "python benchmarks/simBench.py".
+#                           Plays --matches whole matches between two ChaseBots with no window and no
+#                           frame limit, checks every match ended with a winner and the ball stayed
+#                           on the screen, and reports matches per minute and the cost of one tick.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.gameSim import WIN_SCORE, ChaseBot, PongSim, ScriptedInput, run_match
+
+# Steps one match by hand instead of through run_match(), checking the world after every tick.
+# Returns the sim and how many ticks the ball spent past a wall, which a fast enough ball can skip through
+def soak_match(seed:int) -> tuple:
+    sim = PongSim()
+    left = ChaseBot("left", seed=seed)
+    right = ChaseBot("right", seed=seed + 1)
+    lastScore = (0, 0)
+    outside = 0
+    while not sim.is_over():
+        sim.set_input("left", left(sim))
+        sim.set_input("right", right(sim))
+        sim.step()
+        ball = sim.ball.rect
+        assert -sim.screenWidth <= ball.x <= 2 * sim.screenWidth, f"ball left the field at tick {sim.tick}"
+        if not 0 <= ball.y <= sim.screenHeight:
+            outside += 1
+        for paddle in sim.paddles.values():
+            assert 0 <= paddle.rect.top and paddle.rect.bottom <= sim.screenHeight, "paddle left the screen"
+        score = (sim.lScore, sim.rScore)
+        assert score >= lastScore and sum(score) - sum(lastScore) <= 1, "score went backwards or jumped"
+        lastScore = score
+    return sim, outside
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless matches per minute and physics cost per tick")
+    parser.add_argument("--matches", type=int, default=1000, help="matches played as fast as possible")
+    parser.add_argument("--soak", type=int, default=100, help="matches played with checks after every tick")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tunnelled = 0
+    for i in range(args.soak):
+        _, outside = soak_match(args.seed + 2 * i)
+        tunnelled += outside > 0
+    print(f"soak: {args.soak} matches checked every tick, ball got past a wall in {tunnelled} of them")
+
+    # A scripted paddle that never moves has to lose every point, whatever the other bot does
+    still = run_match(ScriptedInput([""]), ChaseBot("right", seed=args.seed))
+    assert still.rScore == WIN_SCORE + 1, "a paddle that never moves should lose every point"
+
+    ticks = 0
+    wins = {"left": 0, "right": 0}
+    unfinished = 0
+    start = time.perf_counter()
+    for i in range(args.matches):
+        sim = run_match(ChaseBot("left", seed=args.seed + 2 * i), ChaseBot("right", seed=args.seed + 2 * i + 1))
+        ticks += sim.tick
+        if not sim.is_over():
+            unfinished += 1
+        else:
+            wins["left" if sim.lScore > sim.rScore else "right"] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.matches} matches in {elapsed:.2f} s, {args.matches / elapsed * 60:,.0f} matches per minute on one core")
+    print(f"{ticks:,} ticks, {ticks / args.matches:,.0f} per match ({ticks / args.matches / 60:.0f} s of play at 60 Hz), "
+          f"{elapsed / ticks * 1e6:.2f} us per tick including both bots")
+    print(f"wins {wins}, unfinished {unfinished}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Player to player latency in one match as its audience grows, watching the
+#                           async server directly or through pongRelay.py relay nodes
+# Misc:                     Run from the pong folder with "python benchmarks/spectatorBench.py".
+#                           The server, the relays and the audience each run in their own process, so
+#                           the two players (in this process) only share the CPU with what they would in
+#                           a real match. Each player sends a state every frame, and the latency is the
+#                           time from the left player sending a state to the right player reading it.
+#                           Large audiences need a high open file limit (ulimit -n).
+# =================================================================================================
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pongAsyncServer import AsyncPongServer
+from pongRelay import PongRelay
+
+# Runs serve() on a fresh event loop in this process, sends the port once listening and waits for "stop"
+def serve_process(make, pipe) -> None:
+    sys.stdout = open(os.devnull, "w")
+    node = make()
+
+    async def main():
+        ready = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(node.serve(ready))
+        await ready.wait()
+        pipe.send(node.port)
+        def commands():
+            while True:
+                cmd = pipe.recv()
+                if cmd == "mark":
+                    pipe.send(time.process_time())
+                else:
+                    loop.call_soon_threadsafe(node.close)
+                    return
+        threading.Thread(target=commands, daemon=True).start()
+        await task
+
+    asyncio.run(main())
+
+def make_server(rate:float) -> AsyncPongServer:
+    return AsyncPongServer("127.0.0.1", 0, spectatorRate=rate)
+
+# Every relay of a run shares one process, each watching room 1 on the server
+class RelayGroup:
+    def __init__(self, serverPort:int, count:int, rate:float) -> None:
+        self.relays = [PongRelay("127.0.0.1", serverPort, 1, "127.0.0.1", 0, rate) for _ in range(count)]
+        self.port = None
+
+    async def serve(self, ready:asyncio.Event) -> None:
+        events = [asyncio.Event() for _ in self.relays]
+        tasks = [asyncio.create_task(relay.serve(event)) for relay, event in zip(self.relays, events)]
+        for event in events:
+            await event.wait()
+        self.port = [relay.port for relay in self.relays]
+        ready.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        for relay in self.relays:
+            relay.close()
+
+def make_relays(serverPort:int, count:int, rate:float) -> RelayGroup:
+    return RelayGroup(serverPort, count, rate)
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of the audience process, count viewers spread over ports all watching room 1
+# Pre:  The server (and relays, if any) are listening on ports
+# Post:  Sends "ready" once every viewer is connected, then the bytes each viewer received on "stop"
+def audience_process(ports:list, count:int, pipe) -> None:
+    async def viewer(port:int, received:list, index:int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"PROTO:BIN1\nWATCH:1\n")
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            received[index] += len(chunk)
+
+    async def main():
+        received = [0] * count
+        tasks = []
+        for i in range(count):
+            tasks.append(asyncio.create_task(viewer(ports[i % len(ports)], received, i)))
+            if i % 200 == 199:
+                # Connecting a few hundred at a time keeps the listen backlog from overflowing
+                await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        pipe.send("ready")
+        await asyncio.get_running_loop().run_in_executor(None, pipe.recv)
+        startBytes = list(received)
+        pipe.send("marked")
+        await asyncio.get_running_loop().run_in_executor(None, pipe.recv)
+        pipe.send([after - before for before, after in zip(startBytes, received)])
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(main())
+
+# Author:  Daniel Krutsick
+# Purpose:  The two players, each sends a text state every frame and the right player times the left one's
+# Pre:  The server is listening on port, and the audience process holds no player slots
+# Post:  Returns the latencies in milliseconds measured over duration seconds
+async def play(port:int, rate:int, duration:float, warmup:float) -> list:
+    sent = {}
+    latencies = []
+    stop = asyncio.Event()
+    measuring = asyncio.Event()
+
+    async def player() -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        side = (await reader.readline()).decode().strip().split(":")[1]
+
+        async def receive():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if side == "right" and line.startswith(b"PN:left") and measuring.is_set():
+                    tick = int(line.rsplit(b":", 1)[1])
+                    if tick in sent:
+                        latencies.append((time.perf_counter() - sent.pop(tick)) * 1000)
+
+        receiveTask = asyncio.create_task(receive())
+        tick = 0
+        start = time.perf_counter()
+        while not stop.is_set():
+            tick += 1
+            if side == "left":
+                sent[tick] = time.perf_counter()
+            writer.write(f"PN:{side}:PP:215:BX:320:BY:240:LS:0:RS:0:TM:{tick}\n".encode('utf-8'))
+            await asyncio.sleep(max(0.0, start + tick / rate - time.perf_counter()))
+        receiveTask.cancel()
+        writer.close()
+
+    players = [asyncio.create_task(player()) for _ in range(2)]
+    await asyncio.sleep(warmup)
+    measuring.set()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*players)
+    return latencies
+
+def run(audience:int, relays:int, args) -> dict:
+    serverPipe, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_process, args=(functools.partial(make_server, args.spectator_rate), child))
+    server.start()
+    port = serverPipe.recv()
+    loop = asyncio.new_event_loop()
+
+    # The players go first, so they take room 1, the audience joins once the match is running
+    playTask = loop.create_task(play(port, args.rate, args.duration, 1.0))
+    loop.run_until_complete(asyncio.sleep(0.4))
+
+    relayProc = relayPipe = None
+    viewerPorts = [port]
+    if relays:
+        relayPipe, child = multiprocessing.Pipe()
+        relayProc = multiprocessing.Process(target=serve_process, args=(functools.partial(make_relays, port, relays, args.spectator_rate), child))
+        relayProc.start()
+        viewerPorts = relayPipe.recv()
+
+    audienceProc = audiencePipe = None
+    if audience:
+        audiencePipe, child = multiprocessing.Pipe()
+        audienceProc = multiprocessing.Process(target=audience_process, args=(viewerPorts, audience, child))
+        audienceProc.start()
+        audiencePipe.recv()
+        audiencePipe.send("mark")
+        audiencePipe.recv()
+
+    serverPipe.send("mark")
+    cpuStart = serverPipe.recv()
+    wallStart = time.perf_counter()
+    latencies = loop.run_until_complete(playTask)
+    serverPipe.send("mark")
+    cpu = serverPipe.recv() - cpuStart
+    wall = time.perf_counter() - wallStart
+
+    perViewer = []
+    if audienceProc is not None:
+        audiencePipe.send("stop")
+        perViewer = audiencePipe.recv()
+        audienceProc.terminate()
+    if relayProc is not None:
+        relayPipe.send("stop")
+        relayProc.join(5)
+    serverPipe.send("stop")
+    server.join(5)
+    loop.close()
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else float("nan"),
+        "cpu": cpu / wall,
+        "viewerRate": statistics.mean(perViewer) / wall if perViewer else 0.0,
+        "starved": sum(1 for b in perViewer if b == 0),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Player latency against audience size, with and without relays")
+    parser.add_argument("--audience", type=int, nargs="+", default=[0, 100, 1000, 3000])
+    parser.add_argument("--relays", type=int, default=4, help="relay nodes used for the relayed runs, 0 to skip them")
+    parser.add_argument("--rate", type=int, default=60, help="states per second sent by each player")
+    parser.add_argument("--spectator-rate", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'audience':>9} {'relays':>7} {'p50 ms':>8} {'p99 ms':>8} {'server cpu':>11} {'bytes/s per viewer':>19} {'starved':>8}")
+    runs = [(audience, 0) for audience in args.audience]
+    if args.relays:
+        runs += [(audience, args.relays) for audience in args.audience if audience]
+    for audience, relays in runs:
+        r = run(audience, relays, args)
+        print(f"{audience:>9} {relays:>7} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['cpu'] * 100:>10.1f}% "
+              f"{r['viewerRate']:>19,.0f} {r['starved']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  How long the client takes to start, and from START to its first drawn frame,
+#                           with the fonts, sounds and window preloaded while it waits for an opponent
+#                           (clientAssets.py) and with them loaded when START arrives, like it used to be
+# Misc:                     Run from the pong folder with "python benchmarks/startupBench.py".
+#                           "import" is the median time for a fresh Python to import pongClient.py, now that
+#                           pygame and tkinter wait until they are needed, against importing them up front.
+#                           "first frame" starts a threaded server and two "pongClient.py --headless --bot"
+#                           processes a second apart (the first one waits in the lobby, the second gets
+#                           START right after connecting), and reports each client's time from START to
+#                           its first frame and from launching it to its first frame. Headless means the
+#                           SDL dummy drivers, so a real window and sound card add to the no preload times.
+# =================================================================================================
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+PONG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PONG_DIR)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # The server imports pygame through the game code
+
+FIRST_FRAME = "First frame drawn "
+
+def headless_env() -> dict:
+    env = dict(os.environ)
+    env.update({"SDL_VIDEODRIVER": "dummy", "SDL_AUDIODRIVER": "dummy", "PYTHONUNBUFFERED": "1"})
+    return env
+
+# Median seconds for a new interpreter to run code, so the interpreter's own start is included in both
+def import_time(code:str, runs:int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=PONG_DIR, env=headless_env(), check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def server_process(port:int) -> None:
+    import pongServer
+    from assets.code.serverLog import setup_logging
+    setup_logging("warning")
+    pongServer.HOST = "127.0.0.1"
+    pongServer.PORT = port
+    pongServer.start_server()
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Author:  Jacob Blankenship
+# Purpose:  Launches one headless bot client and waits for the line it prints when its first frame is drawn
+# Pre:  A server is listening on port
+# Post:  result gets the client's START to first frame and launch to first frame, in milliseconds. The client
+#        is kept running until done is set, so leaving does not end the match before the other one draws
+def watch_client(port:int, preload:bool, result:dict, timeout:float, done:threading.Event) -> None:
+    command = [sys.executable, "pongClient.py", "--ip", "127.0.0.1", "--port", str(port), "--headless", "--bot"]
+    if not preload:
+        command.append("--no-preload")
+    launched = time.perf_counter()
+    client = subprocess.Popen(command, cwd=PONG_DIR, env=headless_env(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    timer = threading.Timer(timeout, client.kill)
+    timer.start()
+    try:
+        for line in client.stdout:
+            if FIRST_FRAME in line:
+                result["launch"] = (time.perf_counter() - launched) * 1000
+                result["start"] = float(line.split(FIRST_FRAME)[1].split()[0])
+                break
+        done.wait(timeout)
+    finally:
+        timer.cancel()
+        client.kill()
+        client.wait()
+
+def first_frame(preload:bool, gap:float, timeout:float) -> list:
+    port = free_port()
+    server = multiprocessing.Process(target=server_process, args=(port,), daemon=True)
+    server.start()
+    time.sleep(1.0)
+    results = [{}, {}]
+    threads = []
+    done = threading.Event()
+    for result in results:
+        thread = threading.Thread(target=watch_client, args=(port, preload, result, timeout, done))
+        thread.start()
+        threads.append(thread)
+        time.sleep(gap)
+    deadline = time.perf_counter() + timeout
+    while not all("start" in result for result in results) and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    done.set()
+    for thread in threads:
+        thread.join()
+    server.terminate()
+    server.join()
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Client start up and time to first frame")
+    parser.add_argument("--runs", type=int, default=5, help="runs of each measurement, the median is shown")
+    parser.add_argument("--gap", type=float, default=1.0, help="seconds between launching the two clients")
+    parser.add_argument("--timeout", type=float, default=20.0)
+    args = parser.parse_args()
+
+    lazy = import_time("import pongClient", args.runs)
+    eager = import_time("import pygame, tkinter, pongClient", args.runs)
+    print(f"import pongClient: {lazy * 1000:.0f} ms, with pygame and tkinter up front: {eager * 1000:.0f} ms")
+
+    print(f"{'assets':>10} {'client':>7} {'START to first frame':>21} {'launch to first frame':>22}")
+    for preload in (True, False):
+        runs = [first_frame(preload, args.gap, args.timeout) for _ in range(args.runs)]
+        for index, name in enumerate(("waiting", "joining")):
+            done = [run[index] for run in runs if "start" in run[index]]
+            if not done:
+                print(f"{'preloaded' if preload else 'at START':>10} {name:>7} {'no first frame':>21}")
+                continue
+            print(f"{'preloaded' if preload else 'at START':>10} {name:>7} {statistics.median(r['start'] for r in done):>18.1f} ms "
+                  f"{statistics.median(r['launch'] for r in done):>19.1f} ms")
+
+if __name__ == "__main__":
+    main()
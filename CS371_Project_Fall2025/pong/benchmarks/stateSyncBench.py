@@ -0,0 +1,162 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Bandwidth per match for the text, binary and snapshot/delta formats
+# Misc:                     Run from the pong folder with "python benchmarks/stateSyncBench.py".
+#                           A headless match is played with paddles that chase the ball, and every
+#                           frame each client sends its state up and the server sends both states
+#                           back down to each client, the same traffic a real 60 Hz match makes.
+#                           Acks for the snapshot/delta format arrive --rtt ticks after the snapshot.
+#                           "live" then plays --live seconds of two real headless bot clients against an
+#                           async server running the physics, and counts the snapshots and deltas the server
+#                           sends them. A delta is only sent against a snapshot the client acked, so with
+#                           the acks getting through nearly every frame is a delta. Exits with status 1 if
+#                           the server sent fewer deltas than snapshots.
+# =================================================================================================
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+PONG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PONG_DIR)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from startupBench import free_port, headless_env
+from assets.code.gameSim import PongSim
+from assets.code.stateSync import SyncSession
+from assets.code.wireProtocol import FrameDecoder, encode_binary, encode_text
+
+# Moves a paddle toward the ball, but only once it is a few pixels off, so the paddle rests sometimes
+def chase(sim:PongSim, side:str) -> None:
+    paddle = sim.paddles[side].rect
+    offset = sim.ball.rect.centery - paddle.centery
+    sim.set_input(side, "down" if offset > 15 else "up" if offset < -15 else "")
+
+# Author:  Jacob Blankenship
+# Purpose:  Body of the live server process, an async server running the physics that counts the SYNC1 frames
+# Pre:  port is free, pipe is one end of a multiprocessing.Pipe
+# Post:  Sends "ready" once listening, and the snapshot and delta counts once told to stop
+def live_server_process(port:int, pipe) -> None:
+    from pongAsyncServer import AsyncPongServer
+    from assets.code.serverLog import setup_logging
+    from assets.code.stateSync import StateEncoder
+    setup_logging("warning")
+    counts = {"snapshots": 0, "deltas": 0}
+    snapshot, delta = StateEncoder.snapshot, StateEncoder.delta
+
+    def counted_snapshot(self, state):
+        counts["snapshots"] += 1
+        return snapshot(self, state)
+
+    def counted_delta(self, state, baseId, base):
+        counts["deltas"] += 1
+        return delta(self, state, baseId, base)
+
+    StateEncoder.snapshot = counted_snapshot
+    StateEncoder.delta = counted_delta
+    server = AsyncPongServer("127.0.0.1", port, authoritative=True)
+
+    async def main():
+        ready = asyncio.Event()
+        task = asyncio.create_task(server.serve(ready))
+        await ready.wait()
+        pipe.send("ready")
+        await asyncio.get_running_loop().run_in_executor(None, pipe.recv)
+        server.close()
+        await task
+
+    asyncio.run(main())
+    pipe.send(counts)
+
+# Two headless bot clients play seconds against a server running the physics, returns what it sent them
+def live_match(seconds:float) -> dict:
+    port = free_port()
+    pipe, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=live_server_process, args=(port, child), daemon=True)
+    server.start()
+    pipe.recv()
+    command = [sys.executable, "pongClient.py", "--ip", "127.0.0.1", "--port", str(port), "--headless", "--bot"]
+    clients = [subprocess.Popen(command, cwd=PONG_DIR, env=headless_env(), stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL) for _ in range(2)]
+    time.sleep(seconds)
+    for client in clients:
+        client.kill()
+        client.wait()
+    pipe.send("stop")
+    counts = pipe.recv()
+    server.join(5)
+    return counts
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes per match for each wire format")
+    parser.add_argument("--ticks", type=int, default=3600, help="60 ticks is one second of play")
+    parser.add_argument("--rtt", type=int, default=6, help="ticks before a snapshot ack arrives")
+    parser.add_argument("--live", type=float, default=5.0, help="seconds of the live match, 0 skips it")
+    args = parser.parse_args()
+
+    sim = PongSim()
+    totals = {"text": 0, "binary": 0, "sync": 0}
+    sides = ("left", "right")
+    # One session at each end of each link: client i up to the server, and the server down to client i
+    upClient = {side: SyncSession() for side in sides}
+    upServer = {side: SyncSession() for side in sides}
+    downServer = {side: SyncSession() for side in sides}
+    downClient = {side: FrameDecoder(SyncSession()) for side in sides}
+    inFlight = deque() # (tick the bytes arrive, receiving session, bytes)
+
+    for tick in range(args.ticks):
+        chase(sim, "left")
+        chase(sim, "right")
+        sim.step()
+        states = dict(zip(sides, sim.states()))
+        while inFlight and inFlight[0][0] <= tick:
+            _, session, data = inFlight.popleft()
+            session.feed(data)
+
+        for side in sides:
+            state = states[side]
+            # Up: each client sends its own state, down: the server sends both states to each client
+            totals["text"] += len(encode_text(state)) * 3
+            totals["binary"] += len(encode_binary(state)) * 3
+
+            up = upClient[side].encode(state) or b""
+            totals["sync"] += len(up)
+            if up:
+                upServer[side].receive(up)
+            for peer in sides:
+                down = downServer[peer].encode(state) or b""
+                totals["sync"] += len(down)
+                if down:
+                    downClient[peer].feed(down)
+        # Acks ride back after the round trip, counted as traffic too
+        for side in sides:
+            for session, back in ((upServer[side], upClient[side]), (downClient[side].sync, downServer[side])):
+                acks = session.take_acks()
+                if acks:
+                    totals["sync"] += len(acks)
+                    inFlight.append((tick + args.rtt, FrameDecoder(back), acks))
+
+    seconds = args.ticks / 60
+    print(f"{seconds:.0f} s of play at 60 Hz, final score {sim.lScore}-{sim.rScore}")
+    print(f"{'format':<8} {'bytes/s per match':>18} {'vs text':>8}")
+    for name, total in totals.items():
+        print(f"{name:<8} {total / seconds:>18.0f} {total / totals['text']:>8.0%}")
+
+    if args.live > 0:
+        counts = live_match(args.live)
+        sent = max(counts["snapshots"] + counts["deltas"], 1)
+        print(f"live, server running the physics: {counts['snapshots']} snapshots and {counts['deltas']} deltas sent, "
+              f"{counts['deltas'] / sent:.0%} deltas")
+        if counts["deltas"] < counts["snapshots"]:
+            print("TOO FEW DELTAS the clients' snapshot acks are not reaching the server")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Checks the swept collision in PongSim.advance() and what stepping the physics
+#                           less often saves, against the old tick by tick colliderect() checks
+# Misc:                     Run from the pong folder with "python benchmarks/sweptBench.py".
+#                           "same" plays --matches bot matches where the bots decide every --ticks ticks,
+#                           once with step() called that many times and once with advance(), and counts
+#                           steps where the two worlds differ (should be 0). "old rules" moves the ball that
+#                           many ticks at once and then checks colliderect() once, which is what lowering the
+#                           tick rate without swept collision would do, and counts points that went to the
+#                           other player than at 60 Hz and balls that went through a paddle. "cost" is the
+#                           time for one second of play, bots included. "fast ball" fires a ball --speed
+#                           times faster than normal at a paddle that does not move, from every height the
+#                           paddle covers, and counts how often it bounces off.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from assets.code.gameSim import MAX_TICKS, ChaseBot, PongSim, run_match
+
+def world(sim:PongSim) -> tuple:
+    ball = sim.ball
+    return (sim.tick, ball.rect.x, ball.rect.y, ball.xVel, ball.yVel, sim.leftPaddle.rect.y, sim.rightPaddle.rect.y, sim.lScore, sim.rScore)
+
+# Lowering the tick rate without swept collision: paddles and ball move ticks worth at once, then one check
+def old_step(sim:PongSim, ticks:int) -> None:
+    sim.tick += ticks
+    for _ in range(ticks):
+        sim.move_paddles()
+    if sim.is_over():
+        return
+    sim.bounced = False
+    sim.scored = False
+    ball = sim.ball
+    ball.rect.x += ball.xVel * ticks
+    ball.rect.y += ball.yVel * ticks
+    sim.resolve_ball()
+
+# Author:  Daniel Krutsick
+# Purpose:  One match played with the bots deciding every ticks ticks, stepped the way mode says
+# Pre:  mode is "step" (step() ticks times), "advance" or "old"
+# Post:  Returns the world after every step, who won each point, and how many balls went through a paddle
+def play(seed:int, ticks:int, mode:str) -> tuple:
+    sim = PongSim()
+    left = ChaseBot("left", seed=seed)
+    right = ChaseBot("right", seed=seed + 1)
+    worlds = []
+    points = []
+    through = 0
+    while not sim.is_over() and sim.tick < MAX_TICKS:
+        sim.set_input("left", left(sim))
+        sim.set_input("right", right(sim))
+        before = sim.ball.rect.x
+        score = (sim.lScore, sim.rScore)
+        if mode == "step":
+            for _ in range(ticks):
+                sim.step()
+        elif mode == "advance":
+            sim.advance(ticks)
+        else:
+            old_step(sim, ticks)
+        # The ball crossed a paddle's whole width in one step without bouncing off it
+        for paddle in (sim.leftPaddle.rect, sim.rightPaddle.rect):
+            after = sim.ball.rect.x
+            if not sim.scored and min(before, after) < paddle.left and max(before, after) + sim.ball.rect.w > paddle.right \
+                    and paddle.top < sim.ball.rect.bottom and sim.ball.rect.top < paddle.bottom:
+                through += 1
+        if (sim.lScore, sim.rScore) != score:
+            points.append("left" if sim.lScore > score[0] else "right")
+        worlds.append(world(sim))
+    return worlds, points, through
+
+# Seconds of CPU for one second of play at each number of ticks per step, the best of a few runs since one
+# core is easily disturbed. The rates take turns, so a slow spell on the machine hits all of them alike
+def costs(tickList:list, matches:int, seed:int, runs:int = 5) -> dict:
+    best = {}
+    for _ in range(runs):
+        for ticks in tickList:
+            played = 0
+            start = time.process_time()
+            for i in range(matches):
+                played += run_match(ChaseBot("left", seed=seed + 2 * i), ChaseBot("right", seed=seed + 2 * i + 1),
+                                    stepTicks=ticks).tick
+            perSecond = (time.process_time() - start) / (played / 60)
+            best[ticks] = min(best.get(ticks, perSecond), perSecond)
+    return best
+
+# How many of the ball's starting heights in front of a still paddle end in a bounce instead of a point
+def fast_ball(speed:int, swept:bool) -> tuple:
+    bounced = 0
+    heights = range(PongSim().leftPaddle.rect.top - 4, PongSim().leftPaddle.rect.bottom)
+    for y in heights:
+        sim = PongSim()
+        sim.ball.rect.y = y
+        sim.ball.xVel = -5 * speed
+        while not sim.scored and sim.ball.xVel < 0:
+            if swept:
+                sim.advance(1)
+            else:
+                sim.step()
+        bounced += sim.ball.xVel > 0
+    return bounced, len(heights)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Swept collision against tick by tick checks at lower tick rates")
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--ticks", type=int, nargs="+", default=[2, 3, 4], help="ticks per step, 3 is 20 Hz")
+    parser.add_argument("--speed", type=int, default=5, help="how many times faster the fast ball is")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    timings = costs([1] + args.ticks, args.matches, args.seed)
+    perSecond = timings[1]
+    print(f"60 Hz with step(): {perSecond * 1e6:.0f} us per second of play")
+    print(f"{'ticks':>5} {'Hz':>3} {'same':>10} {'old rules: points differ':>25} {'through a paddle':>17} {'cost us/s':>10} {'saved':>6}")
+    for ticks in args.ticks:
+        differ = 0
+        pointsDiffer = 0
+        points = 0
+        through = 0
+        for i in range(args.matches):
+            seed = args.seed + 2 * i
+            stepped, stepPoints, _ = play(seed, ticks, "step")
+            advanced, _, _ = play(seed, ticks, "advance")
+            differ += sum(a != b for a, b in zip(stepped, advanced)) + abs(len(stepped) - len(advanced))
+            _, oldPoints, oldThrough = play(seed, ticks, "old")
+            pointsDiffer += sum(a != b for a, b in zip(stepPoints, oldPoints)) + abs(len(stepPoints) - len(oldPoints))
+            points += len(stepPoints)
+            through += oldThrough
+        swept = timings[ticks]
+        print(f"{ticks:>5} {60 // ticks:>3} {differ:>4} diffs {pointsDiffer:>12} of {points:<7} {through:>17} "
+              f"{swept * 1e6:>10.0f} {1 - swept / perSecond:>6.0%}")
+
+    for swept in (False, True):
+        bounced, heights = fast_ball(args.speed, swept)
+        print(f"fast ball ({args.speed}x) with {'advance()' if swept else 'step()':>9}: bounced off the paddle from {bounced} of {heights} heights")
+
+if __name__ == "__main__":
+    main()
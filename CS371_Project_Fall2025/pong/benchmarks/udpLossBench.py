@@ -0,0 +1,206 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Checks the UDP state channel over loopback with packets being lost and
+#                           arriving out of order on the way
+# Misc:                     Run from the pong folder with "python benchmarks/udpLossBench.py".
+#                           The async server is started with UDP on, and both clients send their
+#                           datagrams through a small proxy that drops --loss of them and holds back
+#                           --reorder of them for a few milliseconds so they arrive late. The left client
+#                           sends numbered states, and the right client checks that every state it is
+#                           handed is newer than the one before it. Exits with status 1 if one was not,
+#                           or if far fewer states arrived than the loss and reordering explain.
+# =================================================================================================
+
+import argparse
+import asyncio
+import heapq
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pongAsyncServer import AsyncPongServer
+from assets.code.udpTransport import MAX_DATAGRAM, UdpClient, unpack_datagram
+from assets.code.wireProtocol import FrameDecoder, GameState, encode_binary
+
+# Author:  Daniel Krutsick
+# Purpose:  A lossy hop between the clients and the server, one socket for each direction
+# Pre:  Clients send to port, the server is listening for UDP on serverAddr
+# Post:  Runs until stop is set, sent/dropped/delayed count datagrams in both directions
+class LossyProxy:
+    def __init__(self, serverAddr, loss:float, reorder:float, seed:int) -> None:
+        self.serverAddr = serverAddr
+        self.loss = loss
+        self.reorder = reorder
+        self.rng = random.Random(seed)
+        self.down = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # Faces the clients
+        self.down.bind(("127.0.0.1", 0))
+        self.up = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # Faces the server
+        self.up.bind(("127.0.0.1", 0))
+        self.port = self.down.getsockname()[1]
+        self.clients = {} # token -> client address, learned from the client's own datagrams
+        self.held = [] # (time to send, order, socket, data, address)
+        self.heldLock = threading.Lock()
+        self.order = 0
+        self.stop = threading.Event()
+        self.counts = {"forwarded": 0, "dropped": 0, "delayed": 0}
+
+    def forward(self, sock:socket.socket, data:bytes, addr) -> None:
+        roll = self.rng.random()
+        if roll < self.loss:
+            self.counts["dropped"] += 1
+            return
+        self.counts["forwarded"] += 1
+        if roll < self.loss + self.reorder:
+            self.counts["delayed"] += 1
+            with self.heldLock:
+                self.order += 1
+                heapq.heappush(self.held, (time.monotonic() + self.rng.uniform(0.005, 0.03), self.order, sock, data, addr))
+            return
+        sock.sendto(data, addr)
+
+    def from_clients(self) -> None:
+        self.down.settimeout(0.1)
+        while not self.stop.is_set():
+            try:
+                data, addr = self.down.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            unpacked = unpack_datagram(data)
+            if unpacked is not None:
+                self.clients[unpacked[0]] = addr
+            self.forward(self.up, data, self.serverAddr)
+
+    def from_server(self) -> None:
+        self.up.settimeout(0.1)
+        while not self.stop.is_set():
+            try:
+                data, _ = self.up.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            unpacked = unpack_datagram(data)
+            if unpacked is not None and unpacked[0] in self.clients:
+                self.forward(self.down, data, self.clients[unpacked[0]])
+
+    def release(self) -> None:
+        while not self.stop.is_set():
+            now = time.monotonic()
+            with self.heldLock:
+                ready = []
+                while self.held and self.held[0][0] <= now:
+                    ready.append(heapq.heappop(self.held))
+            for _, _, sock, data, addr in ready:
+                sock.sendto(data, addr)
+            time.sleep(0.001)
+
+    def start(self) -> None:
+        for target in (self.from_clients, self.from_server, self.release):
+            threading.Thread(target=target, daemon=True).start()
+
+# Connects one client over TCP and asks for binary states over UDP
+def connect(port:int) -> socket.socket:
+    tcp = socket.create_connection(("127.0.0.1", port))
+    tcp.sendall(b"PROTO:BIN1\nPROTO:UDP1\n")
+    return tcp
+
+# Waits for START and the token, START only comes once both players are in the room
+def join(tcp:socket.socket, proxyPort:int) -> tuple:
+    decoder = FrameDecoder()
+    side = token = None
+    while side is None or token is None:
+        for line in decoder.feed(tcp.recv(4096)):
+            if isinstance(line, GameState):
+                continue
+            if line.startswith(b"START:"):
+                side = line.decode('utf-8').split(":")[1]
+            elif line.startswith(b"UDP:"):
+                token = int(line[4:])
+    link = UdpClient("127.0.0.1", proxyPort)
+    link.start(token)
+    return tcp, link, side
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="UDP state channel under simulated loss and reordering")
+    parser.add_argument("--frames", type=int, default=3000, help="states sent by the left client")
+    parser.add_argument("--loss", type=float, default=0.1, help="fraction of datagrams dropped per hop")
+    parser.add_argument("--reorder", type=float, default=0.1, help="fraction of datagrams held back a few ms")
+    parser.add_argument("--rate", type=int, default=600, help="states sent per second")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-delivered", type=float, default=None,
+                        help="fraction of states that has to arrive, half of what the loss and reordering leave by default")
+    args = parser.parse_args()
+    # Both hops drop --loss of the datagrams, and one held back nearly always arrives after a newer one
+    # and is thrown away as stale, so about ((1 - loss) * (1 - reorder)) ** 2 of the states get through
+    if args.min_delivered is None:
+        args.min_delivered = 0.5 * ((1 - args.loss) * (1 - args.reorder)) ** 2
+
+    server = AsyncPongServer("127.0.0.1", 0, udp=True)
+    ready = threading.Event()
+    def run_server() -> None:
+        async def main_server() -> None:
+            started = asyncio.Event()
+            task = asyncio.create_task(server.serve(started))
+            await started.wait()
+            ready.set()
+            await task
+        asyncio.run(main_server())
+    threading.Thread(target=run_server, daemon=True).start()
+    ready.wait()
+
+    proxy = LossyProxy(("127.0.0.1", server.port), args.loss, args.reorder, args.seed)
+    proxy.start()
+    players = [join(tcp, proxy.port) for tcp in [connect(server.port), connect(server.port)]]
+    sender = next(p for p in players if p[2] == "left")
+    receiver = next(p for p in players if p[2] == "right")
+
+    received = []
+    def receive() -> None:
+        decoder = FrameDecoder()
+        while True:
+            payload = receiver[1].receive()
+            if payload is None:
+                return
+            received.extend(m.time for m in decoder.feed(payload) if isinstance(m, GameState))
+    threading.Thread(target=receive, daemon=True).start()
+
+    # Let the hello datagrams through before the states start, a lost hello is covered by the first state
+    time.sleep(0.2)
+    start = time.perf_counter()
+    for tick in range(1, args.frames + 1):
+        sender[1].send(encode_binary(GameState("left", tick % 400, 320, 240, 0, 0, tick)))
+        time.sleep(max(0.0, start + tick / args.rate - time.perf_counter()))
+    time.sleep(0.2)
+
+    ordered = all(b > a for a, b in zip(received, received[1:]))
+    gaps = [b - a for a, b in zip(received, received[1:])]
+    upStats = server.udpRegistry.stats()
+    print(f"loss {args.loss:.0%} per hop, {args.reorder:.0%} held back, {args.frames} states sent")
+    print(f"proxy: {proxy.counts}")
+    print(f"server inbound: received {upStats['received']}, lost {upStats['lost']}, stale {upStats['stale']}")
+    print(f"client inbound: {receiver[1].inbound.stats()}")
+    print(f"states delivered {len(received)} ({len(received) / args.frames:.0%}), newest {received[-1] if received else None}, "
+          f"always newer than the last: {ordered}, longest gap {max(gaps) if gaps else 0} frames")
+    proxy.stop.set()
+    server.close()
+
+    problems = []
+    if not received:
+        problems.append("no states were delivered")
+    elif len(received) / args.frames < args.min_delivered:
+        problems.append(f"only {len(received) / args.frames:.0%} of the states were delivered, "
+                        f"at least {args.min_delivered:.0%} should be")
+    if not ordered:
+        problems.append("a state was handed over after a newer one")
+    for problem in problems:
+        print(f"FAILED {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Microbenchmark of the text and binary game state formats
+# Misc:                     Run from the pong folder with "python benchmarks/wireProtocolBench.py".
+#                           "text (dict)" is the original regex + groupdict + int() parse and the
+#                           f-string rebuild the server did before the binary format existed, and
+#                           "relay" compares that old handle_client loop with the FrameReader one.
+# =================================================================================================
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets.code.wireProtocol import MSG_PATTERN, FrameDecoder, FrameReader, GameState, decode_binary, encode_binary, encode_text, parse_text
+
+STATE = GameState("left", 215, 320, 240, 3, 7, 123456)
+
+def parse_text_dict(message:str) -> dict:
+    data = MSG_PATTERN.match(message).groupdict()
+    for key in ['pos', 'bx', 'by', 'lscore', 'rscore', 'time']:
+        data[key] = int(data[key])
+    return data
+
+def serialize_text_dict(data:dict) -> bytes:
+    return (
+        f"PN:{data['name']}:PP:{data['pos']}:BX:{data['bx']}:BY:{data['by']}:"
+        f"LS:{data['lscore']}:RS:{data['rscore']}:TM:{data['time']}\n"
+    ).encode('utf-8')
+
+# The handle_client loop before the relay path, minus its debug prints
+def old_relay(chunk:bytes) -> int:
+    buffer = chunk.decode("utf-8")
+    sent = 0
+    while "\n" in buffer:
+        line, buffer = buffer.split("\n", 1)
+        line = line.strip()
+        if line:
+            sent += len(serialize_text_dict(parse_text_dict(line)))
+    return sent
+
+def reader_relay(reader:FrameReader, chunk:bytes) -> int:
+    reader.feed(chunk)
+    sent = 0
+    for kind, frame in reader.frames():
+        sent += len(frame)
+    return sent
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parse/serialize cost of the wire formats")
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--burst", type=int, default=64, help="frames per recv() in the stream test")
+    args = parser.parse_args()
+
+    textBytes = encode_text(STATE)
+    textLine = textBytes.decode('utf-8').strip()
+    binBytes = encode_binary(STATE)
+    data = parse_text_dict(textLine)
+    textStream = textBytes * args.burst
+    binStream = binBytes * args.burst
+
+    cases = [
+        ("text (dict)", "parse", lambda: parse_text_dict(textLine)),
+        ("text (dict)", "serialize", lambda: serialize_text_dict(data)),
+        ("text", "parse", lambda: parse_text(textLine)),
+        ("text", "serialize", lambda: encode_text(STATE)),
+        ("binary", "parse", lambda: decode_binary(binBytes)),
+        ("binary", "serialize", lambda: encode_binary(STATE)),
+    ]
+    print(f"bytes per frame: text {len(textBytes)}, binary {len(binBytes)}")
+    print(f"{'format':<12} {'operation':<10} {'ns/frame':>10}")
+    for name, op, fn in cases:
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        print(f"{name:<12} {op:<10} {seconds / args.number * 1e9:>10.0f}")
+
+    # A whole burst as one recv() sees it, decoding every frame through FrameDecoder
+    number = max(args.number // args.burst, 1)
+    for name, stream in (("text", textStream), ("binary", binStream)):
+        def decode():
+            for frame in FrameDecoder().feed(stream):
+                if not isinstance(frame, GameState):
+                    parse_text(frame.decode('utf-8'))
+        seconds = min(timeit.repeat(decode, number=number, repeat=3))
+        print(f"{name:<12} {'stream':<10} {seconds / (number * args.burst) * 1e9:>10.0f}")
+
+    reader = FrameReader()
+    for name, fn in (("text (old)", lambda: old_relay(textStream)),
+                     ("text", lambda: reader_relay(reader, textStream)),
+                     ("binary", lambda: reader_relay(reader, binStream))):
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{name:<12} {'relay':<10} {seconds / (number * args.burst) * 1e9:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,638 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  asyncio based multi-room server engine for our Pong game
+# Misc:                     Started from pongServer.py by choosing the "async" server mode, or
+#                           directly with "python pongAsyncServer.py". One listening socket pairs
+#                           players into as many independent rooms as connect, instead of one
+#                           thread per client and one match per process. With authoritative set,
+#                           each room also runs the physics itself on a fixed tick and the clients
+#                           only send their paddle input. With udp set, clients may also ask for
+#                           their game states to go over UDP on the same port number (udpTransport.py).
+#                           A player whose match is over is sent END, and REQUEUE puts it in the next room.
+#                           Spectators (WATCH:<room number>) get their own slower feed (spectate.py),
+#                           and pongRelay.py can pass one room's feed on to many more of them.
+#                           With recordDir set, every state relayed in a room is also written to a
+#                           replay file in that folder (replay.py), which pongReplay.py plays back.
+#                           With metricsPort set, counters and latencies are served over HTTP (metrics.py).
+#                           Every room answers CLK pings with its own match clock (clockSync.py), and an
+#                           authoritative room steps on that clock's ticks. With stepTicks above 1 it steps
+#                           that many ticks at a time (PongSim.advance()), so 3 runs the physics and sends
+#                           states at 20 Hz while the match still plays out exactly as it would at 60 Hz.
+#                           Every connection is held to limits (admission.py): too many frames a second, a
+#                           frame that never ends or too much garbage disconnects it, and past maxClients
+#                           new connections are closed straight away.
+# =================================================================================================
+
+import asyncio
+import itertools
+import os
+import time
+from typing import Optional
+
+from assets.code.admission import REJECTED, ConnectionGuard, Limits
+from assets.code.clockSync import CLOCK_PREFIX, MatchClock
+from assets.code.fanout import PeerQueue
+from assets.code.gameSim import PongSim
+from assets.code.metrics import ConnStats, ServerMetrics, start_metrics_endpoint
+from assets.code.netcode import InputQueue
+from assets.code.replay import REPLAY_EXTENSION, ReplayWriter
+from assets.code.serverLog import get_logger, setup_logging, stop_logging
+from assets.code.spectate import SPECTATOR_KEY, SPECTATOR_RATE, SPECTATOR_SIDE, SpectatorFeed
+from assets.code.stateSync import SyncSession
+from assets.code.udpTransport import MAX_DATAGRAM, UdpPeer, UdpRegistry
+from assets.code.wireProtocol import (PROTO_SYNC, PROTO_TEXT, PROTO_REQUESTS, PROTO_UDP_REQUEST, ENCODERS, FRAME_LINE, FrameReader,
+                                      GameState, decode_frame)
+
+TICK_RATE = 60 # Fixed simulation ticks per second for server-authoritative rooms
+STEP_TICKS = 1 # Ticks an authoritative room advances at a time, TICK_RATE / STEP_TICKS steps a second
+ASSIGN_GRACE = 0.2 # Seconds a new connection has to send WATCH:<room> before it is given a paddle
+
+log = get_logger()
+
+# Author:  Daniel Krutsick
+# Purpose:  Holds everything the server knows about one connected socket
+# Pre:  Created by AsyncPongServer.handle_connection() once a client has connected
+# Post:  side is "left", "right" or "spectator" once the connection is placed in a room
+class Connection:
+    def __init__(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.side = ""
+        self.room: Optional["Room"] = None
+        self.proto = PROTO_TEXT
+        self.sync: Optional[SyncSession] = None
+        self.queue = PeerQueue()
+        self.ready = asyncio.Event()
+        self.evicted = False
+        self.udp: Optional[UdpPeer] = None
+        self.udpTransport: Optional[asyncio.DatagramTransport] = None
+        self.udpFrames: Optional[FrameReader] = None
+        self.assignTimer: Optional[asyncio.TimerHandle] = None
+        self.stats = ConnStats(str(self.addr))
+
+    # Queues data for write_loop(), keyed frames replace an older frame with the same key that has not
+    # gone out yet, so a slow client gets the latest state instead of an ever growing backlog.
+    # Keyed frames are the ones that may be lost, so once the client's UDP address is known they go
+    # out as a datagram instead, everything else stays on TCP
+    def send(self, data:bytes, key = None) -> None:
+        if key is not None and self.udp is not None and self.udp.addr is not None:
+            self.udpTransport.sendto(self.udp.pack(data), self.udp.addr)
+        elif not self.writer.is_closing():
+            self.queue.put(data, key)
+            self.ready.set()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Drains this connection's queue into the socket, one write per batch of frames
+    # Pre:  Started as a task by handle_connection()
+    # Post:  Returns when the connection closes, a client whose writes stay stuck for longer than the
+    #        queue's evictAfter is disconnected
+    async def write_loop(self) -> None:
+        while not self.writer.is_closing():
+            await self.ready.wait()
+            self.ready.clear()
+            data = self.queue.take_all()
+            if not data:
+                continue
+            self.writer.write(data)
+            try:
+                await asyncio.wait_for(self.writer.drain(), self.queue.evictAfter)
+            except asyncio.TimeoutError:
+                log.warning("[EVICTED] %s fell too far behind and was disconnected", self.addr)
+                self.evicted = True
+                self.close()
+                return
+            except ConnectionError:
+                return
+            self.queue.caught_up()
+
+    def close(self) -> None:
+        if not self.writer.is_closing():
+            self.writer.close()
+
+# Author:  Daniel Krutsick
+# Purpose:  Hands the datagrams that arrive on the server's UDP socket to the server
+# Pre:  Created by asyncio's create_datagram_endpoint() in AsyncPongServer.serve()
+# Post:  Every datagram goes to AsyncPongServer.handle_datagram()
+class DatagramHandler(asyncio.DatagramProtocol):
+    def __init__(self, server:"AsyncPongServer") -> None:
+        self.server = server
+
+    def datagram_received(self, data:bytes, addr) -> None:
+        self.server.handle_datagram(data, addr)
+
+# Author:  Daniel Krutsick
+# Purpose:  One independent match, with its own left/right/spectator roster
+# Pre:  Created by AsyncPongServer when there is no room waiting for a player
+# Post:  started is True once both paddles are filled and START has been sent to them
+class Room:
+    def __init__(self, roomId:int, spectatorRate:float = SPECTATOR_RATE) -> None:
+        self.roomId = roomId
+        self.players = {"left": None, "right": None}
+        self.spectators = []
+        self.feed = SpectatorFeed(spectatorRate)
+        self.recorder: Optional[ReplayWriter] = None
+        self.started = False
+        self.sim: Optional[PongSim] = None
+        self.clock: Optional[MatchClock] = None # Started with the match, answers the players' clock pings
+        self.tickTask: Optional[asyncio.Task] = None
+        # Numbered paddle inputs waiting for a tick, and the last sequence number acknowledged to each player
+        self.inputs = {"left": InputQueue(), "right": InputQueue()}
+        self.ackedSeqs = {"left": 0, "right": 0}
+
+    # Returns the first paddle side that nobody has taken yet, or None if the room is full
+    def open_side(self) -> Optional[str]:
+        for side in ("left", "right"):
+            if self.players[side] is None:
+                return side
+        return None
+
+    def members(self) -> list:
+        return [c for c in self.players.values() if c is not None] + self.spectators
+
+    def add(self, conn:Connection, side:str) -> None:
+        if side == SPECTATOR_SIDE:
+            self.spectators.append(conn)
+        else:
+            self.players[side] = conn
+        conn.side = side
+        conn.room = self
+
+    def remove(self, conn:Connection) -> None:
+        if conn.side == SPECTATOR_SIDE:
+            if conn in self.spectators:
+                self.spectators.remove(conn)
+        elif self.players.get(conn.side) is conn:
+            self.players[conn.side] = None
+        conn.room = None
+
+    # Same idea as broadcast() in pongServer.py, the frame goes to every member including the sender.
+    # Nothing sent this way is ever dropped, so it is only used for handshakes and commands
+    def broadcast(self, data:bytes) -> None:
+        for c in self.members():
+            c.send(data)
+
+    # Forwards a frame exactly as it was received, players that negotiated another wire format get
+    # it re-encoded, and that is done at most once per format. Sync frames are decoded by the caller
+    # and passed as state, since they only make sense against the sender's own snapshots.
+    # Spectators are not looped over here, the frame is only stored in the feed, so a big audience
+    # costs the players nothing until a spectator packet is due
+    def relay(self, kind:Optional[str], frame:Optional[bytes], sender:str, state:Optional[GameState] = None) -> None:
+        converted = None # Only made when a member needs another format, most frames go out as they came
+        for c in self.players.values():
+            if c is None:
+                continue
+            if c.proto == kind and kind != PROTO_SYNC:
+                c.send(frame, sender)
+                continue
+            if state is None:
+                state = decode_frame(kind, frame)
+            if c.sync is not None:
+                # SYNC1 members get a delta against their own acknowledged snapshot, or nothing
+                data = c.sync.encode(state)
+                if data is not None:
+                    c.send(data, sender)
+                continue
+            if converted is None:
+                converted = {}
+            if c.proto not in converted:
+                try:
+                    converted[c.proto] = ENCODERS[c.proto](state)
+                except ValueError:
+                    # FrameReader only passes states that fit, this is a state made somewhere else going wrong
+                    log.warning("[DROPPED] %s state that can not be sent as %s: %s", sender, c.proto, state)
+                    return
+            c.send(converted[c.proto], sender)
+        if self.recorder is not None:
+            self.recorder.record(kind, frame, state)
+        self.feed.offer(kind, frame, sender, state)
+        if self.spectators and self.feed.due():
+            self.send_spectators()
+
+    # The same packet bytes go to every spectator that shares a format, keyed so a slow one only
+    # ever has the newest packet waiting
+    def send_spectators(self) -> None:
+        feed = self.feed
+        for c in self.spectators:
+            c.send(feed.encode(c.proto), SPECTATOR_KEY)
+
+    # START for a spectator, followed right away by the newest states so a late joiner can draw the match
+    def start_spectator(self, conn:Connection, suffix:str) -> None:
+        conn.send(f"START:{SPECTATOR_SIDE}{suffix}\n".encode('utf-8'))
+        if self.feed.has_state():
+            conn.send(self.feed.encode(conn.proto), SPECTATOR_KEY)
+
+    # Sends a game state to every member in the wire format it negotiated
+    def broadcast_state(self, state:GameState) -> None:
+        self.relay(None, None, state.name, state)
+
+    # Finishes the room's replay file, if it has one, so it gets its index
+    def stop_recording(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            log.info("[RECORDING SAVED] Room %s: %s %s", self.roomId, self.recorder.path, self.recorder.stats())
+            self.recorder = None
+
+# Author:  Daniel Krutsick
+# Purpose:  Accepts every client on one listening socket and pairs them into rooms as they arrive
+# Pre:  The host IP and port number are valid and the port is free
+# Post:  serve() runs until close() is called, then every remaining connection is closed
+class AsyncPongServer:
+    def __init__(self, host:str, port:int, authoritative:bool = False, tickRate:int = TICK_RATE, udp:bool = False,
+                 spectatorRate:float = SPECTATOR_RATE, recordDir:Optional[str] = None, metricsPort:Optional[int] = None,
+                 stepTicks:int = STEP_TICKS, limits:Optional[Limits] = None) -> None:
+        self.host = host
+        self.port = port
+        self.metricsPort = metricsPort
+        self.metrics = ServerMetrics()
+        self.metricsServer = None
+        self.authoritative = authoritative
+        self.tickRate = tickRate
+        self.stepTicks = max(1, stepTicks)
+        self.limits = limits if limits is not None else Limits()
+        self.spectatorRate = spectatorRate
+        self.recordDir = recordDir
+        self.udpRegistry: Optional[UdpRegistry] = UdpRegistry() if udp else None
+        self.udpTransport: Optional[asyncio.DatagramTransport] = None
+        self.rooms = {}
+        self.openRoom: Optional[Room] = None
+        self.roomIds = itertools.count(1)
+        self.connections = set()
+        self.matchesStarted = 0
+        self.evicted = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.closed: Optional[asyncio.Event] = None
+
+    # Places a new connection on the next open paddle, and sends START:<side> to both players
+    # as soon as a room is full, the same handshake the threaded server uses. Authoritative rooms
+    # send START:<side>:AUTH so the clients know to send input instead of their whole world
+    def assign(self, conn:Connection) -> None:
+        if self.openRoom is None:
+            self.openRoom = Room(next(self.roomIds), self.spectatorRate)
+            self.rooms[self.openRoom.roomId] = self.openRoom
+        room = self.openRoom
+        room.add(conn, room.open_side())
+        log.info("[NEW CONNECTION] %s assigned to %s paddle in room %s", conn.addr, conn.side, room.roomId)
+        if room.open_side() is None:
+            self.openRoom = None
+            room.started = True
+            self.matchesStarted += 1
+            self.metrics.counters["matches_started"] += 1
+            if self.recordDir:
+                room.recorder = ReplayWriter(self.recording_path(room))
+            room.clock = MatchClock(self.tickRate)
+            suffix = self.start_suffix()
+            for side, player in room.players.items():
+                player.send(f"START:{side}{suffix}\n".encode('utf-8'))
+            # Anyone who started watching before the match was full starts with the players
+            for spectator in room.spectators:
+                room.start_spectator(spectator, suffix)
+            if self.authoritative:
+                room.sim = PongSim()
+                room.tickTask = asyncio.create_task(self.run_room(room))
+
+    @property
+    def framesRelayed(self) -> int:
+        return self.metrics.counters["frames_relayed"]
+
+    def start_suffix(self) -> str:
+        return ":AUTH" if self.authoritative else ""
+
+    # One file per match, named after the room and when it started so restarts never overwrite a recording
+    def recording_path(self, room:Room) -> str:
+        os.makedirs(self.recordDir, exist_ok=True)
+        return os.path.join(self.recordDir, f"room{room.roomId}-{time.strftime('%Y%m%d-%H%M%S')}{REPLAY_EXTENSION}")
+
+    # Gives a connection a paddle once its grace period is over, unless it asked to watch in the meantime
+    def assign_if_unplaced(self, conn:Connection) -> None:
+        conn.assignTimer = None
+        if conn.room is None and not conn.writer.is_closing():
+            self.assign(conn)
+
+    # Moves a connection out of whatever room it was paired into and into another room's spectators.
+    # A match that is already running sends START and its newest states straight away
+    def watch(self, conn:Connection, roomId:int) -> None:
+        room = self.rooms.get(roomId)
+        if room is None:
+            return
+        if conn.assignTimer is not None:
+            # Never given a paddle, so no room is started or broken up by a spectator passing through
+            conn.assignTimer.cancel()
+            conn.assignTimer = None
+        self.leave(conn)
+        room.add(conn, SPECTATOR_SIDE)
+        if room.started:
+            room.start_spectator(conn, self.start_suffix())
+        log.info("[NEW SPECTATOR] %s is watching room %s", conn.addr, roomId)
+
+    # Takes a connection out of its room. A match that loses a player is over, so the other player is
+    # sent END and can send REQUEUE for another match, the spectators are closed, which lets their
+    # clients exit normally, and the room is thrown away.
+    # A room that never started stays the open room, so the next connection fills the empty side
+    def leave(self, conn:Connection) -> None:
+        room = conn.room
+        if room is None:
+            return
+        side = conn.side
+        room.remove(conn)
+        if side != SPECTATOR_SIDE and room.started:
+            if room.tickTask is not None:
+                room.tickTask.cancel()
+            room.stop_recording()
+            for player in room.players.values():
+                if player is not None:
+                    player.room = None
+                    player.send(b"END\n")
+            for spectator in room.spectators:
+                spectator.room = None
+                spectator.close()
+            self.rooms.pop(room.roomId, None)
+
+    # Puts a connection back in line for a paddle, ending its match first if it was playing one. The same
+    # lobby as pongServer.py, except a room here is filled as soon as someone is waiting
+    def requeue(self, conn:Connection) -> None:
+        if conn.assignTimer is not None:
+            # Not placed yet, it gets a paddle when its grace period is over anyway
+            return
+        if conn.room is not None and not conn.room.started and conn.side != SPECTATOR_SIDE:
+            # Already waiting for an opponent
+            return
+        self.leave(conn)
+        self.assign(conn)
+
+    # Relays each complete game state frame to the rest of the room as the original bytes. Any other
+    # text line is a command or, in authoritative rooms, paddle input
+    def handle_frame(self, conn:Connection, kind:str, frame) -> None:
+        room = conn.room
+        if kind == PROTO_SYNC:
+            state = conn.sync.receive(bytes(frame)) if conn.sync is not None else None
+            acks = conn.sync.take_acks() if conn.sync is not None else b""
+            if acks:
+                conn.send(acks)
+            if state is not None and room is not None and room.started and room.sim is None and conn.side != SPECTATOR_SIDE:
+                self.relay(room, kind, None, conn.side, state)
+            return
+        if kind == FRAME_LINE:
+            if frame in PROTO_REQUESTS:
+                conn.send(frame + b"\n")
+                conn.proto = PROTO_REQUESTS[frame]
+                if conn.proto == PROTO_SYNC and conn.sync is None:
+                    conn.sync = SyncSession()
+                    # A dropped delta may have been the last change, the next state has to go out anyway
+                    conn.queue.onDrop = conn.sync.resend
+            elif frame == PROTO_UDP_REQUEST:
+                # Servers started without UDP stay quiet, so the client keeps sending over TCP
+                if self.udpTransport is not None and conn.udp is None:
+                    conn.udp = self.udpRegistry.add(conn)
+                    conn.udpTransport = self.udpTransport
+                    conn.udpFrames = FrameReader(MAX_DATAGRAM)
+                    conn.send(f"UDP:{conn.udp.token}\n".encode('utf-8'))
+            elif frame.startswith(b"WATCH:"):
+                try:
+                    self.watch(conn, int(frame[6:]))
+                except ValueError:
+                    pass
+            elif frame == b"REQUEUE":
+                self.requeue(conn)
+            elif frame.startswith(CLOCK_PREFIX):
+                # Keyed, so the answer goes back the same way (TCP or UDP) as the room's states
+                reply = room.clock.answer(frame) if room is not None and room.clock is not None else None
+                if reply is not None:
+                    conn.send(reply, "clock")
+            elif room is not None and room.sim is not None:
+                # Input lines look like IN:<side>:<up|down|>[:<sequence number>], a player can only steer its own paddle
+                parts = frame.decode('utf-8', 'replace').split(":")
+                if len(parts) in (3, 4) and parts[0] == "IN" and parts[1] == conn.side:
+                    if len(parts) == 4 and parts[3].isdigit():
+                        # Numbered inputs are used one per tick, matching the client's prediction
+                        room.inputs[conn.side].push(int(parts[3]), parts[2])
+                    else:
+                        room.sim.set_input(conn.side, parts[2])
+                else:
+                    conn.stats.parseFailures += 1
+            else:
+                conn.stats.parseFailures += 1
+                log.warning("[WARNING] Could not parse message: %r", frame)
+            return
+        if room is not None and room.started and room.sim is None and conn.side != SPECTATOR_SIDE:
+            # The transport may hold on to what it is given, so the frame leaves the receive buffer here
+            self.relay(room, kind, bytes(frame), conn.side)
+
+    # Room.relay(), timed and counted for the metrics endpoint
+    def relay(self, room:Room, kind:Optional[str], frame:Optional[bytes], side:str, state:Optional[GameState] = None) -> None:
+        start = time.perf_counter()
+        room.relay(kind, frame, side, state)
+        self.metrics.relayLatency.observe(time.perf_counter() - start)
+        self.metrics.counters["frames_relayed"] += 1
+
+    # A datagram holds whole frames, so they are handled exactly like the same frames sent over TCP
+    def handle_datagram(self, data:bytes, addr) -> None:
+        accepted = self.udpRegistry.accept(data, addr)
+        if accepted is None:
+            return
+        peer, payload = accepted
+        conn = peer.owner
+        conn.udpFrames.feed(payload)
+        for kind, frame in conn.udpFrames.frames():
+            self.handle_frame(conn, kind, frame)
+        conn.udpFrames.discard()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Fixed timestep loop for one authoritative room, steps the sim and sends the world out
+    # Pre:  room.sim has been created and both players have been sent START
+    # Post:  Returns once the match is over, or is cancelled when a player leaves. Every step covers
+    #        stepTicks ticks, and each numbered input still gets its own tick inside it
+    async def run_room(self, room:Room) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.stepTicks / self.tickRate
+        # Tick n is stepped n ticks after the room's clock started, so the TM of the states sent out is the
+        # match tick the players' clocks show. The loop's clock is time.monotonic(), the same as MatchClock's
+        nextTick = room.clock.started + interval
+        await asyncio.sleep(max(nextTick - loop.time(), 0))
+        paddles = room.sim.paddles
+        while True:
+            # Which way each paddle moves on each tick of this step, runs of the same pair are advanced together
+            held = {side: paddles[side].moving for side in room.inputs}
+            runs = []
+            for _ in range(self.stepTicks):
+                for side, inputs in room.inputs.items():
+                    nextInput = inputs.take()
+                    if nextInput is not None:
+                        held[side] = nextInput[1]
+                moves = (held["left"], held["right"])
+                if runs and runs[-1][0] == moves:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([moves, 1])
+            scored = False
+            for (leftMove, rightMove), ticks in runs:
+                room.sim.set_input("left", leftMove)
+                room.sim.set_input("right", rightMove)
+                room.sim.advance(ticks)
+                scored = scored or room.sim.scored
+            # Tells each player which of its inputs this tick's states include, so its predicted paddle
+            # can be corrected. Keyed so a player that is behind only ever gets the newest one
+            for side, player in room.players.items():
+                seq = room.inputs[side].lastSeq
+                if player is not None and seq != room.ackedSeqs[side]:
+                    room.ackedSeqs[side] = seq
+                    player.send(f"AK:{seq}\n".encode('utf-8'), "ack")
+            # States may be lost over UDP, so each point is also sent where it is sure to arrive
+            if scored:
+                room.broadcast(f"SCORE:{room.sim.lScore}:{room.sim.rScore}\n".encode('utf-8'))
+            for state in room.sim.states():
+                room.broadcast_state(state)
+            self.metrics.counters["frames_relayed"] += 1
+            if room.sim.is_over():
+                return
+            # Scheduling against the ideal tick time instead of sleeping a fixed amount keeps the
+            # tick rate steady even when one step or broadcast runs long
+            nextTick += interval
+            delay = nextTick - loop.time()
+            if delay < -interval:
+                # The ticks that were missed are skipped, not stepped, so the TM stays on the match clock
+                nextTick = loop.time()
+                room.sim.tick = room.clock.tick(nextTick)
+                delay = 0
+            await asyncio.sleep(max(delay, 0))
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Runs once per connected client as an asyncio task instead of a thread
+    # Pre:  Called by asyncio.start_server() with the streams of a freshly accepted socket
+    # Post:  The connection has left its room and its socket is closed, and was counted under the reason
+    #        if it went over its limits
+    async def handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        if self.limits.full(len(self.connections)):
+            # Turned away before it gets a queue or a write task
+            writer.close()
+            self.metrics.inc(REJECTED)
+            log.warning("[REJECTED] %s, the server already has %s clients", writer.get_extra_info("peername"), len(self.connections))
+            return
+        conn = Connection(reader, writer)
+        self.connections.add(conn)
+        self.metrics.add_connection(conn.stats.name, conn.queue, conn.stats)
+        writeTask = asyncio.create_task(conn.write_loop())
+        # A spectator sends WATCH:<room> straight after its PROTO lines, so a paddle is only handed out once
+        # it has had the chance to, otherwise two spectators arriving together could start a match
+        conn.assignTimer = asyncio.get_running_loop().call_later(ASSIGN_GRACE, self.assign_if_unplaced, conn)
+        frames = FrameReader()
+        guard = ConnectionGuard(self.limits)
+        kicked = None
+        try:
+            while kicked is None:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    break
+                guard.received()
+                stats = conn.stats
+                stats.bytesIn += len(chunk)
+                frames.feed(chunk)
+                for kind, frame in frames.frames():
+                    stats.framesIn += 1
+                    if not guard.frame():
+                        break
+                    self.handle_frame(conn, kind, frame)
+                stats.droppedBytes = frames.dropped
+                kicked = guard.check(frames.end - frames.start, stats)
+        except ConnectionResetError:
+            pass
+        finally:
+            if kicked is not None:
+                self.metrics.inc(kicked)
+                log.warning("[KICKED] %s was disconnected: %s", conn.addr, kicked)
+            writeTask.cancel()
+            self.metrics.remove_connection(conn.stats.name)
+            if conn.assignTimer is not None:
+                conn.assignTimer.cancel()
+            if conn.evicted:
+                self.evicted += 1
+            self.leave(conn)
+            self.connections.discard(conn)
+            if conn.udp is not None:
+                self.udpRegistry.remove(conn.udp)
+            conn.close()
+            log.info("[CLIENT DISCONNECT] The client: %s has disconnected from the server!", conn.addr)
+
+    async def serve(self, ready:Optional[asyncio.Event] = None) -> None:
+        self.closed = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Port 0 asks the OS for any free port, so read back the one we actually got
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info("[LISTENING] Async server listening on %s:%s", self.host, self.port)
+        if self.metricsPort is not None:
+            self.metricsServer = start_metrics_endpoint(self.metrics, self.host, self.metricsPort)
+            self.metricsPort = self.metricsServer.server_address[1]
+            log.info("[LISTENING] Metrics on http://%s:%s/metrics", self.host, self.metricsPort)
+        self.metrics.gauge("rooms", lambda: len(self.rooms))
+        self.metrics.gauge("fanout_evicted", lambda: self.evicted)
+        if self.udpRegistry is not None:
+            # Same port number as TCP, so a client only ever needs the one address
+            self.udpTransport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: DatagramHandler(self), local_addr=(self.host, self.port))
+            log.info("[LISTENING] UDP game states on %s:%s", self.host, self.port)
+        if ready is not None:
+            ready.set()
+        async with self.server:
+            await self.closed.wait()
+        for room in self.rooms.values():
+            room.stop_recording()
+        log.info("[FANOUT STATS] %s", self.fanout_stats())
+        log.info("[RELAY LATENCY] %s", self.metrics.relayLatency.summary())
+        if self.udpTransport is not None:
+            log.info("[UDP STATS] %s", self.udpRegistry.stats())
+            self.udpTransport.close()
+        if self.metricsServer is not None:
+            self.metricsServer.shutdown()
+        for conn in list(self.connections):
+            conn.close()
+        log.info("[SERVER CLOSED]")
+
+    # Queue depth and drop counters summed over every connection, for tuning the fan-out limits
+    def fanout_stats(self) -> dict:
+        totals = {"peers": len(self.connections), "evicted": self.evicted, "depth": 0, "dropped": 0, "coalesced": 0, "sent": 0}
+        for conn in self.connections:
+            s = conn.queue.stats()
+            for name in ("depth", "dropped", "coalesced", "sent"):
+                totals[name] += s[name]
+        return totals
+
+    def close(self) -> None:
+        if self.closed is not None:
+            self.closed.set()
+
+# Author:  Daniel Krutsick
+# Purpose:  Blocking entry point for the async engine, mirrors start_server() in pongServer.py
+# Pre:  The host IP and port number is correct
+# Post:  Returns 0 after the server has been closed with ctrl+c
+def run_async_server(host:str, port:int, authoritative:bool = False, udp:bool = False,
+                     spectatorRate:float = SPECTATOR_RATE, recordDir:Optional[str] = None, metricsPort:Optional[int] = None,
+                     stepTicks:int = STEP_TICKS, limits:Optional[Limits] = None) -> int:
+    server = AsyncPongServer(host, port, authoritative, udp=udp, spectatorRate=spectatorRate, recordDir=recordDir,
+                             metricsPort=metricsPort, stepTicks=stepTicks, limits=limits)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        log.warning("[ClOSING SERVER]: KEYBOARD INTERRUPT EXCEPTION")
+    return 0
+
+if __name__ == "__main__":
+    HOST = input("Enter server IP address (default 0.0.0.0): ") or "0.0.0.0"
+    PORT = int(input("Enter server port number: ") or 50007)
+    AUTH = (input("Run the physics on the server? y/n (default n): ") or "n").lower().startswith("y")
+    STEPS = TICK_RATE
+    if AUTH:
+        STEPS = int(input(f"Physics steps per second, {TICK_RATE}/30/20 (default {TICK_RATE}): ") or TICK_RATE)
+    UDP = (input("Accept game states over UDP? y/n (default n): ") or "n").lower().startswith("y")
+    RATE = float(input(f"Spectator updates per second (default {SPECTATOR_RATE}): ") or SPECTATOR_RATE)
+    RECORD = input("Folder to record matches to (default none): ") or None
+    METRICS_PORT = int(input("Metrics port (default none): ") or -1)
+    LOG_LEVEL = input("Log level, debug/info/warning (default info): ") or "info"
+    LIMITS = Limits()
+    MAX_CLIENTS = int(input(f"Most clients connected at once (default {LIMITS.maxClients}): ") or LIMITS.maxClients)
+    FRAME_RATE = float(input(f"Most frames per second from one client (default {LIMITS.frameRate:g}): ") or LIMITS.frameRate)
+    setup_logging(LOG_LEVEL)
+    run_async_server(HOST, PORT, AUTH, UDP, RATE, RECORD, METRICS_PORT if METRICS_PORT >= 0 else None,
+                     max(1, round(TICK_RATE / STEPS)), Limits(MAX_CLIENTS, FRAME_RATE, max(1, round(FRAME_RATE))))
+    stop_logging()
@@ -4,89 +4,197 @@
 # Date:                     11/24/2025
 # Purpose:                  The Client member of our Pong game
 # Misc:                     to run the pongClient.py file directly run "python pongClient.py"
+#                           "python pongClient.py --ip <server> --port <port>" skips the start screen, and
+#                           --headless --bot plays with no window, sound or keyboard, for scripts and tests.
+#                           pygame and tkinter are only imported when they are first needed, and the fonts,
+#                           sounds and window are loaded in the background (clientAssets.py) while the
+#                           player is on the start screen or waiting for an opponent.
+#                           F3 during a match shows where each frame's time goes (frameProfiler.py), and
+#                           --trace <file> writes every frame to a timeline for chrome://tracing.
 # =================================================================================================
+import argparse
+import os
 import queue
-import pygame
-import re
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
-import tkinter as tk
 import sys
 import threading
 import socket
 import time
 
-from assets.code.helperCode import *
+from assets.code.clientAssets import ClientAssets
+from assets.code.clockSync import ClockSync
+from assets.code.frameProfiler import FrameProfiler
+from assets.code.netcode import SEND_RATE, BallAuthority, PaddlePredictor, SnapshotBuffer, StateMailbox, StateSender
+from assets.code.spectate import SPECTATOR_DELAY, SPECTATOR_SIDE
+from assets.code.stateSync import SyncSession
+from assets.code.udpTransport import UdpClient
+from assets.code.wireProtocol import PROTO_BINARY, PROTO_SYNC, PROTO_TEXT, PROTO_UDP, ENCODERS, FrameDecoder, GameState, parse_text
+
+if TYPE_CHECKING:
+    import tkinter as tk
+
+# The wire formats this client asks the server for, in order, and the one the server has agreed to so far.
+# Each request the server knows is acknowledged, so the last acknowledged one wins
+PROTO_PREFERENCES = (PROTO_BINARY, PROTO_SYNC)
+wireProto = PROTO_TEXT
+# Snapshot/delta state for the SYNC1 format, shared by the receive thread and playGame's send path
+syncSession = SyncSession()
+# The UDP channel for game states when it was picked on the start screen, None means everything goes over TCP
+udpLink = None
+# Parsed game states, acks and scores from the receive threads, newest per side, read by playGame() every frame.
+# msg_queue only carries the other lines, such as START
+stateMailbox = StateMailbox()
+# The thread sending our states and inputs during a match, the receive threads tell it when the server echoes
+# one of them so it can measure the round trip. None between matches and for spectators
+stateSender = None
+# Our estimate of the server's clock for the current match, reset when START arrives and corrected by the
+# answers to the CLK pings playGame() sends. Every state we send is stamped with its match tick
+matchClock = ClockSync()
+# The fonts, sounds and window, kept from one match to the next. startArrived is when the receive thread
+# saw the last START, for the time to first frame
+clientAssets = ClientAssets()
+startArrived = 0.0
+# Lines from the server we could not parse and skipped, like the server's parseFailures, printed with the frame
+# report when there were any
+parseFailures = 0
+# False loads them only once START has arrived, like the client used to (--no-preload), for comparing
+preloadAssets = True
+# Times every phase of every frame for the F3 overlay, kept across matches. With --trace the frames are also
+# kept for a timeline, written to tracePath at the end of every match
+frameProfiler = FrameProfiler()
+tracePath = None
+
+# Author:  Jacob Blankenship
+# Purpose:  Turns one of our game states into bytes in the format the server agreed to
+# Pre:  Called by the StateSender thread, wireProto may change between calls when the server acks a format
+# Post:  A SYNC1 delta (nothing if the state has not changed), or a whole binary or text state. The acks we
+#        owe the server for its snapshots are sent by route_message()
+def encode_state(state:GameState) -> bytes:
+    if wireProto == PROTO_SYNC:
+        return syncSession.encode(state) or b""
+    return ENCODERS[wireProto](state)
 
 # The main game loop, called after connecting to the server and getting the required info
-# Added msg_queue parameter to receive messages from the server, as our client code caches 
-# incoming messages in a queue (see receive_messages function)
+# Added mailbox parameter to receive game states from the server, as our client code parses
+# incoming messages on the receive thread and keeps only the newest ones (see receive_messages function)
 
 # Author:  Initially provided by the instructor, modified by Jacob Blankenship
 # Purpose:  Main code to handle the Pong game client side, including movement, drawing, and
 #       sending/receiving game state to/from the server.
 # Pre:  Expects that there is a valid connection to the server via the client socket,
-#       and that msg_queue is being populated with incoming messages from the server,
+#       and that mailbox is being filled with game states from the server by the receive threads,
 #       as well as valid screen dimensions and player paddle side.
-# Post:  Runs the Pong game until a player wins or the connection is lost, then exits. Game does
-#       not return any values, or return to another function.
-def playGame(screenWidth:int, screenHeight:int, playerPaddle:str, client:socket.socket, msg_queue:queue.Queue) -> None:
+# Post:  Runs the Pong game until a player wins, the server ends the match or the connection is lost.
+#       Returns True when the match is over and the connection is still open, so joinServer() can ask
+#       for the next one, and False when the connection was lost.
+#       When serverAuthoritative is True the server owns the physics, so the client only sends its paddle
+#       input and draws whatever world the server sends back. A playerPaddle of "spectator" sends nothing
+#       and draws both paddles and the ball from the server's spectator feed.
+#       Nothing is sent from the frame loop itself, it hands each frame's state or input to a StateSender
+#       that writes at most sendRate times a second and slows down when the link backs up.
+#       States are stamped with the match tick from matchClock, and when the clients run the physics the
+#       ball is simulated by the client whose half it is on (see BallAuthority in netcode.py).
+#       The fonts, sounds and window come from clientAssets, already loaded while we waited for START.
+#       A bot (like gameSim.ChaseBot) moves our paddle instead of the keyboard when one is given.
+#       Every phase of every frame is timed by frameProfiler, F3 shows the overlay.
+def playGame(screenWidth:int, screenHeight:int, playerPaddle:str, client:socket.socket, mailbox:StateMailbox, serverAuthoritative:bool = False,
+             sendRate:float = SEND_RATE, bot = None) -> bool:
     
     print("The game started!")
-    # Pygame inits
-    pygame.mixer.pre_init(44100, -16, 2, 2048)
-    pygame.init()
+    # Already imported and started by clientAssets, so these cost nothing by now
+    screen = clientAssets.open_window()
+    import pygame
+    from assets.code.gameSim import PongSim
+    from assets.code.renderer import PongRenderer
 
     # Constants
     WHITE = (255,255,255)
     clock = pygame.time.Clock()
-    scoreFont = pygame.font.Font("./assets/fonts/pong-score.ttf", 32)
-    winFont = pygame.font.Font("./assets/fonts/visitor.ttf", 48)
-    pointSound = pygame.mixer.Sound("./assets/sounds/point.wav")
-    bounceSound = pygame.mixer.Sound("./assets/sounds/bounce.wav")
-
-    # Display objects
-    screen = pygame.display.set_mode((screenWidth, screenHeight))
+    scoreFont = clientAssets.scoreFont
+    winFont = clientAssets.winFont
+    pointSound = clientAssets.pointSound
+    bounceSound = clientAssets.bounceSound
+
+    # Display objects, the walls, paddles and ball belong to the headless sim so the physics is shared
+    # with the server and bots, playGame() only draws them
+    sim = PongSim(screenWidth, screenHeight)
     winMessage = pygame.Rect(0,0,0,0)
-    topWall = pygame.Rect(-10,0,screenWidth+20, 10)
-    bottomWall = pygame.Rect(-10, screenHeight-10, screenWidth+20, 10)
-    centerLine = []
-    for i in range(0, screenHeight, 10):
-        centerLine.append(pygame.Rect((screenWidth/2)-5,i,5,5))
-
-    # Paddle properties and init
-    paddleHeight = 50
-    paddleWidth = 10
-    paddleStartPosY = (screenHeight/2)-(paddleHeight/2)
-    leftPaddle = Paddle(pygame.Rect(10,paddleStartPosY, paddleWidth, paddleHeight))
-    rightPaddle = Paddle(pygame.Rect(screenWidth-20, paddleStartPosY, paddleWidth, paddleHeight))
-
-    ball = Ball(pygame.Rect(screenWidth/2, screenHeight/2, 5, 5), -5, 0)
-
-    if playerPaddle == "left":
+    topWall = sim.topWall
+    bottomWall = sim.bottomWall
+    # Draws the walls and center line once, and after that only the parts of the window that changed
+    renderer = PongRenderer(screen, [topWall, bottomWall], scoreFont, WHITE)
+
+    leftPaddle = sim.leftPaddle
+    rightPaddle = sim.rightPaddle
+    ball = sim.ball
+
+    spectating = playerPaddle == SPECTATOR_SIDE
+    if playerPaddle == "left" or spectating:
+        # A spectator draws the left paddle from its own buffer and the right one like an opponent's
         opponentPaddleObj = rightPaddle
         playerPaddleObj = leftPaddle
+        opponentSide = "right"
     else:
         opponentPaddleObj = leftPaddle
         playerPaddleObj = rightPaddle
+        opponentSide = "left"
 
     lScore = 0
     rScore = 0
 
-    sync = 0
+    # Without server physics the ball moves once per match tick, by us while it is on our half and from
+    # the other player's states while it is on theirs
+    ballAuthority = None if spectating or serverAuthoritative else BallAuthority(sim, playerPaddle, matchClock)
+
+    # Remote states are buffered and drawn slightly in the past, our own paddle is predicted locally.
+    # The spectator feed is slower, so spectators stay a little further behind to always have two states
+    remoteStates = SnapshotBuffer(delay=SPECTATOR_DELAY) if spectating else SnapshotBuffer()
+    spectatedStates = SnapshotBuffer(delay=SPECTATOR_DELAY)
+    predictor = PaddlePredictor(playerPaddleObj, screenHeight)
+    inputSeq = 0
+    ackedInput = 0
+    # The score from the server's SCORE lines, which arrive even when the states carrying it were lost
+    reliableScore = (0, 0)
 
     # Use the global paddleSide as requested (keeps compatibility with the server/client handshake)
-    global paddleSide
+    global paddleSide, stateSender
+
+    def write(data:bytes) -> None:
+        if udpLink is not None and udpLink.ready:
+            # A lost datagram is never resent, the next write carries a newer state anyway
+            udpLink.send(data)
+        else:
+            client.sendall(data)
+
+    # Spectators only watch, so they have nothing to send
+    sender = None
+    if not spectating:
+        sender = StateSender(write, playerPaddle, encode_state, sendRate)
+        sender.start()
+    stateSender = sender
+    firstFrame = True
+    profiler = frameProfiler
+    # Made once and refilled every frame, so a steady frame makes no new lists, dicts or bound methods
+    latest_messages = {"left": None, "right": None}
+    movingRects = (ball.rect, playerPaddleObj.rect, opponentPaddleObj.rect)
+    pushRemote = remoteStates.push
+    pushSpectated = spectatedStates.push
 
     while True:
         # Took out screen.fill((0,0,0)) and moved it as player bars and balls 
         # had white trails that were not leaving the screen
+        profiler.begin()
         
         # Getting keypress events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
+                report_frames()
+                clientAssets.close()
                 sys.exit()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # Only the changed parts are redrawn each frame, so the window has to be repainted if it was covered
+                renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_DOWN:
                     playerPaddleObj.moving = "down"
@@ -94,197 +202,298 @@ def playGame(screenWidth:int, screenHeight:int, playerPaddle:str, client:socket.
                 elif event.key == pygame.K_UP:
                     playerPaddleObj.moving = "up"
 
+                elif event.key == pygame.K_F3:
+                    profiler.toggle()
+
             elif event.type == pygame.KEYUP:
                 playerPaddleObj.moving = ""
+        if bot is not None:
+            playerPaddleObj.moving = bot(sim)
+        profiler.mark("events")
+
+        # Fill the dictionary of the latest messages from each paddle, None if nothing new came this frame.
+        # The receive threads already parsed them and kept only the newest, so a burst costs no more than one state
+        for side in latest_messages:
+            state, ack = mailbox.take(side)
+            latest_messages[side] = state
+            if side == playerPaddle:
+                # The server had applied our inputs up to this sequence number as of our newest state
+                ackedInput = ack
+        if mailbox.score is not None:
+            reliableScore = mailbox.score
+
+        # Time stamp the opponent's states for interpolation, only the newest few of a burst are kept
+        arrived = mailbox.drain(opponentSide, pushRemote)
+
+        if spectating:
+            # The left paddle's states too, a spectator draws both sides from buffers
+            mailbox.drain("left", pushSpectated)
+        profiler.mark("network")
+
+        if spectating:
+            # Nothing is simulated here, the paddles, ball and score all come from the two buffers
+            left = spectatedStates.sample()
+            right = remoteStates.sample()
+            if left:
+                leftPaddle.rect.y = left.pos
+            if right:
+                rightPaddle.rect.y = right.pos
+            # Without server physics each player simulates the ball while it is on their half, so the state that has
+            # it there is the one to draw. Both are stamped with the match tick, so otherwise the newer one wins
+            states = [state for state in (left, right) if state]
+            owned = [state for state in states if (state.bx < screenWidth / 2) == (state.name == "left")]
+            newest = max(owned or states, key=lambda state: state.time, default=None)
+            if newest:
+                ball.rect.x = newest.bx
+                ball.rect.y = newest.by
+                lScore = newest.lscore
+                rScore = newest.rscore
+
+        elif serverAuthoritative:
+            # Our own paddle is lined up with the server's, then everything else is drawn from the buffer
+            if latest_messages[playerPaddle]:
+                predictor.reconcile(latest_messages[playerPaddle].pos, ackedInput)
+            remote = remoteStates.sample()
+            if remote:
+                # Server owned matches have no local physics, so the point and bounce sounds come from
+                # the score changing or the ball turning around between two drawn frames
+                if remote.lscore != lScore or remote.rscore != rScore:
+                    pointSound.play()
+                elif (remote.bx - ball.rect.x) * ball.xVel < 0 or (remote.by - ball.rect.y) * ball.yVel < 0:
+                    bounceSound.play()
+                if remote.bx != ball.rect.x or remote.by != ball.rect.y:
+                    ball.xVel = remote.bx - ball.rect.x
+                    ball.yVel = remote.by - ball.rect.y
+                ball.rect.x = remote.bx
+                ball.rect.y = remote.by
+                lScore = remote.lscore
+                rScore = remote.rscore
+                opponentPaddleObj.rect.y = remote.pos
 
-        # Create a dictionary to hold the latest messages from each paddle
-        latest_messages = {"left": {}, "right": {}}
-
-        # While there are messages in the queue, process them
-        while not msg_queue.empty():
-
-            # Add and pop message from queue
-            incomingmessage = msg_queue.get_nowait()
-            parsed = parse_game_state(incomingmessage)
-
-            # If the message could not be parsed, skip it
-            if parsed is None:
-                print("[WARNING] Received unparsable message, ignoring.")
-                continue
-
-            # Store the latest message from each paddle
-            latest_messages[parsed['name']] = parsed
-
-        # Only update if we have messages from both paddles
-        if latest_messages['left'] and latest_messages['right']:
-            left = latest_messages['left']
-            right = latest_messages['right']
-                
-            # Use the data from the client with the higher timestamp,
-            # also update sync variable so that both users stay in sync
-            if left['time'] >= right['time']:
-                authoritative = left
-                if paddleSide == "right":
-                    sync = left['time']
-            else:
-                authoritative = right
-                if paddleSide == "left":
-                    sync = right['time']
-
-            
-            # Update ball position by the user that had the latest timestamp
-            ball.rect.x = authoritative['bx']
-            ball.rect.y = authoritative['by']
-            lScore = authoritative['lscore']
-            rScore = authoritative['rscore']
-
-            # Update opponent paddle position
-            if playerPaddle == "left":
-                opponentPaddleObj.rect.y = right['pos']
-            else:
-                opponentPaddleObj.rect.y = left['pos']
-
-
-            #print(f"[SYNC] Left time: {left['time']}, Right time: {right['time']}, "
-                #f"Authoritative: {authoritative['name']}")
-
-        # Decided to clear the screen here instead to prevent trails
-        screen.fill((0,0,0))
-
-        # Update the player paddle and opponent paddle's location on the screen
-        for paddle in [playerPaddleObj, opponentPaddleObj]:
-            if paddle.moving == "down":
-                if paddle.rect.bottomleft[1] < screenHeight-10:
-                    paddle.rect.y += paddle.speed
-            elif paddle.moving == "up":
-                if paddle.rect.topleft[1] > 10:
-                    paddle.rect.y -= paddle.speed
+        else:
+            # The ball used to come from whichever client's frame counter was higher, which flipped back and forth
+            # between two machines drawing at different rates. Now the other player's state is only used while the
+            # ball is on their half, where their paddle decides, and it is moved up to the present match tick
+            ballAuthority.take(latest_messages[opponentSide])
+            lScore = sim.lScore
+            rScore = sim.rScore
+
+        # The states after the winning point may never arrive over UDP, the SCORE line always does
+        if max(reliableScore) > 9:
+            lScore, rScore = reliableScore
+
+        # The opponent paddle is drawn a little in the past, between two states that have both arrived,
+        # instead of jumping to whatever came in last
+        if not serverAuthoritative and not spectating:
+            remote = remoteStates.sample()
+            if remote:
+                opponentPaddleObj.rect.y = remote.pos
+
+        # Update the player paddle and opponent paddle's location on the screen. When the server moves
+        # them, our own paddle is still moved right away as a prediction and the opponent's comes from the server
+        if serverAuthoritative and not spectating:
+            inputSeq = predictor.apply(playerPaddleObj.moving)
+        elif not spectating:
+            sim.move_paddles()
 
         # If the game is over, display the win message
         # Switched score to 9 to make the game longer
-        if lScore > 9 or rScore > 9:
-            winText = "Player 1 Wins! " if lScore > 9 else "Player 2 Wins! "
+        # The server sends END when the other player left or already asked for its next match
+        if lScore > 9 or rScore > 9 or (mailbox.ended and not spectating):
+            screen.fill((0,0,0))
+            if lScore > 9 or rScore > 9:
+                winText = "Player 1 Wins! " if lScore > 9 else "Player 2 Wins! "
+            else:
+                winText = "Opponent Left! "
             textSurface = winFont.render(winText, False, WHITE, (0,0,0))
             textRect = textSurface.get_rect()
             textRect.center = (int(screenWidth/2), int(screenHeight/2))
             winMessage = screen.blit(textSurface, textRect)
             
             # Also created a sleep and auto quit after displaying win message
-            # So that code can exit properly instead of hanging and rerun sooner
+            # The connection stays open, joinServer() puts us back in the server's lobby for the next match
             pygame.display.update()
+            if sender is not None:
+                sender.stop()
+                stateSender = None
+                print("[CLIENT] Send stats:", sender.stats())
+            report_frames()
             time.sleep(3)
-            pygame.quit()
-            client.close()
-            return
-        else:
-
-            ball.updatePos()
-            
-            # If the ball makes it past the edge of the screen, update score, etc.
-            if ball.rect.x > screenWidth:
-                lScore += 1
-                pointSound.play()
-                ball.reset(nowGoing="right")
-            elif ball.rect.x < 0:
-                rScore += 1
+            # The window stays open for the next match, joinServer() closes it when we are done
+            return True
+        elif not serverAuthoritative and not spectating:
+            # One step per match tick since the last frame, so a slower window does not slow the ball down
+            ballAuthority.step()
+            lScore = sim.lScore
+            rScore = sim.rScore
+            if ballAuthority.scored:
                 pointSound.play()
-                ball.reset(nowGoing="left")
-                
-            # If the ball hits a paddle (host authoritative)
-            if ball.rect.colliderect(playerPaddleObj.rect):
-                bounceSound.play()
-                ball.hitPaddle(playerPaddleObj.rect.center[1])
-            elif ball.rect.colliderect(opponentPaddleObj.rect):
+            if ballAuthority.bounced:
                 bounceSound.play()
-                ball.hitPaddle(opponentPaddleObj.rect.center[1])
-                
-            # If the ball hits a wall
-            if ball.rect.colliderect(topWall) or ball.rect.colliderect(bottomWall):
-                bounceSound.play()
-                ball.hitWall()
-
-            pygame.draw.rect(screen, WHITE, ball.rect)
 
-        # Drawing the dotted line in the center
-        for i in centerLine:
-            pygame.draw.rect(screen, WHITE, i)
-        # Drawing the player's new location
-
-        #print("[DRAWING PADDLES]")
-        #print("[OPPONENT PADDLE Y]:", playerPaddleObj.rect.y)
-
-        for paddle in [playerPaddleObj, opponentPaddleObj]:
-            pygame.draw.rect(screen, WHITE, paddle.rect)
-            
-        pygame.draw.rect(screen, WHITE, topWall)
-        pygame.draw.rect(screen, WHITE, bottomWall)
-        
-        # New varient of updateScore + pygame.display.update as other varient (commented out) was causing problems
-        #scoreRect = updateScore(lScore, rScore, screen, WHITE, scoreFont)
-        #pygame.display.update([topWall, bottomWall, ball.rect, leftPaddle.rect, rightPaddle.rect, scoreRect, winMessage])
-        
-        updateScore(lScore, rScore, screen, WHITE, scoreFont)
-        pygame.display.update()
-
-        # Encoding and sending the game state to the server
-        # Using a MSG_PATTERN that is compatible with the server's parsing function
-        try:
-            msg = f"PN:{playerPaddle}:PP:{playerPaddleObj.rect.y}:BX:{ball.rect.x}:BY:{ball.rect.y}:LS:{lScore}:RS:{rScore}:TM:{sync}\n"
-            client.sendall(msg.encode('utf-8'))
-        except:
+        profiler.mark("update")
+
+        # The renderer erases where the ball and paddles were last frame, draws them where they are now and
+        # sends only those rects (and the score when it changes) to the display
+        overlay = profiler.overlay_surface(pygame) if profiler.showing else None
+        renderer.draw(movingRects, lScore, rScore, overlay)
+        profiler.mark("draw")
+        if firstFrame:
+            firstFrame = False
+            print(f"[CLIENT] First frame drawn {(time.perf_counter() - startArrived) * 1000:.1f} ms after START")
+
+        # Handing the game state to the sender thread, which encodes it in the agreed format and sends it
+        # without this frame waiting on the socket
+        if serverAuthoritative and not spectating:
+            # Only the input goes up, numbered so the server can tell us which ones it has applied. Every one
+            # of them is sent, several to a write when the sender is running slower than the frame rate
+            sender.push(f"IN:{playerPaddle}:{playerPaddleObj.moving}:{inputSeq}\n".encode('utf-8'), inputSeq)
+        elif not spectating:
+            sender.offer(GameState(playerPaddle, playerPaddleObj.rect.y, ball.rect.x, ball.rect.y, lScore, rScore, ballAuthority.tick))
+        # Pings for the match clock go out with everything else, spectators have only them to send
+        ping = matchClock.request()
+        if ping is not None:
+            if sender is not None:
+                sender.push(ping)
+            else:
+                try:
+                    write(ping)
+                except OSError:
+                    pass
+        profiler.mark("send")
+        # The round trip and how far behind things are, states that arrived since the last frame, other lines
+        # waiting in msg_queue and inputs the sender has not written yet
+        profiler.value("rtt ms", round(sender.rtt * 1000, 1) if sender is not None and sender.rtt is not None else None)
+        profiler.value("clock rtt ms", round(matchClock.rtt * 1000, 1) if matchClock.rtt is not None else None)
+        profiler.value("states", arrived)
+        profiler.value("msgs", msg_queue.qsize())
+        if sender is not None:
+            profiler.value("unsent", len(sender.inputs))
+        if sender is not None and sender.failed:
             # If the client loses connection to the server, exit the game loop to prevent hanging
             print("Lost connection!")
-            pygame.quit()
+            stateSender = None
             client.close()
-            return
+            report_frames()
+            return False
         
         clock.tick(60)
-        sync += 1
+        profiler.mark("wait")
 
-        
-# Regular expression pattern to parse incoming game state messages
-# Parses name, paddle position, ball x/y, left/right score, and sync time
-MSG_PATTERN = re.compile(
-    r'PN:(?P<name>\w+):PP:(?P<pos>-?\d+):BX:(?P<bx>-?\d+):BY:(?P<by>-?\d+):LS:(?P<lscore>\d+):RS:(?P<rscore>\d+):TM:(?P<time>\d+)')
+
+
+# Author:  Created by Jacob Blankenship
+# Purpose:  Prints where the last frames' time went, and writes the timeline when --trace was given
+# Pre:  Called when a match ends or the window is closed
+# Post:  tracePath holds every frame profiled so far, across all matches
+def report_frames() -> None:
+    summary = frameProfiler.summary()
+    phases = ", ".join(f"{phase} {average:.2f}" for phase, (average, worst) in summary["phases"].items())
+    print(f"[CLIENT] Frames: {summary['fps']:.1f} fps, worst {summary['worstMs']:.1f} ms, {summary['hitches']} hitches, "
+          f"average ms per phase: {phases}")
+    if parseFailures:
+        print(f"[CLIENT] Skipped {parseFailures} malformed lines from the server")
+    if tracePath is not None:
+        events = frameProfiler.export(tracePath)
+        print(f"[CLIENT] Wrote {events} trace events to {tracePath}")
 
 # Parses the game state message received from the server
 
 # Author:  Created by Jacob Blankenship
 # Purpose:  Parses the Pong game state message received from the server.
 # Pre:  Expects a string message formatted according to the MSG_PATTERN regex, and that this
-#       is called during the PlayGame function, as well as a valid an set up queue to hold
-#       incoming messages from the server.
-# Post:  Returns a dictionary with the parsed game state values if successful,
+#       is called on a receive thread by route_message(), so playGame() never runs the regex.
+# Post:  Returns a GameState with the parsed game state values if successful,
 #      otherwise returns None if the message could not be parsed.
-def parse_game_state(message: str) -> Union[dict, None]:
+def parse_game_state(message: str) -> Union[GameState, None]:
 
-    # Use regex to parse the message
-    match = MSG_PATTERN.match(message)
+    # Use regex (MSG_PATTERN in wireProtocol.py) to parse the message into a GameState
+    data = parse_text(message)
 
-    # If the message matches the pattern, throw vars into a dict and convert numeric values to int
-    if match:
-        data = match.groupdict()
-        for key in ['pos', 'bx', 'by', 'lscore', 'rscore', 'time']:
-            data[key] = int(data[key])
+    # If the message matches the pattern, the numeric values are already converted to int
+    if data:
         return data
-    # If the message does not match, return None (handled in the playgame function)
+    # If the message does not match, return None (handled in the route_message function)
     else:
         print(f"[WARNING] Could not parse message: {message}")
         return None
 
+# Author:  Jacob Blankenship
+# Purpose:  Counts and warns about a line from the server that route_message() or receive_messages() could not parse
+# Pre:  message is the stripped text line
+# Post:  parseFailures is one higher, the caller skips the line and keeps receiving
+def skip_line(message:str) -> None:
+    global parseFailures
+    parseFailures += 1
+    print(f"[WARNING] Could not parse message: {message}")
+
+# Author:  Created by Jacob Blankenship
+# Purpose:  Sends one message from either receive thread to where it is read: game states, acks and
+#       scores to stateMailbox for playGame(), everything else to msg_queue.
+# Pre:  message is a GameState or one stripped text line, already decoded to a string
+# Post:  Text game states are parsed here on the network thread, unparsable ones and malformed AK, SCORE
+#        lines are dropped with a warning, so a bad line never ends the receive thread
+def route_message(message) -> None:
+    if not isinstance(message, GameState) and message.startswith("PN:"):
+        message = parse_game_state(message)
+        if message is None:
+            return
+    sender = stateSender
+    if isinstance(message, GameState):
+        stateMailbox.publish(message)
+        # The server only sends deltas against a snapshot we acked, so the acks go out with the sender's next
+        # write whatever it is sending, a server running the physics only gets inputs from us
+        if wireProto == PROTO_SYNC and sender is not None:
+            acks = syncSession.take_acks()
+            if acks:
+                sender.push(acks)
+        # The server sends our own states back to us too, which gives the sender its round trip
+        if sender is not None and message.name == sender.side:
+            sender.echoed(message.time, state=True)
+    elif message.startswith("AK:"):
+        try:
+            seq = int(message[3:] or 0)
+        except ValueError:
+            skip_line(message)
+            return
+        stateMailbox.publish_ack(seq)
+        if sender is not None:
+            sender.echoed(seq)
+    elif message.startswith("CLK:"):
+        matchClock.answer(message)
+    elif message.startswith("SCORE:"):
+        try:
+            lScore, rScore = (int(n) for n in message[6:].split(":"))
+        except ValueError:
+            skip_line(message)
+            return
+        stateMailbox.publish_score(lScore, rScore)
+    elif message == "END":
+        stateMailbox.publish_end()
+    else:
+        if message.startswith("START:"):
+            # Cleared here on the receive thread, so no state of the new match can land before it, and the
+            # server's clock for the new match starts about now
+            global startArrived
+            startArrived = time.perf_counter()
+            stateMailbox.clear()
+            matchClock.reset()
+        msg_queue.put(message)
+
 # Thread function to continuously receive messages from the server
 
 # Author:  Created by Jacob Blankenship
-# Purpose:  Continuously receives messages from the server and adds them to a queue, threaded
+# Purpose:  Continuously receives messages from the server and hands them to route_message(), threaded
 #       to allow the main game loop to run while receiving messages in the background.
 # Pre:  Expects a valid socket connection to the server, and a properly set up queue to hold
-#       incoming messages. As well as be called during the PlayGame() function.
-# Post:  Returns nothing, but continuously adds received messages to the provided queue until
-#       the connection is lost or an error occurs. Queue items are split to be individual messages
-#       based on newline characters so that each item is an individual game-state.
+#       incoming non game state messages. As well as be called during the PlayGame() function.
+# Post:  Returns nothing, but continuously routes received messages until the connection is lost or
+#       an error occurs. Messages are split to be individual messages based on newline characters
+#       so that each one is an individual game-state.
 def receive_messages(sock) -> None:
-    # Creates a buffer to hold incomplete messages
-    buffer = ""
+    global wireProto
+    # The decoder holds incomplete messages and splits out text lines and binary frames
+    decoder = FrameDecoder(syncSession)
     while True:
         try:
             # Large amount of bytes to ensure full messages are received
@@ -292,20 +501,48 @@ def receive_messages(sock) -> None:
             if not chunk:
                 print("[CLIENT] Server disconnected.")
                 break
-            # decode and add to buffer
-            decoded = chunk.decode('utf-8')
-            buffer += decoded
-            
-            # Split by newline to process each send gamestate
-            while '\n' in buffer:
-                message, buffer = buffer.split('\n', 1)  
-                # Only process non-empty messages
-                if message.strip():
-                    msg_queue.put(message.strip())
+
+            # Binary and sync frames come out as GameStates, text lines as stripped non-empty bytes
+            for message in decoder.feed(chunk):
+                if isinstance(message, GameState):
+                    route_message(message)
+                    continue
+                message = message.decode('utf-8')
+                # The server agreed to a format, from now on our own frames can go out in it too
+                if message.startswith("PROTO:") and message[6:] in PROTO_PREFERENCES:
+                    wireProto = message[6:]
+                    continue
+                # The server agreed to UDP and gave us the token to put on our datagrams
+                if message.startswith("UDP:") and udpLink is not None and not udpLink.ready:
+                    try:
+                        token = int(message[4:])
+                    except ValueError:
+                        skip_line(message)
+                        continue
+                    udpLink.start(token)
+                    threading.Thread(target=receive_datagrams, args=(udpLink,), daemon=True).start()
+                    continue
+                route_message(message)
         # Break if error
         except Exception as e:
             print("Receive error:", e)
             break
+    # Wakes joinServer() if it is waiting in the lobby for a START that will never come
+    msg_queue.put("")
+
+# Author:  Created by Jacob Blankenship
+# Purpose:  Same as receive_messages(), for the game states that come in over the UDP channel
+# Pre:  link has been started with the token the server sent over TCP
+# Post:  Routes every message from datagrams newer than the last one, late datagrams were
+#       already thrown away by link.receive(). Returns once the UDP socket is closed
+def receive_datagrams(link:UdpClient) -> None:
+    decoder = FrameDecoder()
+    while True:
+        payload = link.receive()
+        if payload is None:
+            break
+        for message in decoder.feed(payload):
+            route_message(message if isinstance(message, GameState) else message.decode('utf-8'))
 
 # Author:  Initially created my instructer, heavily modified by Jacob Blankenship
 # Purpose:  Connects to the Pong server using the provided IP and port, initially 
@@ -313,8 +550,15 @@ def receive_messages(sock) -> None:
 # Pre:  Expects valid IP address and port strings, as well as a tkinter label and app,
 #       IP and port are provided by the user via the tkinter GUI in the startScreen() function.
 # Post: Returns nothing, but starts the Pong game client after connecting to the server,
-#       can also error out before closing the game.
-def joinServer(ip:str, port:str, errorLabel:tk.Label, app:tk.Tk) -> None:
+#       can also error out before closing the game. With useUdp the game states go over UDP when the
+#       server agrees to it, and over TCP like before when it does not. With a watchRoom the client asks
+#       an async server to watch that room as a spectator instead of playing. sendRate is the most states
+#       a second the client sends, empty for SEND_RATE.
+#       errorLabel and app are None when started from the command line, messages are printed instead.
+#       The window opens as soon as we are connected and shows that we are waiting, so it is ready when
+#       START comes. bot plays for us, and maxMatches stops after that many matches (0 for no limit).
+def joinServer(ip:str, port:str, errorLabel:"Union[tk.Label, None]", app:"Union[tk.Tk, None]", useUdp:bool = False, watchRoom:str = "",
+               sendRate:str = "", bot = None, maxMatches:int = 0) -> None:
 
     # Purpose:      This method is fired when the join button is clicked
     # Arguments:
@@ -322,60 +566,107 @@ def joinServer(ip:str, port:str, errorLabel:tk.Label, app:tk.Tk) -> None:
     # port          A string holding the port the server is using
     # errorLabel    A tk label widget, modify it's text to display messages to the user (example below)
     # app           The tk window object, needed to kill the window
+
+    def show_status(text:str) -> None:
+        if errorLabel is None:
+            print(text)
+        else:
+            errorLabel.config(text=text)
+            errorLabel.update()
     
     print("Connecting to server at", ip, "on port", port)
+    # Does nothing if the start screen already started it
+    if preloadAssets:
+        clientAssets.preload()
     try:
         # Create and connect the socket of new client
         client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client.connect((ip, int(port)))  
+        # Every write is one small frame (or a few batched by the sender) that should go out right away
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Ask for the compact formats, a server that does not know one ignores it and we stay on the last agreed one.
+        # Over UDP every datagram has to make sense on its own, so full binary states are used instead of deltas
+        global udpLink
+        if useUdp:
+            udpLink = UdpClient(ip, int(port))
+            requests = (PROTO_BINARY, PROTO_UDP)
+        else:
+            requests = PROTO_PREFERENCES
+        for proto in requests:
+            client.sendall(f"PROTO:{proto}\n".encode('utf-8'))
+        if watchRoom.strip():
+            client.sendall(f"WATCH:{int(watchRoom)}\n".encode('utf-8'))
 
         # Receive message from server continuously
         global msg_queue
         msg_queue = queue.Queue()
 
-        # Create a thread for each client to receive messages and add them to the queue
+        # Create a thread for each client to receive messages and add them to the mailbox or queue
         # deamon thread to make sure the thread closes when the main program exits
         receiver_thread = threading.Thread(target=receive_messages, args=(client,), daemon=True)
         receiver_thread.start()
 
-        errorLabel.config(text=f"Connected successfully to {ip}:{port}")
-        errorLabel.update()
-
-        print("Waiting for other player to connect...")
-        startMsg = msg_queue.get().strip()
-
-        # Initial message from server should be START:<paddleSide> to assign user to paddle side
-        # Cant be in regular loop as we need paddle side before starting game
-        if "START" in startMsg:
-            global paddleSide
-            paddleSide = startMsg.split(":")[1]
-            print("Starting game, Opponent Connected!")
-        else:
-            print(f"Unexpected message from server: {startMsg}")
-            print(f"Closing game, something went wrong.")
-            return
-        
-        # Close the tkinter window and start the game
-        app.withdraw()
-        print(f"Starting game as {paddleSide} paddle.")
-        if paddleSide == "left" or paddleSide == "right":
-            playGame(640, 480, paddleSide, client, msg_queue)
-        else:
-            #There was a problem with the name of paddleSide sent and extracted
-            print(f"Unexpect Paddle side, disconnecting.")
-            return
+        show_status(f"Connected successfully to {ip}:{port}")
+        # Close the tkinter window, the game window takes its place while we wait
+        if app is not None:
+            app.withdraw()
+        if preloadAssets:
+            clientAssets.open_window()
+
+        # The server keeps us in its lobby between matches, so after each match we ask for the next one
+        # and wait for another START, until the window is closed or the connection is lost
+        matches = 0
+        while True:
+            print("Waiting for other player to connect...")
+            clientAssets.show_message("Waiting for an opponent...")
+            # Short waits, so the window can still be moved or closed while we are in the lobby
+            startMsg = None
+            while startMsg is None:
+                try:
+                    startMsg = msg_queue.get(timeout=0.05).strip()
+                except queue.Empty:
+                    clientAssets.pump()
+
+            # Initial message from server should be START:<paddleSide> to assign user to paddle side
+            # Cant be in regular loop as we need paddle side before starting game
+            if "START" in startMsg:
+                global paddleSide
+                paddleSide = startMsg.split(":")[1]
+                # START:<side>:AUTH means the server runs the physics for this match
+                serverAuthoritative = startMsg.split(":")[2:] == ["AUTH"]
+                print("Starting game, Opponent Connected!")
+            elif not startMsg:
+                print("Server closed the connection.")
+                break
+            else:
+                print(f"Unexpected message from server: {startMsg}")
+                print(f"Closing game, something went wrong.")
+                return
+
+            # Start the game
+            print(f"Starting game as {paddleSide} paddle.")
+            if paddleSide == "left" or paddleSide == "right" or paddleSide == SPECTATOR_SIDE:
+                matchOver = playGame(640, 480, paddleSide, client, stateMailbox, serverAuthoritative,
+                                     float(sendRate) if sendRate.strip() else SEND_RATE,
+                                     bot(paddleSide) if bot is not None and paddleSide != SPECTATOR_SIDE else None)
+            else:
+                #There was a problem with the name of paddleSide sent and extracted
+                print(f"Unexpect Paddle side, disconnecting.")
+                return
+            matches += 1
+            # Spectators only ever watch the one match
+            if not matchOver or paddleSide == SPECTATOR_SIDE or matches == maxMatches:
+                break
+            client.sendall(b"REQUEUE\n")
+        if udpLink is not None:
+            udpLink.close()
+        client.close()
+        clientAssets.close()
         print("Game Ended, closing client.")
-        app.quit()
+        if app is not None:
+            app.quit()
     except Exception as e:
-        errorLabel.config(text=f"Connection failed: {e}")
-        errorLabel.update()
-
-    # Get the required information from your server (screen width, height & player paddle, "left or "right)
-    
-    # If you have messages you'd like to show the user use the errorLabel widget like so
-    errorLabel.config(text=f"Some update text. You input: IP: {ip}, Port: {port}")
-    # You may or may not need to call this, depending on how many times you update the label
-    errorLabel.update()     
+        show_status(f"Connection failed: {e}")
 
 # This displays the opening screen, you don't need to edit this (but may if you like)
 
@@ -389,6 +680,7 @@ def joinServer(ip:str, port:str, errorLabel:tk.Label, app:tk.Tk) -> None:
 #       connection status messages to the user.
 def startScreen() -> None: 
     print("Starting Pong Client...")
+    import tkinter as tk
     app = tk.Tk()
     app.title("Server Info")
 
@@ -409,13 +701,74 @@ def startScreen() -> None:
     portEntry = tk.Entry(app)
     portEntry.grid(column=1, row=2)
 
+    udpVar = tk.BooleanVar(value=False)
+    udpCheck = tk.Checkbutton(text="Send game state over UDP", variable=udpVar)
+    udpCheck.grid(column=0, row=3, columnspan=2)
+
+    watchLabel = tk.Label(text="Watch Room:")
+    watchLabel.grid(column=0, row=4, sticky="W", padx=8)
+
+    watchEntry = tk.Entry(app)
+    watchEntry.grid(column=1, row=4)
+
+    rateLabel = tk.Label(text="Sends per second:")
+    rateLabel.grid(column=0, row=5, sticky="W", padx=8)
+
+    rateEntry = tk.Entry(app)
+    rateEntry.insert(0, str(SEND_RATE))
+    rateEntry.grid(column=1, row=5)
+
     errorLabel = tk.Label(text="")
-    errorLabel.grid(column=0, row=4, columnspan=2)
+    errorLabel.grid(column=0, row=7, columnspan=2)
 
-    joinButton = tk.Button(text="Join", command=lambda: joinServer(ipEntry.get(), portEntry.get(), errorLabel, app))
-    joinButton.grid(column=0, row=3, columnspan=2)
+    joinButton = tk.Button(text="Join", command=lambda: joinServer(ipEntry.get(), portEntry.get(), errorLabel, app, udpVar.get(), watchEntry.get(),
+                                                                   rateEntry.get()))
+    joinButton.grid(column=0, row=6, columnspan=2)
 
     app.mainloop()
 
+# Author:  Jacob Blankenship
+# Purpose:  Reads the command line, the start screen is skipped when --ip is given
+# Pre:  None
+# Post:  Returns the parsed arguments
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pong client")
+    parser.add_argument("--ip", help="server to join right away, without the start screen")
+    parser.add_argument("--port", default="50007")
+    parser.add_argument("--udp", action="store_true", help="send game states over UDP")
+    parser.add_argument("--watch", default="", help="match or room number to watch as a spectator")
+    parser.add_argument("--rate", default="", help="most game states sent a second")
+    parser.add_argument("--headless", action="store_true", help="no window and no sound, for scripts and benchmarks")
+    parser.add_argument("--bot", action="store_true", help="a bot moves our paddle instead of the keyboard")
+    parser.add_argument("--matches", type=int, default=0, help="quit after this many matches")
+    parser.add_argument("--no-preload", action="store_true", help="load the fonts, sounds and window only when START arrives")
+    parser.add_argument("--profile", action="store_true", help="show the frame profiler overlay from the start (F3 toggles it)")
+    parser.add_argument("--trace", help="write every frame's phases to this file, for chrome://tracing or ui.perfetto.dev")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    startScreen()
+    args = parse_args()
+    if args.headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    if args.no_preload:
+        preloadAssets = False
+    else:
+        # Everything playGame() needs loads in the background while the player types into the start screen
+        clientAssets.preload()
+    if args.trace:
+        frameProfiler = FrameProfiler(trace=True)
+        tracePath = args.trace
+    frameProfiler.showing = args.profile
+    if args.ip:
+        bot = None
+        if args.bot:
+            # gameSim imports pygame, so the bot is only made once the match starts, like playGame() does
+            def chase_bot(side:str):
+                from assets.code.gameSim import ChaseBot
+                return ChaseBot(side)
+            bot = chase_bot
+        joinServer(args.ip, args.port, None, None, args.udp, args.watch, args.rate, bot, args.matches)
+    else:
+        startScreen()
@@ -0,0 +1,162 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Spectator relay node, watches one match on a Pong server like any other
+#                           spectator and passes its feed on to as many viewers as connect to it
+# Misc:                     Run with "python pongRelay.py". The upstream can be either server mode or
+#                           another relay, so relays can be chained to reach a bigger audience without
+#                           the game server ever seeing more than one spectator per relay. Viewers
+#                           connect exactly as they would to a server and are always spectators.
+# =================================================================================================
+
+import asyncio
+from typing import Optional
+
+from pongAsyncServer import Connection
+from assets.code.serverLog import get_logger, setup_logging, stop_logging
+from assets.code.spectate import SPECTATOR_KEY, SPECTATOR_RATE, SPECTATOR_SIDE, SpectatorFeed
+from assets.code.wireProtocol import PROTO_BINARY, PROTO_REQUESTS, PROTO_TEXT, FRAME_LINE, FrameReader, decode_frame
+
+log = get_logger()
+
+# Author:  Daniel Krutsick
+# Purpose:  One upstream spectator connection fanned out to every downstream viewer
+# Pre:  The upstream server is running, roomId is the room or match number to watch (0 for another
+#       relay, which only has the one match)
+# Post:  serve() runs until the upstream match ends or close() is called, then every viewer is closed
+class PongRelay:
+    def __init__(self, upstreamHost:str, upstreamPort:int, roomId:int, host:str, port:int,
+                 spectatorRate:float = SPECTATOR_RATE) -> None:
+        self.upstreamHost = upstreamHost
+        self.upstreamPort = upstreamPort
+        self.roomId = roomId
+        self.host = host
+        self.port = port
+        self.feed = SpectatorFeed(spectatorRate)
+        self.viewers = set()
+        self.startLine: Optional[bytes] = None # START as the upstream sent it, passed on to every viewer
+        self.framesIn = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.closed: Optional[asyncio.Event] = None
+
+    # START, then the newest states right away so the viewer can draw before the next packet is due
+    def start_viewer(self, conn:Connection) -> None:
+        conn.send(self.startLine)
+        if self.feed.has_state():
+            conn.send(self.feed.encode(conn.proto), SPECTATOR_KEY)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Reads the upstream spectator feed and stores it, sending a packet to the viewers when one is due
+    # Pre:  serve() is running
+    # Post:  Returns once the upstream closes the connection, which means the match is over
+    async def upstream_loop(self) -> None:
+        reader, writer = await asyncio.open_connection(self.upstreamHost, self.upstreamPort)
+        # Binary states are the cheapest to relay, and most viewers will have asked for them too
+        writer.write(f"PROTO:{PROTO_BINARY}\n".encode('utf-8'))
+        if self.roomId:
+            writer.write(f"WATCH:{self.roomId}\n".encode('utf-8'))
+        frames = FrameReader()
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                frames.feed(chunk)
+                for kind, frame in frames.frames():
+                    if kind in (PROTO_TEXT, PROTO_BINARY):
+                        frame = bytes(frame)
+                        state = decode_frame(kind, frame)
+                        self.feed.offer(kind, frame, state.name, state)
+                        self.framesIn += 1
+                    elif kind == FRAME_LINE and frame.startswith(b"START:"):
+                        # Viewers are spectators whatever the upstream calls this connection
+                        parts = frame.decode('utf-8').split(":")
+                        self.startLine = ":".join(["START", SPECTATOR_SIDE] + parts[2:]).encode('utf-8') + b"\n"
+                        for conn in self.viewers:
+                            self.start_viewer(conn)
+                    elif kind == FRAME_LINE and frame.startswith(b"SCORE:"):
+                        for conn in self.viewers:
+                            conn.send(frame + b"\n")
+                if self.viewers and self.feed.due():
+                    for conn in self.viewers:
+                        conn.send(self.feed.encode(conn.proto), SPECTATOR_KEY)
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+            log.info("[UPSTREAM CLOSED] %s:%s ended the feed", self.upstreamHost, self.upstreamPort)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  One downstream viewer, only PROTO requests are answered, anything else it sends is ignored
+    # Pre:  Called by asyncio.start_server() with the streams of a freshly accepted socket
+    # Post:  The viewer is removed and its socket is closed
+    async def handle_viewer(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        conn = Connection(reader, writer)
+        conn.side = SPECTATOR_SIDE
+        self.viewers.add(conn)
+        writeTask = asyncio.create_task(conn.write_loop())
+        if self.startLine is not None:
+            self.start_viewer(conn)
+        frames = FrameReader()
+        try:
+            while True:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    break
+                frames.feed(chunk)
+                for kind, frame in frames.frames():
+                    if kind == FRAME_LINE and frame in PROTO_REQUESTS:
+                        conn.send(frame + b"\n")
+                        conn.proto = PROTO_REQUESTS[frame]
+        except ConnectionResetError:
+            pass
+        finally:
+            writeTask.cancel()
+            self.viewers.discard(conn)
+            conn.close()
+
+    async def serve(self, ready:Optional[asyncio.Event] = None) -> None:
+        self.closed = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle_viewer, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info("[LISTENING] Relay for %s:%s listening on %s:%s", self.upstreamHost, self.upstreamPort, self.host, self.port)
+        upstream = asyncio.create_task(self.upstream_loop())
+        upstream.add_done_callback(lambda _: self.close())
+        if ready is not None:
+            ready.set()
+        async with self.server:
+            await self.closed.wait()
+        upstream.cancel()
+        log.info("[RELAY STATS] viewers %s, frames in %s, %s", len(self.viewers), self.framesIn, self.feed.stats())
+        for conn in list(self.viewers):
+            conn.close()
+        log.info("[RELAY CLOSED]")
+
+    def close(self) -> None:
+        if self.closed is not None:
+            self.closed.set()
+
+# Author:  Daniel Krutsick
+# Purpose:  Blocking entry point for a relay node, mirrors run_async_server() in pongAsyncServer.py
+# Pre:  The upstream server is running and the listening port is free
+# Post:  Returns 0 once the upstream match ends or the relay is closed with ctrl+c
+def run_relay(upstreamHost:str, upstreamPort:int, roomId:int, host:str, port:int,
+              spectatorRate:float = SPECTATOR_RATE) -> int:
+    relay = PongRelay(upstreamHost, upstreamPort, roomId, host, port, spectatorRate)
+    try:
+        asyncio.run(relay.serve())
+    except KeyboardInterrupt:
+        log.warning("[ClOSING RELAY]: KEYBOARD INTERRUPT EXCEPTION")
+    return 0
+
+if __name__ == "__main__":
+    UPSTREAM_HOST = input("Enter the game server IP address: ")
+    UPSTREAM_PORT = int(input("Enter the game server port number: ") or 50007)
+    ROOM = int(input("Enter the room or match number to watch (default none, when watching another relay): ") or 0)
+    HOST = input("Enter relay IP address (default 0.0.0.0): ") or "0.0.0.0"
+    PORT = int(input("Enter relay port number: ") or 50008)
+    RATE = float(input(f"Spectator updates per second (default {SPECTATOR_RATE}): ") or SPECTATOR_RATE)
+    setup_logging()
+    run_relay(UPSTREAM_HOST, UPSTREAM_PORT, ROOM, HOST, PORT, RATE)
+    stop_logging()
@@ -0,0 +1,111 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Plays back a match recorded by either server mode (see replay.py) in the
+#                           same window and renderer as the client
+# Misc:                     Run with "python pongReplay.py <file>", or without a file to be asked for one.
+#                           Space pauses, left/right jump 5 seconds, up/down double or halve the speed,
+#                           0-9 jump to that tenth of the match, Home restarts and Escape quits.
+#                           Seeking only decodes the one block of the file that holds the new tick.
+# =================================================================================================
+
+import sys
+
+import pygame
+
+from assets.code.gameSim import PongSim
+from assets.code.renderer import PongRenderer
+from assets.code.replay import ReplayReader
+
+SEEK_TICKS = 60 * 5 # Ticks jumped by the left and right keys, 5 seconds at 60 Hz
+MAX_SPEED = 32
+
+# Author:  Jacob Blankenship
+# Purpose:  Draws a recorded match at 60 ticks a second times the chosen speed, with seeking
+# Pre:  path is a replay file and the fonts in ./assets can be found from the working directory
+# Post:  Returns once the window is closed or Escape is pressed
+def playReplay(path:str, screenWidth:int = 640, screenHeight:int = 480) -> None:
+    reader = ReplayReader(path)
+    if not len(reader):
+        print(f"{path} has no recorded states")
+        reader.close()
+        return
+
+    pygame.init()
+    WHITE = (255,255,255)
+    clock = pygame.time.Clock()
+    scoreFont = pygame.font.Font("./assets/fonts/pong-score.ttf", 32)
+
+    # The sim is only used for its walls, paddles and ball, nothing is stepped
+    sim = PongSim(screenWidth, screenHeight)
+    screen = pygame.display.set_mode((screenWidth, screenHeight))
+    renderer = PongRenderer(screen, [sim.topWall, sim.bottomWall], scoreFont, WHITE)
+    leftPaddle = sim.leftPaddle
+    rightPaddle = sim.rightPaddle
+    ball = sim.ball
+
+    firstTick = reader.first_tick()
+    lastTick = reader.last_tick()
+    tick = float(firstTick)
+    speed = 1.0
+    paused = False
+    lScore = 0
+    rScore = 0
+    shown = None
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                reader.close()
+                return
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    tick += SEEK_TICKS
+                elif event.key == pygame.K_LEFT:
+                    tick -= SEEK_TICKS
+                elif event.key == pygame.K_UP:
+                    speed = min(speed * 2, MAX_SPEED)
+                elif event.key == pygame.K_DOWN:
+                    speed = max(speed / 2, 1 / 4)
+                elif event.key == pygame.K_HOME:
+                    tick = firstTick
+                elif pygame.K_0 <= event.key <= pygame.K_9:
+                    tick = firstTick + (lastTick - firstTick) * (event.key - pygame.K_0) / 10
+
+        if not paused:
+            tick += speed
+        tick = min(max(tick, firstTick), lastTick)
+
+        left, right = reader.states_at(int(tick))
+        if left:
+            leftPaddle.rect.y = left.pos
+        if right:
+            rightPaddle.rect.y = right.pos
+        # Like playGame(), whichever player's state is newer has the ball and score
+        newest = max((state for state in (left, right) if state), key=lambda state: state.time, default=None)
+        if newest:
+            ball.rect.x = newest.bx
+            ball.rect.y = newest.by
+            lScore = newest.lscore
+            rScore = newest.rscore
+
+        renderer.draw([ball.rect, leftPaddle.rect, rightPaddle.rect], lScore, rScore)
+
+        # The caption is the only status shown, so the match itself is drawn exactly like the client draws it
+        status = (int(tick), speed, paused)
+        if status != shown:
+            shown = status
+            state = "paused" if paused else f"x{speed:g}"
+            pygame.display.set_caption(f"Pong replay  tick {int(tick) - firstTick}/{lastTick - firstTick}  {state}")
+
+        clock.tick(60)
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else input("Enter the replay file to play: ")
+    playReplay(path)
@@ -6,6 +6,14 @@
 # Misc:                     To run the pongServer.py file directly run "python pongServer.py",
 #                           ensure the port you choose is open and not blocked by firewall and
 #                           that the server is running before any clients attempt to connect.
+#                           The server keeps running until ctrl+c. Every client waits in the lobby
+#                           (lobby.py) until there is another one to play, and a player whose match
+#                           is over can send REQUEUE to be put back in it for the next one.
+#                           Counters and latencies can be scraped over HTTP from the metrics port
+#                           (see metrics.py), and output goes through the leveled logger in serverLog.py.
+#                           The "sharded" mode (pongShardServer.py) runs this same code in worker processes.
+#                           Each match has its own clock (clockSync.py) that its players ping with CLK lines,
+#                           so both stamp their states with the same match tick.
 # =================================================================================================
 # TO FREE UP PORT NUMBER ON WINDOWS, USE THE FOLLOWING COMMAND IN CMD:
 # netstat -ano | findstr :<your_port_number>
@@ -13,189 +21,592 @@
 # THEN USE THE COMMAND:
 # taskkill /PID <that_pid> /
 
+import itertools
+import logging
+import os
 import socket
-from time import sleep
+from time import perf_counter, sleep, strftime
 import threading
-import re
 
-REQUIRED_NUM_CLIENTS = 2 #Sets the required number of clients to start the game
-clients = [] #The list of clients to ensure we can remove them properly later, holds a tuple of (conn, paddleSide)
+from assets.code.admission import REJECTED, ConnectionGuard, Limits
+from assets.code.clockSync import CLOCK_PREFIX, MatchClock
+from assets.code.fanout import FanoutWriter
+from assets.code.lobby import Lobby
+from assets.code.metrics import ServerMetrics, TimedLock, start_metrics_endpoint
+from assets.code.replay import REPLAY_EXTENSION, ReplayWriter
+from assets.code.serverLog import get_logger, setup_logging, stop_logging
+from assets.code.spectate import SPECTATOR_KEY, SPECTATOR_RATE, SPECTATOR_SIDE, SpectatorFeed
+from assets.code.stateSync import SyncSession
+from assets.code.udpTransport import MAX_DATAGRAM, UdpRegistry
+from assets.code.wireProtocol import (PROTO_BINARY, PROTO_SYNC, PROTO_TEXT, PROTO_REQUESTS, PROTO_UDP_REQUEST, ENCODERS, FRAME_LINE,
+                                      FrameReader, decode_frame)
+
+LOBBY = (None, "lobby") #The clients entry of a client waiting in the lobby for a match
+UNPLACED = (None, "") #The clients entry of a client in no match that is not waiting either, like a player whose match just ended
+clients = {} #Every connected client, mapped to (match, paddleSide). Entries are only ever replaced whole, so the client
+             #threads read them for every frame without taking clientsLock
+matches = {} #The running matches by match number, a spectator picks one with WATCH:<match number>
+matchIds = itertools.count(1) #Match numbers, only the matchmaker thread takes from it
+lobby = Lobby() #Clients waiting for a match, joining it never takes clientsLock
 running = False #Whether the server is running or not
-clientsLock = threading.Lock()#Helps remove race conditions
-twoClientsConnected = threading.Event()#Prevents server from running without the threading event flag being set
+metrics = ServerMetrics() #Counters and latency histograms, served over HTTP when a metrics port is given
+clientsLock = TimedLock(metrics.lockWait, metrics.lockHold)#Taken when a client joins or leaves a match, never for a frame
+clientProtos = {} #The wire format each client asked for, clients missing from here get the text format
+clientSyncs = {} #The snapshot/delta state of each client that asked for the SYNC1 format
+log = get_logger() #Leveled output, every relayed frame is logged at the debug level
+fanout = FanoutWriter() #Owns every outbound send, so a slow client only ever backs up its own queue
+UDP = False #Whether clients may send and receive their game states over UDP, set at the server prompt
+udpSock = None #The UDP socket on the same port number as the TCP server, only opened when UDP is True
+udpRegistry = UdpRegistry() #Token and sequence number state of each client using UDP
+clientUdp = {} #The UdpPeer of each client that asked for UDP
+spectatorRate = SPECTATOR_RATE #Spectator packets per second in every match, set at the server prompt
+RECORD_DIR = None #Folder every match is recorded to, set at the server prompt, None records nothing
+METRICS_PORT = None #Port the metrics endpoint listens on, set at the server prompt, None serves nothing
+limits = Limits() #What one connection may send and how many may be connected, set at the server prompts
+handoff = None #Set by a pongShardServer.py worker to the function that sends a message to its supervisor, None when
+               #this process accepts its own clients. A worker has no lobby, REQUEUE hands the client back instead
+# Author:  Daniel Krutsick
+# Purpose:  One match, its two players and whoever is watching it
+# Pre:  Created by start_match() with clientsLock held
+# Post:  players and spectators are replaced instead of changed, so relay() can read them without clientsLock
+class Match:
+    def __init__(self, matchId: int, left: socket.socket, right: socket.socket) -> None:
+        self.matchId = matchId
+        self.players = ((left, "left"), (right, "right"))
+        self.spectators = ()
+        self.feed = SpectatorFeed(spectatorRate) #Newest state of each paddle, sent to the spectators at their own slower rate
+        self.recorder = None #The ReplayWriter for the match when RECORD_DIR is set, every relayed state is written to it
+        self.clock = MatchClock() #Started with the match, both players stamp their states with its ticks
+        self.over = False
+
+    # Finishes the match's replay file, if it has one, so it gets its index
+    def stop_recording(self) -> None:
+        recorder = self.recorder
+        if recorder is not None:
+            self.recorder = None
+            recorder.close()
+            log.info("[RECORDING SAVED] Match %s: %s %s", self.matchId, recorder.path, recorder.stats())
 # Author:  Daniel Krutsick
 # Purpose:  Send each transmission from each client to all clients in the server
 # Pre: The pre condition is that the message is already encoded and all clients are connected
-# Post:  The post conditions are that the clients received the transmission sent
+# Post:  The post conditions are that the message is queued for every client, these messages are
+#        never dropped, unlike game states
 def broadcast(message) -> None:
     with clientsLock:
-        for c, _ in clients:
+        peers = list(clients)
+    for c in peers:
+        fanout.send(c, message)
+# Author:  Daniel Krutsick
+# Purpose:  Forward a frame to both players of a match exactly as it was received, players that negotiated
+#           another wire format get it re-encoded, and that is done at most once per frame
+# Pre: The frame was already checked by FrameReader.frames() and kind is the format it arrived in,
+#      sender is the paddle side it came from. Sync frames are decoded by the caller and passed as state
+# Post: The frame is queued for both players, nothing is parsed when they share one format.
+#       SYNC1 clients get a delta against their own last acknowledged snapshot, or nothing if that
+#       state has not changed. Spectators only get the spectator feed, at most spectatorRate times a second.
+#       The frame is also written to the match recording when there is one.
+#       Nothing here takes clientsLock, the match's players are read as they are
+def relay(match: Match, kind: str, frame, sender: str, state = None) -> None:
+    if match.over:
+        return
+    start = perf_counter()
+    # The frame points into the receive buffer, the queues need their own copy
+    if frame is not None:
+        frame = bytes(frame)
+    converted = None # Only made when a player needs another format, most frames go out as they came
+    for c, _ in match.players:
+        proto = clientProtos.get(c, PROTO_TEXT)
+        if proto == kind and kind != PROTO_SYNC:
+            data = frame
+        else:
+            if state is None:
+                state = decode_frame(kind, frame)
+            sync = clientSyncs.get(c)
+            if sync is not None:
+                data = sync.encode(state)
+                if data is None:
+                    continue
+            else:
+                if converted is None:
+                    converted = {}
+                if proto not in converted:
+                    try:
+                        converted[proto] = ENCODERS[proto](state)
+                    except ValueError:
+                        # FrameReader only passes states that fit, this is a state made somewhere else going wrong
+                        log.warning("[DROPPED] %s state that can not be sent as %s: %s", sender, proto, state)
+                        return
+                data = converted[proto]
+        udp = clientUdp.get(c)
+        if udp is not None and udp.addr is not None:
+            # A datagram is never queued, a newer state simply follows it one frame later
             try:
-                c.sendall(message)
-            except:
+                udpSock.sendto(udp.pack(data), udp.addr)
+            except OSError:
                 pass
-# Regex to parse each game message
-MSG_PATTERN = re.compile(
-    r'PN:(?P<name>\w+):PP:(?P<pos>-?\d+):BX:(?P<bx>-?\d+):BY:(?P<by>-?\d+):LS:(?P<lscore>\d+):RS:(?P<rscore>\d+):TM:(?P<time>\d+)'
-)
-#Parses the game state to then be sent to each client in the server for game state updating
-
-# Author:  Created by Jacob Blankenship
-# Purpose:  Parses the Pong game state message received from the client(s).
-# Pre:  Expects a string message formatted according to the MSG_PATTERN regex, and that this
-#       is called during the handleclient() function.
-# Post:  Returns a dictionary with the parsed game state values if successful,
-#      otherwise returns an empty dict if the message could not be parsed.
-def parse_game_state(message: str) -> dict:
-    match = MSG_PATTERN.match(message)
-    if match:
-        data1 = match.groupdict()
-        # Convert numeric values to int
-        for key in ['pos', 'bx', 'by', 'lscore', 'rscore', 'time']:
-            data1[key] = int(data1[key])
-        # Make a separate copy
-        print(f"[DEBUG] Parsed data1: {data1}")
-        return data1
+        else:
+            # Keyed by sender so a queued frame that has not gone out yet is replaced by the newer one
+            fanout.send(c, data, sender)
+    recorder = match.recorder
+    if recorder is not None:
+        recorder.record(kind, frame, state)
+    match.feed.offer(kind, frame, sender, state)
+    if match.spectators and match.feed.due():
+        send_spectators(match)
+    metrics.counters["frames_relayed"] += 1
+    metrics.relayLatency.observe(perf_counter() - start)
+# Author: Daniel Krutsick
+# Purpose: Sends the newest states of both paddles to each spectator of a match, encoded once per wire format
+# Pre: match.feed has just said a packet is due
+# Post: Every spectator has the packet queued, replacing an older packet it has not been sent yet
+def send_spectators(match: Match) -> None:
+    for c in match.spectators:
+        data = match.feed.encode(clientProtos.get(c, PROTO_TEXT))
+        udp = clientUdp.get(c)
+        if udp is not None and udp.addr is not None:
+            try:
+                udpSock.sendto(udp.pack(data), udp.addr)
+            except OSError:
+                pass
+        else:
+            fanout.send(c, data, SPECTATOR_KEY)
+# Author: Daniel Krutsick
+# Purpose: Answers a client's clock ping with its match's clock, the same way its game states go out
+# Pre: frame is a CLK:<client time> line from conn
+# Post: The answer is queued (or sent over UDP), a client in no match or a malformed ping gets nothing.
+#       Keyed so a client that is behind only ever has the newest answer waiting
+def answer_clock(conn: socket.socket, frame) -> None:
+    match = clients.get(conn, UNPLACED)[0]
+    reply = match.clock.answer(frame) if match is not None else None
+    if reply is None:
+        return
+    udp = clientUdp.get(conn)
+    if udp is not None and udp.addr is not None:
+        try:
+            udpSock.sendto(udp.pack(reply), udp.addr)
+        except OSError:
+            pass
     else:
-        print(f"[WARNING] Could not parse message: {message}")
-        return {}
+        fanout.send(conn, reply, "clock")
+# Author: Daniel Krutsick
+# Purpose: Tells a spectator the match has started, and sends the newest states so it can draw straight away
+# Pre: conn has been added to fanout
+# Post: START:spectator and the snapshot are queued for conn
+def start_spectator(match: Match, conn: socket.socket) -> None:
+    fanout.send(conn, f"START:{SPECTATOR_SIDE}\n".encode('utf-8'))
+    if match.feed.has_state():
+        fanout.send(conn, match.feed.encode(clientProtos.get(conn, PROTO_TEXT)), SPECTATOR_KEY)
+# Author: Daniel Krutsick
+# Purpose: Starts a match between two clients the lobby paired, and sends each of them START:<side>
+# Pre: Called by the matchmaker thread
+# Post: Both clients are in the new match. If one of them left or started watching since the lobby paired
+#       them, no match is started and the other one goes back in the lobby
+def start_match(left: socket.socket, right: socket.socket) -> None:
+    with clientsLock:
+        if clients.get(left) is not LOBBY or clients.get(right) is not LOBBY:
+            for c in (left, right):
+                if clients.get(c) is LOBBY:
+                    lobby.join(c, False)
+            return
+        open_match(next(matchIds), left, right)
+# Author: Daniel Krutsick
+# Purpose: Creates a match, its recording, and sends both players START:<side>
+# Pre: clientsLock is held, matchId is not used by any other match (a pongShardServer.py worker is given its
+#      match numbers by the supervisor, so they are unique across every worker)
+# Post: Returns the new match, both players are in it
+def open_match(matchId: int, left: socket.socket, right: socket.socket) -> Match:
+    match = Match(matchId, left, right)
+    if RECORD_DIR:
+        #Named after the match and when it started so no match ever overwrites another
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        match.recorder = ReplayWriter(os.path.join(RECORD_DIR, f"match{match.matchId}-{strftime('%Y%m%d-%H%M%S')}{REPLAY_EXTENSION}"))
+    matches[match.matchId] = match
+    for c, paddle_side in match.players:
+        clients[c] = (match, paddle_side)
+        fanout.send(c, f"START:{paddle_side}\n".encode('utf-8'))
+    metrics.inc("matches_started")
+    log.info("[MATCH STARTED] Match %s started. Matches running: %s", match.matchId, len(matches))
+    return match
+# Author: Daniel Krutsick
+# Purpose: Wraps up a match leave_match() ended
+# Pre: clientsLock is not held
+# Post: The recording is finished, and a worker's supervisor is told the match number is free
+def finish_match(match: Match) -> None:
+    match.stop_recording()
+    if handoff is not None:
+        handoff(("over", match.matchId))
+# Author: Daniel Krutsick
+# Purpose: Takes a client out of whatever match it is in
+# Pre: clientsLock is held
+# Post: conn is UNPLACED. A match that loses a player is over, the other player is sent END and stays
+#       UNPLACED until it sends REQUEUE, and the spectators are disconnected. Returns that match so its
+#       recording can be finished once the lock is let go, otherwise None
+def leave_match(conn: socket.socket):
+    match, side = clients.get(conn, UNPLACED)
+    if conn in clients:
+        clients[conn] = UNPLACED
+    if match is None:
+        return None
+    if side == SPECTATOR_SIDE:
+        match.spectators = tuple(c for c in match.spectators if c is not conn)
+        return None
+    match.over = True
+    matches.pop(match.matchId, None)
+    for c, _ in match.players:
+        if c is not conn and clients.get(c, UNPLACED)[0] is match:
+            clients[c] = UNPLACED
+            fanout.send(c, b"END\n")
+    for c in match.spectators:
+        if c in clients:
+            clients[c] = UNPLACED
+        #Their own client thread sees the connection close and cleans up after them
+        try:
+            c.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    match.spectators = ()
+    log.info("[MATCH OVER] Match %s is over. Matches running: %s", match.matchId, len(matches))
+    return match
+# Author: Daniel Krutsick
+# Purpose: Puts a client back in the lobby, ending its match first if it was playing one
+# Pre: conn sent REQUEUE
+# Post: conn is waiting in the lobby, a client that already was is left alone
+def requeue(conn: socket.socket) -> None:
+    with clientsLock:
+        if clients.get(conn, LOBBY) is LOBBY:
+            return
+        ended = leave_match(conn)
+        clients[conn] = LOBBY
+    lobby.join(conn, False)
+    if ended is not None:
+        finish_match(ended)
+# Author: Daniel Krutsick
+# Purpose: Makes a client a spectator of a running match, taking it out of the lobby or its own match
+# Pre: conn sent WATCH:<matchId>
+# Post: conn has START:spectator and the newest states queued, nothing changes if there is no such match
+def watch(conn: socket.socket, addr, matchId: int) -> None:
+    ended = None
+    with clientsLock:
+        match = matches.get(matchId)
+        if match is not None and conn in clients:
+            ended = leave_match(conn)
+            # A player asking to watch its own match has just ended it
+            if not match.over:
+                match.spectators = match.spectators + (conn,)
+                clients[conn] = (match, SPECTATOR_SIDE)
+                start_spectator(match, conn)
+                log.info("[NEW SPECTATOR] %s is watching match %s", addr, matchId)
+    if ended is not None:
+        finish_match(ended)
 # Author: Daniel Krutsick
 # Purpose: Handles each client separately with each call of the handle client function as a thread
-# Pre: Pre condition is that the client had successfully connected and has a socket connection and address
-# Post: Post condition is that the client is removed from the list and closed and updates userscore to be 1 less than the previous number
-def handle_client(conn: socket.socket, addr) -> None:
-    global usercount, running
-    buffer = ""
+# Pre: Pre condition is that the client had successfully connected and has a socket connection and address,
+#      pending is anything another process already read from it (a client handed over by pongShardServer.py)
+# Post: Post condition is that the client has left its match and the lobby, and is removed from the list and closed.
+#       A worker's client that sent REQUEUE is handed back to the supervisor with whatever was read after it.
+#       A client over its limits (see admission.py) is disconnected and counted under the reason
+def handle_client(conn: socket.socket, addr, stats, pending: bytes = b"") -> None:
+    # Frames are read straight into one reusable buffer and relayed as the original bytes,
+    # the only per frame work is checking that the frame is well formed
+    reader = FrameReader()
+    reader.feed(pending)
+    debugFrames = log.isEnabledFor(logging.DEBUG)
+    sync = clientSyncs.get(conn)
+    handedBack = False
+    guard = ConnectionGuard(limits)
+    kicked = None
     try:
         while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            chunk = chunk.decode("utf-8")
-            buffer += chunk
             # Process all complete messages
-            while "\n" in buffer:
-                message_line, buffer = buffer.split("\n", 1)
-                message_line = message_line.strip()
-                if not message_line:
-                    continue
-                message1 = parse_game_state(message_line)
-                if message1:
-                    print(f"[{addr}] Parsed message: {message1}")
-                    transmit = (
-                        f"PN:{message1['name']}:PP:{message1['pos']}:BX:{message1['bx']}:BY:{message1['by']}:"
-                        f"LS:{message1['lscore']}:RS:{message1['rscore']}:TM:{message1['time']}\n"
-                    ).encode('utf-8')
-                    broadcast(transmit)
-    except ConnectionResetError:
+            for kind, frame in reader.frames():
+                stats.framesIn += 1
+                if not guard.frame():
+                    # Sending faster than any real client does, the rest of what it sent is never looked at
+                    kicked = guard.reason
+                    break
+                if kind == PROTO_SYNC:
+                    # Sync frames only make sense against this client's own snapshots, so they are
+                    # decoded here, and any snapshot acks owed to the client go straight back to it
+                    state = sync.receive(bytes(frame)) if sync is not None else None
+                    acks = sync.take_acks() if sync is not None else b""
+                    if acks:
+                        fanout.send(conn, acks)
+                    match, sender = clients.get(conn, UNPLACED)
+                    if state is not None and match is not None and sender != SPECTATOR_SIDE:
+                        relay(match, kind, None, sender, state)
+                elif kind != FRAME_LINE:
+                    # The client may be in a new match since its last frame, so its match is looked up every time
+                    match, sender = clients.get(conn, UNPLACED)
+                    if match is None or sender == SPECTATOR_SIDE:
+                        # Spectators only watch, and a client between matches has nobody to send to
+                        continue
+                    if debugFrames:
+                        log.debug("[%s] Relaying message: %s", addr, decode_frame(kind, frame))
+                    relay(match, kind, frame, sender)
+                elif frame.startswith(CLOCK_PREFIX):
+                    answer_clock(conn, frame)
+                elif frame == PROTO_UDP_REQUEST:
+                    # Without UDP turned on the request is ignored and the client keeps using TCP
+                    if UDP:
+                        with clientsLock:
+                            udp = clientUdp.get(conn)
+                            if udp is None:
+                                udp = clientUdp[conn] = udpRegistry.add(conn)
+                        fanout.send(conn, f"UDP:{udp.token}\n".encode('utf-8'))
+                elif frame in PROTO_REQUESTS:
+                    # Frames carry their own format, so one that was queued in the old format around the ack is still readable
+                    proto = PROTO_REQUESTS[frame]
+                    fanout.send(conn, frame + b"\n")
+                    with clientsLock:
+                        clientProtos[conn] = proto
+                        if proto == PROTO_SYNC:
+                            sync = clientSyncs.setdefault(conn, SyncSession())
+                            peer = fanout.queues.get(conn)
+                            if peer is not None:
+                                peer.onDrop = sync.resend
+                elif frame == b"REQUEUE":
+                    if handoff is not None:
+                        # Stops reading right here, the rest of the buffer goes along with the client
+                        handedBack = True
+                        break
+                    requeue(conn)
+                elif frame.startswith(b"WATCH:"):
+                    try:
+                        watch(conn, addr, int(frame[6:]))
+                    except ValueError:
+                        stats.parseFailures += 1
+                else:
+                    stats.parseFailures += 1
+                    log.warning("[WARNING] Could not parse message: %r", frame)
+            stats.droppedBytes = reader.dropped
+            if handedBack:
+                break
+            # What is left in the buffer is one unfinished frame, longer than any real one means it never ends
+            kicked = guard.check(reader.end - reader.start, stats)
+            if kicked is not None:
+                break
+            n = reader.recv_from(conn)
+            if not n:
+                break
+            stats.bytesIn += n
+            guard.received()
+    except OSError:# Reset by the client, or closed because the server is shutting down
         pass
     finally:
-        #Finally ends a handle_client thread by removing its instance of itself in the list and then closing and reducing the number
-        #of clients in the usercount variable by 1, this would be useful if we had more time to implement a way of continuously playing more
-        #games after finishing one and also handling spectator clients
+        #Finally ends a handle_client thread by taking the client out of its match, which ends the match
+        #for the other player, and out of every list before closing it
         with clientsLock:
-            #This finds the one client in the client list and removes it from the list of tuples
-            clients[:] = [(c, side) for c, side in clients if c != conn]
-            print(f"[CLIENT DISCONNECT] The client: {conn} has disconnected from the server!")
+            ended = leave_match(conn)
+            if not handedBack:
+                forget_client(conn, stats)
+        if handedBack:
+            # Everything already queued for the client goes out first, or the next START written by another
+            # process could land in the middle of a half written frame. One that can not take it is dropped
+            handedBack = fanout.drain(conn)
+            with clientsLock:
+                proto, sync = forget_client(conn, stats)
+        if handedBack:
+            log.info("[HANDED BACK] %s went back to the supervisor's lobby", addr)
+            handoff(("requeue", conn, addr, bytes(reader.view[reader.start:reader.end]), proto, sync))
+        elif kicked is not None:
+            metrics.inc(kicked)
+            log.warning("[KICKED] %s was disconnected: %s", addr, kicked)
+        else:
+            log.info("[CLIENT DISCONNECT] The client: %s has disconnected from the server!", addr)
         conn.close()
-        usercount -= 1
-        if usercount <= 1:
-            running = False
+        if ended is not None:
+            finish_match(ended)
+# Author: Daniel Krutsick
+# Purpose: Takes a client out of every list once it is gone or handed to another process
+# Pre: clientsLock is held, the client is in no match
+# Post: Returns the wire format and SyncSession the client was using, so they can go along with it
+def forget_client(conn: socket.socket, stats):
+    clients.pop(conn, None)
+    proto = clientProtos.pop(conn, PROTO_TEXT)
+    sync = clientSyncs.pop(conn, None)
+    udp = clientUdp.pop(conn, None)
+    if udp is not None:
+        udpRegistry.remove(udp)
+    fanout.remove(conn)
+    metrics.remove_connection(stats.name)
+    return proto, sync
+# Author: Daniel Krutsick
+# Purpose: Takes in a client another process accepted, for a pongShardServer.py worker
+# Pre: conn came from the supervisor along with the wire format and SyncSession it negotiated there
+# Post: conn is UNPLACED with its queue and stats set up, returns the stats for handle_client()
+def adopt_client(conn: socket.socket, addr, proto: str, sync):
+    peer = fanout.add(conn)
+    stats = metrics.add_connection(str(addr), peer)
+    with clientsLock:
+        clients[conn] = UNPLACED
+        if proto != PROTO_TEXT:
+            clientProtos[conn] = proto
+        if sync is not None:
+            clientSyncs[conn] = sync
+            peer.onDrop = sync.resend
+    return stats
+# Author: Daniel Krutsick
+# Purpose: Receives every datagram sent to the server's UDP socket and relays the game states in it
+# Pre: udpSock is bound to the same port number as the TCP server, and clients got their token over TCP
+# Post: Runs until the socket is closed. Late datagrams are dropped by the registry before they are read
+def udp_loop() -> None:
+    reader = FrameReader(MAX_DATAGRAM)
+    while running:
+        try:
+            data, addr = udpSock.recvfrom(MAX_DATAGRAM)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        accepted = udpRegistry.accept(data, addr)
+        if accepted is None:
+            continue
+        peer, payload = accepted
+        match, sender = clients.get(peer.owner, UNPLACED)
+        if match is None:
+            continue
+        reader.feed(payload)
+        for kind, frame in reader.frames():
+            if kind == FRAME_LINE and frame.startswith(CLOCK_PREFIX):
+                # Pings come the same way as the states, so the round trip they measure is the states' too
+                answer_clock(peer.owner, frame)
+            elif kind in (PROTO_TEXT, PROTO_BINARY) and sender != SPECTATOR_SIDE:
+                relay(match, kind, frame, sender)
+        # A datagram always holds whole frames, anything left over can never be finished
+        reader.discard()
+# Author: Daniel Krutsick
+# Purpose: Pairs the clients waiting in the lobby into matches for as long as the server runs
+# Pre: Started by start_server() on its own thread
+# Post: Returns once running is False
+def matchmaker() -> None:
+    while running:
+        for left, right in lobby.next_pairs(lambda c: clients.get(c) is LOBBY):
+            start_match(left, right)
 # Author: Daniel Krutsick
 # Purpose: Starts the server and runs the loop to handle all clients attempting to connect
 # Pre: The pre condition is that the host IP and port number is correct
 # Post: The post condition is that the server is properly closed down and returns a 0 proving that it has completed
 def start_server() -> int:
-    global clients, usercount, running
+    global running, udpSock
     running = True
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.bind((HOST, PORT))
     s.listen()
     s.settimeout(1.0)#For periodically checking for KeyboardInterrupt
-    print(f"[LISTENING] Server listening on {HOST}:{PORT}")
+    fanout.start()
+    log.info("[LISTENING] Server listening on %s:%s", HOST, PORT)
+    metricsServer = None
+    if METRICS_PORT is not None:
+        metricsServer = start_metrics_endpoint(metrics, HOST, METRICS_PORT)
+        metrics.gauge("clients", lambda: len(clients))
+        metrics.gauge("matches", lambda: len(matches))
+        metrics.gauge("lobby", lambda: len(lobby))
+        metrics.gauge("fanout_evicted", lambda: fanout.evicted)
+        log.info("[LISTENING] Metrics on http://%s:%s/metrics", HOST, metricsServer.server_address[1])
+    if UDP:
+        #Game states can also come in over UDP on the same port number, the TCP connection still does the handshake
+        udpSock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udpSock.bind((HOST, PORT))
+        udpSock.settimeout(1.0)
+        threading.Thread(target=udp_loop, daemon=True).start()
+        log.info("[LISTENING] UDP game states on %s:%s", HOST, PORT)
     # Allows for continous accepting of clients without blocking any other operations or freezing the server
-    # This would be a more helpful definition given we were also account spectators properly, but there is no way of doing a spectator
-    # given the time we had to complete the project.
+    # Every client goes in the lobby and the matchmaker thread decides who plays who on which paddle, so
+    # accepting a client never waits on clientsLock while a match is starting or ending
     def accept_loop():
-        global usercount, clients, running
         while running:
             try:
                 # Try to accept each client that attempts to connect
                 conn, addr = s.accept()
-                # clientsLock is used here to ensure that if two clients are connecting at the same time, there is no possible
-                # way that both clients will connect with the same paddle since the clients will not be able to finalize a connection
-                # until one is done initializing itself
-                with clientsLock:
-                    if usercount == 0:
-                        paddle_side = "left"
-                    elif usercount == 1:
-                        paddle_side = "right"
-                    else:
-                        paddle_side = "spectator"
-                    # Adds the connection and paddle_side as a tuple into the clients list
-                    clients.append((conn, paddle_side))
-                    usercount += 1
-                    print(f"[NEW CONNECTION] {addr} assigned to {paddle_side} paddle. Total clients: {usercount}")
-                    if usercount >= REQUIRED_NUM_CLIENTS:# Sets the twoClientsConnected flag to true, indicating there are two clients connected
-                        twoClientsConnected.set()
-                #Starts a thread for handle_client, will not send any messages out given there will be no messages coming into the server yet
-                #Game has not started
-                thread = threading.Thread(target=handle_client, args=(conn, addr), daemon=True)
-                thread.start()
             except socket.timeout:# Keep running even if timed out, do not want to stop accepting clients
-                continue   
+                continue
+            except OSError:# The listening socket was closed, the server is shutting down
+                break
+            if limits.full(len(clients)):
+                # Turned away before it costs a thread or a queue, the clients already playing are not slowed down
+                conn.close()
+                metrics.inc(REJECTED)
+                log.warning("[REJECTED] %s, the server already has %s clients", addr, len(clients))
+                continue
+            # Every write is a small frame that should go out now, without this START after END or a state after
+            # the last one waits up to 40 ms for the client to acknowledge the one before it
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stats = metrics.add_connection(str(addr), fanout.add(conn))
+            clients[conn] = LOBBY
+            log.info("[NEW CONNECTION] %s is waiting in the lobby. Total clients: %s", addr, len(clients))
+            #Starts a thread for handle_client, the client only gets START once the matchmaker pairs it
+            thread = threading.Thread(target=handle_client, args=(conn, addr, stats), daemon=True)
+            thread.start()
+            lobby.join(conn)
     acceptThread = threading.Thread(target=accept_loop, daemon=True)
     acceptThread.start()
-    #The server is waiting for the two users to finally join the server
-    print("[SERVER] Waiting for two clients to connect... Will time out in 180 seconds")
-    twoClientsConnected.wait(timeout=180)
-    #The server will never run this if it times out, given that the twoClientsConnected flag will never be set
-    if twoClientsConnected.is_set():
-        print("[SERVER] Two clients connected, starting game.")
-        #Clients lock here ensures that we send all paddle_sides out to their respective clients properly and just in general
-        #is a good practice for handling the clients properly
-        with clientsLock:
-            for conn, paddle_side in clients:
-                if paddle_side != "spectator":
-                    try:
-                        conn.sendall(f"START:{paddle_side}\n".encode('utf-8'))
-                    except Exception as e:
-                        print(f"[ERROR] Failed to send START to {conn}: {e}")
-        #We should continue waiting 0.5 seconds to ensure the server can detect a KeyboardInterrupt and close the server
-        #forcefully if need be
-        try:
-            while running:
-                sleep(0.5)
-        except KeyboardInterrupt:#Detects if ctrl+c has been clicked and will turn running to False, which then leads to finally
-            print("[ClOSING SERVER]: KEYBOARD INTERRUPT EXCEPTION")
-            running = False
-        finally:#This will finally close down the server after removing each clients connection from the list and closing their connections
-            print("[CLOSING CLIENTS]")
-            running = False
-            with clientsLock:#Attempts to close all clients in the client list, if they are still there
-                for client, _ in clients:
-                    try:
-                        client.close()
-                    except:
-                        pass
-            print("[SERVER CLOSED]")
-            s.close()
-            return 0
-    else:#This is played if the server times out, since there would be no way to get to the finally clause inside of the if statement if timeout occurs
+    threading.Thread(target=matchmaker, daemon=True).start()
+    log.info("[SERVER] Waiting for clients, every two in the lobby are paired into a match")
+    #We should continue waiting 0.5 seconds to ensure the server can detect a KeyboardInterrupt and close the server
+    #forcefully if need be
+    try:
+        while running:
+            sleep(0.5)
+    except KeyboardInterrupt:#Detects if ctrl+c has been clicked and will turn running to False, which then leads to finally
+        log.warning("[ClOSING SERVER]: KEYBOARD INTERRUPT EXCEPTION")
+    finally:#This will finally close down the server after closing every client's connection
         running = False
-        for client, _ in clients:
+        log.info("[CLOSING CLIENTS]")
+        log.info("[MATCHES STARTED] %s", metrics.counters["matches_started"])
+        log.info("[FANOUT STATS] %s", fanout.stats())
+        log.info("[RELAY LATENCY] %s", metrics.relayLatency.summary())
+        s.close()
+        fanout.stop()
+        if udpSock is not None:
+            log.info("[UDP STATS] %s", udpRegistry.stats())
+            udpSock.close()
+        with clientsLock:
+            runningMatches = list(matches.values())
+            connected = list(clients)
+        for match in runningMatches:
+            #Writes the last states and the index, a recording that is never closed can still be read
+            match.stop_recording()
+        for client in connected:#Attempts to close all clients, if they are still there
             try:
                 client.close()
             except:
                 pass
-        s.close()
-        print("[SERVER CLOSED]")
+        if metricsServer is not None:
+            metricsServer.shutdown()
+        log.info("[SERVER CLOSED]")
         return 0
 #Runs if this is the main module and not ran with another program and prompts you to enter a HOST and PORT number for the server
 #before starting it up
 if __name__ == "__main__":
-    global usercount
-    usercount = 0
     HOST = input("Enter server IP address (default 0.0.0.0): ") or "0.0.0.0"
     PORT = int(input("Enter server port number: ") or 50007)
-    start_server()
\ No newline at end of file
+    MODE = input("Enter server mode, thread, async or sharded (default thread): ") or "thread"
+    UDP = (input("Accept game states over UDP? y/n (default n): ") or "n").lower().startswith("y")
+    RATE = float(input(f"Spectator updates per second (default {SPECTATOR_RATE}): ") or SPECTATOR_RATE)
+    RECORD_DIR = input("Folder to record matches to (default none): ") or None
+    METRICS_PORT = int(input("Metrics port (default none): ") or -1)
+    METRICS_PORT = METRICS_PORT if METRICS_PORT >= 0 else None
+    LOG_LEVEL = input("Log level, debug/info/warning (default info): ") or "info"
+    MAX_CLIENTS = int(input(f"Most clients connected at once (default {limits.maxClients}): ") or limits.maxClients)
+    FRAME_RATE = float(input(f"Most frames per second from one client (default {limits.frameRate:g}): ") or limits.frameRate)
+    limits = Limits(MAX_CLIENTS, FRAME_RATE, max(1, round(FRAME_RATE)))
+    setup_logging(LOG_LEVEL)
+    if MODE == "async":
+        # The async engine hosts many rooms in one process instead of a single match
+        from pongAsyncServer import TICK_RATE, run_async_server
+        AUTH = (input("Run the physics on the server? y/n (default n): ") or "n").lower().startswith("y")
+        STEPS = TICK_RATE
+        if AUTH:
+            STEPS = int(input(f"Physics steps per second, {TICK_RATE}/30/20 (default {TICK_RATE}): ") or TICK_RATE)
+        run_async_server(HOST, PORT, AUTH, UDP, RATE, RECORD_DIR, METRICS_PORT, max(1, round(TICK_RATE / STEPS)), limits)
+    elif MODE == "sharded":
+        # A supervisor with the lobby and worker processes running the matches, one per core by default
+        from pongShardServer import run_shard_server
+        WORKERS = int(input(f"Worker processes (default {os.cpu_count()}): ") or os.cpu_count())
+        if UDP:
+            log.warning("[SERVER] The sharded mode does not take game states over UDP, clients stay on TCP")
+        run_shard_server(HOST, PORT, WORKERS, RATE, RECORD_DIR, METRICS_PORT, LOG_LEVEL, limits)
+    else:
+        spectatorRate = RATE
+        start_server()
+    stop_logging()
@@ -0,0 +1,483 @@
+# =================================================================================================
+# Contributing Authors:	    Jacob Blankenship, Daniel Krutsick
+# Email Addresses:          jrbl245@uky.edu, djkr228@uky.edu
+# Date:                     11/24/2025
+# Purpose:                  Sharded server for our Pong game, one supervisor process and a number of
+#                           worker processes, so the server can use more than the one core the GIL
+#                           gives a single pongServer.py process
+# Misc:                     Started from pongServer.py by choosing the "sharded" server mode, or directly
+#                           with "python pongShardServer.py". The supervisor accepts every client and keeps
+#                           the lobby (lobby.py), and each match it pairs is handed to the worker running
+#                           the fewest matches, sockets and all, over a multiprocessing pipe. A worker runs
+#                           its matches with pongServer.py's own code and owns them alone, and a player
+#                           that sends REQUEUE is handed back to the supervisor's lobby for its next match.
+#                           Both players of a match always end up in the same process this way, which
+#                           letting the workers share the port with SO_REUSEPORT could not promise (the
+#                           kernel spreads connections by address, and Windows has no SO_REUSEPORT).
+#                           WATCH:<match> is sent on to the worker that owns the match. Workers are asked
+#                           for their status every HEALTH_INTERVAL seconds, and one that died or stopped
+#                           answering is replaced (its matches are lost). The metrics endpoint serves the
+#                           supervisor's and every worker's counters added together (metrics.py).
+#                           Game states over UDP are not offered in this mode, clients stay on TCP.
+#                           The supervisor holds lobby clients to the same limits (admission.py) the workers
+#                           hold players to, and stops accepting once the lobby and the running matches
+#                           have maxClients players between them.
+# =================================================================================================
+
+import itertools
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+from typing import Optional
+
+from assets.code.admission import REJECTED, ConnectionGuard, Limits
+from assets.code.clockSync import CLOCK_PREFIX
+from assets.code.lobby import Lobby
+from assets.code.metrics import MergedMetrics, ServerMetrics, start_metrics_endpoint
+from assets.code.serverLog import get_logger, setup_logging, stop_logging
+from assets.code.spectate import SPECTATOR_RATE
+from assets.code.stateSync import SyncSession
+from assets.code.wireProtocol import (PROTO_SYNC, PROTO_TEXT, PROTO_REQUESTS, PROTO_UDP_REQUEST, FRAME_LINE, FrameReader)
+
+try:
+    import resource # Not on Windows, worker memory is reported as 0 there
+except ImportError:
+    resource = None
+
+HEALTH_INTERVAL = 1.0 # Seconds between status requests to each worker
+HEALTH_TIMEOUT = 5.0 # Seconds a worker may go without answering before it is replaced
+
+log = get_logger()
+
+# Peak resident memory of this process in KB, 0 where it can not be read
+def peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+# Author:  Daniel Krutsick
+# Purpose:  Body of one worker process, hosts the matches the supervisor hands it using pongServer.py's code
+# Pre:  Started by ShardServer with the spawn start method, so it holds no copy of any other client's socket.
+#       pipe is the worker's end of its pipe to the supervisor
+# Post:  Returns when told to stop, when the supervisor goes away, or on ctrl+c, with every recording finished
+def worker_main(pipe, workerId:int, spectatorRate:float, recordDir:Optional[str], logLevel:str,
+                limits:Optional[Limits] = None) -> None:
+    import pongServer
+    setup_logging(logLevel)
+    pongServer.spectatorRate = spectatorRate
+    pongServer.RECORD_DIR = recordDir
+    if limits is not None:
+        pongServer.limits = limits
+    # Client threads hand clients back while this thread answers status requests, a Connection is not thread safe
+    sendLock = threading.Lock()
+
+    def send(message) -> None:
+        with sendLock:
+            try:
+                pipe.send(message)
+            except OSError: # The supervisor is gone, recv() below sees it too
+                pass
+
+    pongServer.handoff = send
+    pongServer.running = True
+    pongServer.fanout.start()
+    metrics = pongServer.metrics
+    metrics.gauge("clients", lambda: len(pongServer.clients))
+    metrics.gauge("matches", lambda: len(pongServer.matches))
+    metrics.gauge("fanout_evicted", lambda: pongServer.fanout.evicted)
+    log.info("[WORKER %s] Ready", workerId)
+    try:
+        while True:
+            message = pipe.recv()
+            if message[0] == "match":
+                _, matchId, players = message
+                threads = []
+                for conn, addr, pending, proto, sync in players:
+                    stats = pongServer.adopt_client(conn, addr, proto, sync)
+                    threads.append(threading.Thread(target=pongServer.handle_client, args=(conn, addr, stats, pending),
+                                                    daemon=True))
+                # START goes out before either client thread reads anything, like a match the lobby paired
+                with pongServer.clientsLock:
+                    pongServer.open_match(matchId, players[0][0], players[1][0])
+                for thread in threads:
+                    thread.start()
+            elif message[0] == "watch":
+                _, matchId, (conn, addr, pending, proto, sync) = message
+                if matchId not in pongServer.matches:
+                    # The match ended on the way here, the client waits in the lobby as if it never asked
+                    send(("requeue", conn, addr, pending, proto, sync))
+                    conn.close()
+                    continue
+                stats = pongServer.adopt_client(conn, addr, proto, sync)
+                pongServer.watch(conn, addr, matchId)
+                threading.Thread(target=pongServer.handle_client, args=(conn, addr, stats, pending), daemon=True).start()
+            elif message[0] == "status":
+                # Taking the lock means a worker stuck on it stops answering, and gets replaced
+                with pongServer.clientsLock:
+                    report = {"metrics": metrics.export(), "matches": len(pongServer.matches),
+                              "cpu": time.process_time(), "rss": peak_rss_kb()}
+                send(("status", report))
+            else:
+                break
+    except (EOFError, OSError, KeyboardInterrupt):
+        pass
+    finally:
+        pongServer.running = False
+        with pongServer.clientsLock:
+            runningMatches = list(pongServer.matches.values())
+            connected = list(pongServer.clients)
+        for match in runningMatches:
+            match.stop_recording()
+        for conn in connected:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        pongServer.fanout.stop()
+        log.info("[WORKER %s] Stopped", workerId)
+        stop_logging()
+
+# Author:  Daniel Krutsick
+# Purpose:  A client waiting in the supervisor's lobby, and what it negotiated while it waits
+# Pre:  Created when the supervisor accepts a client or a worker hands one back
+# Post:  proto and sync go along with the socket to whichever worker gets the client next, guard stays here
+class LobbyClient:
+    def __init__(self, conn:socket.socket, addr, stats, limits:Limits, proto:str = PROTO_TEXT,
+                 sync:Optional[SyncSession] = None) -> None:
+        self.conn = conn
+        self.addr = addr
+        self.stats = stats
+        self.reader = FrameReader()
+        self.guard = ConnectionGuard(limits)
+        self.proto = proto
+        self.sync = sync
+
+# Author:  Daniel Krutsick
+# Purpose:  The supervisor's view of one worker process
+# Pre:  ctx is a spawn multiprocessing context
+# Post:  The process is started, matches holds the match numbers the supervisor handed it that have not ended
+class Worker:
+    def __init__(self, ctx, workerId:int, settings:tuple) -> None:
+        self.workerId = workerId
+        self.name = f"worker{workerId}"
+        self.pipe, child = ctx.Pipe()
+        self.process = ctx.Process(target=worker_main, args=(child, workerId, *settings), name=self.name, daemon=True)
+        self.process.start()
+        child.close()
+        self.matches = set()
+        self.lastHeard = time.monotonic() # When it last answered, starting up counts as an answer
+        self.asked = 0.0 # When it was last sent a status request
+        self.cpu = 0.0 # CPU seconds it reported last
+        self.rss = 0 # Peak memory in KB it reported last
+        self.lost = False # Its pipe closed, so the process is gone or going
+
+# Author:  Daniel Krutsick
+# Purpose:  The supervisor, accepts every client, pairs them in its lobby and hands each match to a worker
+# Pre:  serve() is called once, from the main thread
+# Post:  Every worker is stopped and every client closed when serve() returns
+class ShardServer:
+    def __init__(self, host:str, port:int, workers:int, spectatorRate:float = SPECTATOR_RATE,
+                 recordDir:Optional[str] = None, metricsPort:Optional[int] = None, logLevel:str = "info",
+                 limits:Optional[Limits] = None) -> None:
+        self.host = host
+        self.port = port
+        self.workerCount = max(1, workers)
+        self.limits = limits if limits is not None else Limits()
+        self.settings = (spectatorRate, recordDir, logLevel, self.limits)
+        self.metricsPort = metricsPort
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.waiting = {} # socket -> LobbyClient of everyone in the lobby
+        self.lobby = Lobby()
+        self.matchIds = itertools.count(1) # Only the supervisor numbers matches, so they are unique across workers
+        self.owners = {} # match number -> Worker running it
+        self.metrics = ServerMetrics() # The supervisor's own counters, the lobby connections among them
+        self.merged = MergedMetrics(self.metrics)
+        self.retiredCpu = 0.0 # CPU seconds of workers that were replaced
+        self.running = False
+        self.listener = None
+
+    # CPU seconds used by the supervisor and all of its workers, and their peak memory in KB added up
+    def usage(self) -> tuple:
+        workers = list(self.workers)
+        return (time.process_time() + self.retiredCpu + sum(w.cpu for w in workers),
+                peak_rss_kb() + sum(w.rss for w in workers))
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Runs the supervisor loop until close() is called or ctrl+c
+    # Pre:  host and port are free
+    # Post:  Returns 0 once everything is shut down, ready (if given) is set once the port is listening
+    def serve(self, ready:Optional[threading.Event] = None) -> int:
+        self.running = True
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen()
+        self.workers = [Worker(self.ctx, i, self.settings) for i in range(self.workerCount)]
+        log.info("[LISTENING] Server listening on %s:%s with %s worker processes", self.host, self.port, self.workerCount)
+        metricsServer = None
+        if self.metricsPort is not None:
+            metricsServer = start_metrics_endpoint(self.merged, self.host, self.metricsPort)
+            self.metrics.gauge("lobby", lambda: len(self.waiting))
+            self.metrics.gauge("workers", lambda: sum(w.process.is_alive() for w in list(self.workers)))
+            log.info("[LISTENING] Metrics on http://%s:%s/metrics", self.host, metricsServer.server_address[1])
+        if ready is not None:
+            ready.set()
+        try:
+            while self.running:
+                pipes = {w.pipe: w for w in self.workers}
+                timeout = min(self.lobby.next_wait(), HEALTH_INTERVAL)
+                for obj in wait([self.listener, *pipes, *self.waiting], timeout):
+                    if obj is self.listener:
+                        self.accept()
+                    elif obj in pipes:
+                        self.read_worker(pipes[obj])
+                    elif obj in self.waiting:
+                        self.read_client(self.waiting[obj])
+                for left, right in self.lobby.next_pairs(lambda c: c in self.waiting, 0):
+                    self.start_match(left, right)
+                self.check_workers()
+        except KeyboardInterrupt:
+            log.warning("[ClOSING SERVER]: KEYBOARD INTERRUPT EXCEPTION")
+        finally:
+            self.running = False
+            log.info("[CLOSING CLIENTS]")
+            self.listener.close()
+            for worker in self.workers:
+                try:
+                    worker.pipe.send(("stop",))
+                except OSError:
+                    pass
+            for worker in self.workers:
+                # Workers finish their recordings before they exit
+                worker.process.join(5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+            for client in list(self.waiting.values()):
+                client.conn.close()
+            self.waiting.clear()
+            log.info("[MATCHES STARTED] %s", self.merged.merged().counters["matches_started"])
+            if metricsServer is not None:
+                metricsServer.shutdown()
+            log.info("[SERVER CLOSED]")
+        return 0
+
+    # Stops serve() from another thread
+    def close(self) -> None:
+        self.running = False
+
+    def accept(self) -> None:
+        try:
+            conn, addr = self.listener.accept()
+        except OSError:# The client gave up before it was accepted
+            return
+        # Spectators handed to a worker are not counted, the supervisor never hears when they leave
+        connected = len(self.waiting) + 2 * sum(len(w.matches) for w in self.workers)
+        if self.limits.full(connected):
+            conn.close()
+            self.metrics.inc(REJECTED)
+            log.warning("[REJECTED] %s, the server already has %s clients", addr, connected)
+            return
+        # Small frames that should go out now, the same as the threaded server. The option stays with the socket
+        # when it moves to a worker
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.waiting[conn] = LobbyClient(conn, addr, self.metrics.add_connection(str(addr)), self.limits)
+        self.lobby.join(conn)
+        log.info("[NEW CONNECTION] %s is waiting in the lobby. Total waiting: %s", addr, len(self.waiting))
+
+    def read_client(self, client:LobbyClient) -> None:
+        try:
+            n = client.reader.recv_from(client.conn)
+        except OSError:
+            n = 0
+        if not n:
+            self.drop(client)
+            return
+        client.stats.bytesIn += n
+        client.guard.received()
+        self.handle_frames(client)
+
+    # Drops a waiting client the supervisor could not write to
+    def drop(self, client:LobbyClient) -> None:
+        self.forget(client)
+        client.conn.close()
+        log.info("[CLIENT DISCONNECT] The client: %s has disconnected from the server!", client.addr)
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Answers what a waiting client sent, the same lines handle_client() in pongServer.py knows
+    # Pre:  client.reader holds what was read from it
+    # Post:  A client that asked to watch a running match is handed to that match's worker, along with
+    #        everything it sent after the WATCH line. One that can not be written to is dropped, and one over
+    #        its limits is disconnected and counted under the reason
+    def handle_frames(self, client:LobbyClient) -> None:
+        try:
+            self.answer_frames(client)
+        except OSError:
+            self.drop(client)
+            return
+        if client.conn not in self.waiting:
+            # Handed to the worker running the match it asked to watch
+            return
+        client.stats.droppedBytes = client.reader.dropped
+        kicked = client.guard.check(client.reader.end - client.reader.start, client.stats)
+        if kicked is not None:
+            self.metrics.inc(kicked)
+            log.warning("[KICKED] %s was disconnected: %s", client.addr, kicked)
+            self.forget(client)
+            client.conn.close()
+
+    def answer_frames(self, client:LobbyClient) -> None:
+        for kind, frame in client.reader.frames():
+            client.stats.framesIn += 1
+            if not client.guard.frame():
+                return
+            if kind == PROTO_SYNC:
+                # Acks for snapshots of its last match still count, the worker that gets it next keeps using them
+                if client.sync is not None:
+                    client.sync.receive(bytes(frame))
+                    acks = client.sync.take_acks()
+                    if acks:
+                        client.conn.sendall(acks)
+            elif kind != FRAME_LINE:
+                # A client between matches has nobody to send its states to
+                continue
+            elif frame in PROTO_REQUESTS:
+                client.proto = PROTO_REQUESTS[frame]
+                if client.proto == PROTO_SYNC and client.sync is None:
+                    client.sync = SyncSession()
+                client.conn.sendall(frame + b"\n")
+            elif frame == PROTO_UDP_REQUEST or frame == b"REQUEUE" or frame.startswith(CLOCK_PREFIX):
+                # No UDP here so the client keeps using TCP, a client in the lobby is already queued, and
+                # a clock ping sent just before its match ended has no match clock left to answer it
+                continue
+            elif frame.startswith(b"WATCH:"):
+                try:
+                    matchId = int(frame[6:])
+                except ValueError:
+                    client.stats.parseFailures += 1
+                    continue
+                owner = self.owners.get(matchId)
+                if owner is not None:
+                    self.send(owner, ("watch", matchId, self.release(client)), [client.conn])
+                    return
+            else:
+                client.stats.parseFailures += 1
+                log.warning("[WARNING] Could not parse message: %r", frame)
+
+    # Takes a client out of the lobby's lists
+    def forget(self, client:LobbyClient) -> None:
+        self.waiting.pop(client.conn, None)
+        self.metrics.remove_connection(client.stats.name)
+
+    # Takes a client out of the lobby to be sent to a worker, as the tuple handle_client() picks it up from
+    def release(self, client:LobbyClient) -> tuple:
+        self.forget(client)
+        pending = bytes(client.reader.view[client.reader.start:client.reader.end])
+        return (client.conn, client.addr, pending, client.proto, client.sync)
+
+    # Sends a worker a message and closes the supervisor's own copy of every socket in it, the worker gets its own
+    def send(self, worker:Worker, message:tuple, sockets:list) -> None:
+        try:
+            worker.pipe.send(message)
+        except OSError:
+            # The worker is already gone, check_workers() replaces it
+            log.warning("[WORKER LOST] Could not reach %s, its clients were dropped", worker.name)
+        for conn in sockets:
+            conn.close()
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Hands two clients the lobby paired to the worker running the fewest matches
+    # Pre:  Both are still in the lobby
+    # Post:  The match has a number no other match uses, and the worker sends both players START
+    def start_match(self, left:socket.socket, right:socket.socket) -> None:
+        # A worker that died since the last health check gets nothing new
+        alive = [w for w in self.workers if w.process.is_alive()] or self.workers
+        worker = min(alive, key=lambda w: len(w.matches))
+        matchId = next(self.matchIds)
+        players = [self.release(self.waiting[left]), self.release(self.waiting[right])]
+        worker.matches.add(matchId)
+        self.owners[matchId] = worker
+        self.send(worker, ("match", matchId, players), [left, right])
+        log.debug("[MATCH ASSIGNED] Match %s went to %s", matchId, worker.name)
+
+    def read_worker(self, worker:Worker) -> None:
+        try:
+            message = worker.pipe.recv()
+        except (EOFError, OSError):
+            # Its process ended, check_workers() replaces it
+            worker.lost = True
+            return
+        if message[0] == "requeue":
+            _, conn, addr, pending, proto, sync = message
+            client = LobbyClient(conn, addr, self.metrics.add_connection(str(addr)), self.limits, proto, sync)
+            self.waiting[conn] = client
+            self.lobby.join(conn, False)
+            client.reader.feed(pending)
+            self.handle_frames(client)
+        elif message[0] == "over":
+            worker.matches.discard(message[1])
+            self.owners.pop(message[1], None)
+        elif message[0] == "status":
+            report = message[1]
+            worker.lastHeard = time.monotonic()
+            worker.cpu = report["cpu"]
+            worker.rss = report["rss"]
+            self.merged.update(worker.name, report["metrics"])
+
+    # Author:  Daniel Krutsick
+    # Purpose:  Health check, asks every worker for its status and replaces any that died or stopped answering
+    # Pre:  Called once per pass of the supervisor loop
+    # Post:  A replaced worker's matches are forgotten, its counters are kept in the merged metrics
+    def check_workers(self) -> None:
+        now = time.monotonic()
+        for i, worker in enumerate(self.workers):
+            alive = worker.process.is_alive() and not worker.lost
+            if alive and now - worker.lastHeard <= HEALTH_TIMEOUT:
+                if now - worker.asked >= HEALTH_INTERVAL:
+                    worker.asked = now
+                    try:
+                        worker.pipe.send(("status",))
+                    except OSError:
+                        pass
+                continue
+            log.warning("[WORKER RESTART] %s %s, %s matches were lost", worker.name,
+                        "stopped answering" if alive else "died", len(worker.matches))
+            for matchId in worker.matches:
+                self.owners.pop(matchId, None)
+            worker.process.kill()
+            worker.process.join(1)
+            worker.pipe.close()
+            self.merged.retire(worker.name)
+            self.retiredCpu += worker.cpu
+            self.metrics.inc("workers_restarted")
+            self.workers[i] = Worker(self.ctx, worker.workerId, self.settings)
+
+# Author:  Daniel Krutsick
+# Purpose:  Runs the sharded server until ctrl+c, for the "sharded" mode of pongServer.py
+# Pre:  host and port are free
+# Post:  Returns 0 once every worker has stopped
+def run_shard_server(host:str, port:int, workers:int, spectatorRate:float = SPECTATOR_RATE,
+                     recordDir:Optional[str] = None, metricsPort:Optional[int] = None, logLevel:str = "info",
+                     limits:Optional[Limits] = None) -> int:
+    server = ShardServer(host, port, workers, spectatorRate, recordDir, metricsPort, logLevel, limits)
+    return server.serve()
+
+if __name__ == "__main__":
+    HOST = input("Enter server IP address (default 0.0.0.0): ") or "0.0.0.0"
+    PORT = int(input("Enter server port number: ") or 50007)
+    WORKERS = int(input(f"Worker processes (default {os.cpu_count()}): ") or os.cpu_count())
+    RATE = float(input(f"Spectator updates per second (default {SPECTATOR_RATE}): ") or SPECTATOR_RATE)
+    RECORD = input("Folder to record matches to (default none): ") or None
+    METRICS_PORT = int(input("Metrics port (default none): ") or -1)
+    LOG_LEVEL = input("Log level, debug/info/warning (default info): ") or "info"
+    LIMITS = Limits()
+    MAX_CLIENTS = int(input(f"Most clients connected at once (default {LIMITS.maxClients}): ") or LIMITS.maxClients)
+    FRAME_RATE = float(input(f"Most frames per second from one client (default {LIMITS.frameRate:g}): ") or LIMITS.frameRate)
+    setup_logging(LOG_LEVEL)
+    run_shard_server(HOST, PORT, WORKERS, RATE, RECORD, METRICS_PORT if METRICS_PORT >= 0 else None, LOG_LEVEL,
+                     Limits(MAX_CLIENTS, FRAME_RATE, max(1, round(FRAME_RATE))))
+    stop_logging()